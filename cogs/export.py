@@ -17,6 +17,11 @@ class Export(commands.Cog):
     async def csv(self, interaction: discord.Interaction, start_date: str = None, end_date: str = None):
         await ExportController.download_csv(interaction, start_date, end_date)
 
+    @app_commands.command(name="parquet", description="Download Activity Data as a typed Parquet file (for analytics)")
+    @app_commands.describe(start_date="Start Date (YYYY-MM-DD)", end_date="End Date (YYYY-MM-DD)")
+    async def parquet(self, interaction: discord.Interaction, start_date: str = None, end_date: str = None):
+        await ExportController.download_parquet(interaction, start_date, end_date)
+
     @app_commands.command(name="sync", description="Sync activity data to the main Google Sheet tracker")
     @app_commands.describe(start_date="Start Date (YYYY-MM-DD)", end_date="End Date (YYYY-MM-DD)")
     async def sync(self, interaction: discord.Interaction, start_date: str = None, end_date: str = None):
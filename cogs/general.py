@@ -2,7 +2,6 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from controllers.general_controller import GeneralController
-from services.maintenance_service import MaintenanceService
 
 from utils.discord_utils import validate_channel
 
@@ -27,12 +26,16 @@ class General(commands.Cog):
         await GeneralController.bhai_count(interaction, user, view)
 
     @app_commands.command(name="update", description="Admin: Sync global stats from historical data")
-    async def update_stats(self, interaction: discord.Interaction):
+    @app_commands.describe(mode="Incremental (default) folds only new days; Full rebuilds from all history")
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="Incremental", value="incremental"),
+        app_commands.Choice(name="Full Rebuild", value="full")
+    ])
+    async def update_stats(self, interaction: discord.Interaction, mode: app_commands.Choice[str] = None):
         # Optional: Add permission check (e.g. if interaction.user.guild_permissions.administrator:)
         # User requested "temporary command", so we'll keep it simple but maybe log it.
-        await interaction.response.defer(ephemeral=False)
-        stats = await MaintenanceService.sync_global_stats()
-        await interaction.followup.send(f"✅ **Sync Complete**\n- Bhai Counts Updated: {stats['bhai_updates']}\n- Voice Stats Updated: {stats['voice_updates']}")
+        full = bool(mode and mode.value == "full")
+        await GeneralController.update_stats(interaction, full)
 
     @app_commands.command(name="help", description="Show help")
     async def help_cmd(self, interaction: discord.Interaction):
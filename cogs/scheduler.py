@@ -1,15 +1,21 @@
+import asyncio
 import discord
 import os
+import sys
 from discord.ext import commands, tasks
 from datetime import datetime, time, timedelta
 from config.settings import IST
 from services.attendance_service import AttendanceService
-from services.voice_service import VoiceService
 from models.attendance_model import AttendanceModel
 from utils.time_utils import get_ist_time
-from services.export_service import ExportService
-from services.google_sheets_service import GoogleSheetsService
+from services.sheets_sync_service import SheetsSyncService
+from services.job_ledger_service import JobLedgerService
+from services.archive_service import ArchiveService
+from services.leader_service import LeaderService
+from services.notification_service import NotificationService
 from utils.discord_utils import get_log_channel
+from utils.loop_monitor import LoopLagMonitor
+from utils.rate_limiter import current_priority, PRIORITY_SCHEDULED
 
 def get_scheduler_time(env_key, default_ist):
     ist_str = os.getenv(env_key, default_ist).strip('"\'')
@@ -29,222 +35,297 @@ TIME_AUTO_ABSENT = get_scheduler_time("ATTENDANCE_AUTO_ABSENT_TIME", "23:30")
 TIME_DAILY_EXPORT = get_scheduler_time("ATTENDANCE_EXPORT_TIME", "00:30")
 # Auto Drop: Default 22:00 IST
 TIME_AUTO_DROP = get_scheduler_time("ATTENDANCE_END_TIME", "22:00")
-# Shift Start: Default 09:00 IST
-TIME_SHIFT_START = get_scheduler_time("ATTENDANCE_START_TIME", "09:00")
+# Archival of closed months: Default 03:30 IST
+TIME_ARCHIVE = get_scheduler_time("ARCHIVE_TIME", "03:30")
 
 class Scheduler(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # One run of a job at a time (a catch-up and the live loop could otherwise overlap)
+        self._job_locks = {job: asyncio.Lock() for job in ("auto-drop", "auto-absent", "daily-export")}
+        self.leader_heartbeat_task.start()
         self.auto_absent_task.start()
         self.daily_export_task.start()
         self.auto_drop_task.start()
-        self.shift_start_task.start()
-        print(f"[Scheduler] Tasks started. Auto-Absent: {TIME_AUTO_ABSENT}, Export: {TIME_DAILY_EXPORT}, Auto-Drop: {TIME_AUTO_DROP}, Shift-Start: {TIME_SHIFT_START}")
+        self.sheets_outbox_task.start()
+        self.archive_task.start()
+        print(f"[Scheduler] Tasks started. Auto-Absent: {TIME_AUTO_ABSENT}, Export: {TIME_DAILY_EXPORT}, Auto-Drop: {TIME_AUTO_DROP}")
+
+    @staticmethod
+    def _humans(guild):
+        return [member for member in guild.members if not member.bot]
+
+    @staticmethod
+    def _member_key(member):
+        return str(member.id)
+
+    def _skip_if_standby(self, job_name):
+        """Batch jobs only run on the lease holder (see LeaderService)."""
+        if LeaderService.is_leader():
+            return False
+        print(f"[Scheduler] Skipping {job_name}: this instance is a standby.")
+        return True
+
+    def _export_guilds(self):
+        target_guild_id = os.getenv("TARGET_GUILD_ID")
+        guilds = []
+        for guild in self.bot.guilds:
+            print(f"[Scheduler] Checking guild: {guild.name} ({guild.id})")
+            # Filter Guild
+            if target_guild_id and str(guild.id) != str(target_guild_id):
+                continue
+            guilds.append(guild)
+        return guilds
 
     def cog_unload(self):
+        self.leader_heartbeat_task.cancel()
+        self.bot.loop.create_task(LeaderService.release())
         self.auto_absent_task.cancel()
         self.daily_export_task.cancel()
         self.auto_drop_task.cancel()
-        self.shift_start_task.cancel()
-    
-    @tasks.loop(time=TIME_AUTO_DROP)
-    async def auto_drop_task(self):
-        now = get_ist_time()
-        
-        # Skip Weekends
-        if now.weekday() >= 5:
-            return
+        self.sheets_outbox_task.cancel()
+        self.archive_task.cancel()
+        # Only if this process used Sheets (the module, with gspread, is imported on first use)
+        sheets = sys.modules.get("services.google_sheets_service")
+        if sheets:
+            sheets.GoogleSheetsService.executor.shutdown()
 
-        print(f"[Scheduler] Running Auto-Drop for {now.strftime('%Y-%m-%d')}...")
-        
-        for guild in self.bot.guilds:
-            dropped_users = []
-            failed_users = []
-            
-            for member in guild.members:
-                if member.bot: continue
-                
-                try:
-                    # Attempt Auto Drop
-                    result = await AttendanceService.auto_drop(member, guild.id)
+    async def run_auto_drop(self, day, guilds=None, catch_up=False):
+        """Auto-drops everyone still present on `day`. Replays end the day at the scheduled drop time."""
+        date_str = day.strftime('%Y-%m-%d')
+        at = JobLedgerService.scheduled_at(day, TIME_AUTO_DROP) if catch_up else None
+        label = f" (catch-up for {date_str})" if catch_up else ""
+        print(f"[Scheduler] Running Auto-Drop for {date_str}...")
+
+        async with self._job_locks["auto-drop"]:
+            for guild in guilds or self.bot.guilds:
+                async def drop(member, guild=guild):
+                    result = await AttendanceService.auto_drop(member, guild.id, date_str=date_str, at=at)
                     if result['success']:
                         print(f"[Scheduler] {result['message']} (Guild: {guild.name})")
-                        dropped_users.append(member.display_name)
-                except Exception as e:
-                    print(f"[Scheduler] Error auto-dropping {member.display_name}: {e}")
-                    failed_users.append(f"{member.display_name} ({str(e)})")
-            
-            # Send Notification if users were dropped
-            if dropped_users:
-                user_list_str = ", ".join(dropped_users)
-                message = f"🕰️ **Auto-Drop Summary**: The following users were auto-dropped: {user_list_str}"
-                
-                # Find Channel
-                channel = get_log_channel(guild)
-                     
-                if channel:
-                    try:
-                        await channel.send(message)
-                    except Exception as e:
-                        print(f"[Scheduler] Failed to send log to channel: {e}")
-                else:
-                    print(f"[Scheduler] No channel found to log auto-drops. (Msg: {message})")
-            
-            # Send Notification if failures occurred
-            if failed_users:
-                error_msg = f"⚠️ **Auto-Drop Failures**: Could not drop the following users:\n" + "\n".join([f"- {u}" for u in failed_users])
+                    return result['success']
+
+                summary = await JobLedgerService.run(
+                    "auto-drop", guild.id, date_str, self._humans(guild), drop,
+                    key=self._member_key, describe=lambda m: m.display_name
+                )
+
+                dropped_users = [m.display_name for m, ok in summary['results'] if ok]
+                failed_users = [f"{m.display_name} ({str(e)})" for m, e in summary['errors']]
                 channel = get_log_channel(guild)
-                if channel:
-                    await channel.send(error_msg)
 
-    @tasks.loop(time=TIME_AUTO_ABSENT)
-    async def auto_absent_task(self):
-        now = get_ist_time()
-        
-        # Skip Weekends (Sat=5, Sun=6)
-        if now.weekday() >= 5:
-            print(f"[Scheduler] Skipping Auto-Absent for {now.strftime('%Y-%m-%d')} (Weekend).")
-            return
- 
-        print(f"[Scheduler] Running Auto-Absent for {now.strftime('%Y-%m-%d')}...")
-        today_str = now.strftime('%Y-%m-%d')
-        
-        
-        for guild in self.bot.guilds:
-            absent_users = []
-            failed_users = []
-            
-            for member in guild.members:
-                if member.bot: continue
-                
-                # Check Attendance
-                try:
-                    record = await AttendanceModel.find_by_date(member.id, guild.id, today_str)
-                    
+                # Send Notification if users were dropped
+                if dropped_users:
+                    user_list_str = ", ".join(dropped_users)
+                    message = f"🕰️ **Auto-Drop Summary**{label}: The following users were auto-dropped: {user_list_str}"
+
+                    if channel:
+                        NotificationService.notify(channel, message)
+                    else:
+                        print(f"[Scheduler] No channel found to log auto-drops. (Msg: {message})")
+
+                # Send Notification if failures occurred
+                if failed_users:
+                    error_msg = f"⚠️ **Auto-Drop Failures**{label}: Could not drop the following users:\n" + "\n".join([f"- {u}" for u in failed_users])
+                    NotificationService.notify(channel, error_msg)
+
+    async def run_auto_absent(self, day, guilds=None, catch_up=False):
+        """Marks everyone without an attendance record on `day` as absent."""
+        date_str = day.strftime('%Y-%m-%d')
+        label = f" (catch-up for {date_str})" if catch_up else ""
+        print(f"[Scheduler] Running Auto-Absent for {date_str}...")
+
+        async with self._job_locks["auto-absent"]:
+            for guild in guilds or self.bot.guilds:
+                async def mark_if_missing(member, guild=guild):
+                    record = await AttendanceModel.find_by_date(member.id, guild.id, date_str)
+
                     # If NO record exists, mark absent
-                    if not record:
-                        print(f"[Scheduler] Marking {member.display_name} (ID: {member.id}) as Absent.")
-                        await AttendanceService.mark_absent(
-                            user_id=member.id,
-                            user_name=member.display_name,
-                            guild_id=guild.id,
-                            date_str=today_str,
-                            reason="Auto-Absent (End of Day)"
-                        )
-                        absent_users.append(member.display_name)
-                except Exception as e:
-                    print(f"[Scheduler] Error processing {member.display_name}: {e}")
-                    failed_users.append(f"{member.display_name} ({str(e)})")
-            
-            channel = get_log_channel(guild)
-            
-            # Send Notification
-            if absent_users:
-                if channel:
+                    if record:
+                        return False
+                    print(f"[Scheduler] Marking {member.display_name} (ID: {member.id}) as Absent.")
+                    result = await AttendanceService.mark_absent(
+                        user_id=member.id,
+                        user_name=member.display_name,
+                        guild_id=guild.id,
+                        date_str=date_str,
+                        reason="Auto-Absent (End of Day)",
+                        allow_past=catch_up
+                    )
+                    return result['success']
+
+                summary = await JobLedgerService.run(
+                    "auto-absent", guild.id, date_str, self._humans(guild), mark_if_missing,
+                    key=self._member_key, describe=lambda m: m.display_name
+                )
+
+                absent_users = [m.display_name for m, marked in summary['results'] if marked]
+                failed_users = [f"{m.display_name} ({str(e)})" for m, e in summary['errors']]
+
+                channel = get_log_channel(guild)
+
+                # Send Notification
+                if absent_users:
                     user_list = ", ".join(absent_users)
-                    await channel.send(f"📉 **Auto-Absent Summary**: The following users were marked absent: {user_list}")
+                    NotificationService.notify(channel, f"📉 **Auto-Absent Summary**{label}: The following users were marked absent: {user_list}")
+
+                # Send Failure Notification
+                if failed_users:
+                    error_msg = f"⚠️ **Auto-Absent Failures**{label}: Could not mark the following users:\n" + "\n".join([f"- {u}" for u in failed_users])
+                    NotificationService.notify(channel, error_msg)
+
+    async def run_daily_export(self, day, guilds=None, profile="analytics"):
+        """
+        Queues `day`'s data for every guild in the outbox, then writes it to Google Sheets in one go.
+        Catch-up passes profile="primary": it exports drops/absences it has just written.
+        """
+        from services.export_service import ExportService
 
-            # Send Failure Notification
-            if failed_users:
-                if channel:
-                    error_msg = f"⚠️ **Auto-Absent Failures**: Could not mark the following users:\n" + "\n".join([f"- {u}" for u in failed_users])
-                    await channel.send(error_msg)
+        date_str = day.strftime('%Y-%m-%d')
+        day_dt = IST.localize(datetime(day.year, day.month, day.day))
 
-                if channel:
-                    error_msg = f"⚠️ **Auto-Absent Failures**: Could not mark the following users:\n" + "\n".join([f"- {u}" for u in failed_users])
-                    await channel.send(error_msg)
+        async def enqueue(guild):
+            print(f"[Scheduler] Exporting data for {guild.name} ({date_str})...")
+            rows = await ExportService.fetch_activity_data(guild, date_str, date_str, profile=profile)
+            # Persist first, then write: a failed write stays in the outbox and is retried
+            return await SheetsSyncService.enqueue_export(guild.id, rows, day_dt)
 
-    @tasks.loop(time=TIME_SHIFT_START)
-    async def shift_start_task(self):
+        async with self._job_locks["daily-export"]:
+            exported, errors = [], []
+            for guild in guilds or self._export_guilds():
+                summary = await JobLedgerService.run(
+                    "daily-export", guild.id, date_str, [guild], enqueue,
+                    key=lambda g: str(g.id), describe=lambda g: g.name
+                )
+                exported.extend(g for g, _ in summary['results'])
+                errors.extend(summary['errors'])
+
+            # One coalesced write for every guild's data
+            result = await SheetsSyncService.drain()
+
+        for guild, e in errors:
+            NotificationService.notify(get_log_channel(guild), f"⚠️ **Daily Export Error**: {str(e)}")
+
+        for guild in exported:
+            channel = get_log_channel(guild)
+            if guild.id not in result['failed_guilds']:
+                print(f"[Scheduler] Export Success for {guild.name}: {result['written']} entries written")
+                NotificationService.notify(channel, f"📊 **Daily Export**: Data for **{date_str}** has been successfully updated in Google Sheets.")
+            else:
+                 print(f"[Scheduler] Export Failed for {guild.name}: {result['error']}")
+                 NotificationService.notify(channel, f"⚠️ **Daily Export Delayed**: {result['error']}\nThe data is queued and will be retried automatically (up to {SheetsSyncService.MAX_ATTEMPTS} attempts).")
+
+    async def catch_up_missed_runs(self):
         """
-        Runs at the start of the work day (e.g. 9 AM).
-        Checks for users who are in 'pre_shift' overtime and switches them to Regular.
+        Replays scheduled runs that were missed while no instance was leading (restart, outage).
+        Days are replayed oldest first, and within a day in the usual order (drop, absent, export),
+        so each export sees that day's drops and absences.
         """
+        current_priority.set(PRIORITY_SCHEDULED)
+        now = get_ist_time()
+        jobs = [
+            # (job, scheduled time, days after the data date, weekdays only)
+            ("auto-drop", TIME_AUTO_DROP, 0, True),
+            ("auto-absent", TIME_AUTO_ABSENT, 0, True),
+            ("daily-export", TIME_DAILY_EXPORT, 1, False),
+        ]
+        export_guild_ids = {g.id for g in self._export_guilds()}
+
+        plan = {}  # day -> job -> [guild]
+        for job, scheduled_time, offset, weekdays_only in jobs:
+            for guild in self.bot.guilds:
+                if job == "daily-export" and guild.id not in export_guild_ids:
+                    continue
+                for day in await JobLedgerService.missed_dates(job, guild.id, scheduled_time, now, offset, weekdays_only):
+                    plan.setdefault(day, {}).setdefault(job, []).append(guild)
+
+        if not plan:
+            print("[Scheduler] No missed runs to catch up.")
+            return
+
+        for day in sorted(plan):
+            runs = plan[day]
+            print(f"[Scheduler] Catching up {', '.join(runs)} for {day}...")
+            try:
+                if "auto-drop" in runs:
+                    await self.run_auto_drop(day, runs["auto-drop"], catch_up=True)
+                if "auto-absent" in runs:
+                    await self.run_auto_absent(day, runs["auto-absent"], catch_up=True)
+                if "daily-export" in runs:
+                    await self.run_daily_export(day, runs["daily-export"], profile="primary")
+            except Exception as e:
+                print(f"[Scheduler] Catch-up for {day} failed: {e}")
+                return
+    
+    @tasks.loop(time=TIME_AUTO_DROP)
+    async def auto_drop_task(self):
+        if self._skip_if_standby("Auto-Drop"):
+            return
         now = get_ist_time()
-        print(f"[Scheduler] Running Shift-Start Check for {now.strftime('%Y-%m-%d')}...")
         
         # Skip Weekends
         if now.weekday() >= 5:
             return
 
-        switched_users = []
-        
-        # Snapshot of keys to avoid modification during iteration
-        active_ids = list(VoiceService.active_sessions.keys())
+        await self.run_auto_drop(now.date())
+
+    @tasks.loop(time=TIME_AUTO_ABSENT)
+    async def auto_absent_task(self):
+        if self._skip_if_standby("Auto-Absent"):
+            return
+        now = get_ist_time()
         
-        for member_id in active_ids:
-            session = VoiceService.active_sessions.get(member_id)
-            if not session: continue
-            
-            if session.get('overtime_reason') == 'pre_shift':
-                guild_id = session['guild_id']
-                guild = self.bot.get_guild(guild_id)
-                if not guild: continue
-                
-                member = guild.get_member(member_id)
-                channel = guild.get_channel(session['channel_id'])
-                
-                if member and channel:
-                    try:
-                        # 1. End Overtime Session
-                        await VoiceService.end_session(member, channel, reason="shift_start")
-                        # 2. Start Regular Session
-                        # Since it is now >= 9 AM, start_session will not mark it as pre_shift
-                        await VoiceService.start_session(member, channel)
-                        
-                        switched_users.append(member.display_name)
-                        print(f"[Scheduler] Switched {member.display_name} from Pre-Shift OT to Regular.")
-                        
-                    except Exception as e:
-                        print(f"[Scheduler] Error switching session for {member.display_name}: {e}")
-
-        # Notification
-        if switched_users:
-            # Group by Guild to be polite? Or just send to relevant guild logs.
-            # Simplified: finding first guild found in loop? No, iterating global users.
-            # Ideally map users to guilds and send batch messages.
-            # Since we have guild object inside...
-            
-            # Simple approach: Log to console mainly, maybe find first guild log.
-            # Or iterate set of guilds affected.
-            user_list = ", ".join(switched_users)
-            print(f"[Scheduler] Shift Start Summary: Switched {len(switched_users)} users: {user_list}")
+        # Skip Weekends (Sat=5, Sun=6)
+        if now.weekday() >= 5:
+            print(f"[Scheduler] Skipping Auto-Absent for {now.strftime('%Y-%m-%d')} (Weekend).")
+            return
+
+        await self.run_auto_absent(now.date())
 
     @tasks.loop(time=TIME_DAILY_EXPORT)
     async def daily_export_task(self):
+        if self._skip_if_standby("Daily Export"):
+            return
         print("[Scheduler] Running Daily Export Task...")
-        target_guild_id = os.getenv("TARGET_GUILD_ID")
-        
-        now = get_ist_time()
-        yesterday = now - timedelta(days=1)
-        yesterday_str = yesterday.strftime('%Y-%m-%d')
-        
-        for guild in self.bot.guilds:
-            print(f"[Scheduler] Checking guild: {guild.name} ({guild.id})")
-            # Filter Guild
-            if target_guild_id and str(guild.id) != str(target_guild_id):
-                continue
-            
-            channel = get_log_channel(guild)
+        # Scheduled exports go ahead of ad-hoc commands in the Sheets quota queue
+        current_priority.set(PRIORITY_SCHEDULED)
+        LoopLagMonitor.reset()
 
-            try:
-                print(f"[Scheduler] Exporting data for {guild.name} ({yesterday_str})...")
-                rows = await ExportService.fetch_activity_data(guild, yesterday_str, yesterday_str)
-                result = await GoogleSheetsService.append_daily_stats(rows, yesterday)
-                
-                if result['success']:
-                    print(f"[Scheduler] Export Success: {result['message']}")
-                    if channel:
-                        await channel.send(f"📊 **Daily Export**: Data for **{yesterday_str}** has been successfully updated in Google Sheets.")
-                else:
-                     print(f"[Scheduler] Export Failed: {result['message']}")
-                     if channel:
-                        await channel.send(f"⚠️ **Daily Export Failed**: {result['message']}")
+        yesterday = get_ist_time() - timedelta(days=1)
+        await self.run_daily_export(yesterday.date())
 
-            except Exception as e:
-                print(f"[Scheduler] Error exporting for {guild.name}: {e}")
-                if channel:
-                    await channel.send(f"⚠️ **Daily Export Error**: {str(e)}")
+        lag = LoopLagMonitor.snapshot()
+        print(f"[Scheduler] Event-loop lag during export: max {lag['max_ms']}ms, avg {lag['avg_ms']}ms ({lag['samples']} samples)")
+        from services.google_sheets_service import GoogleSheetsService
+        print(f"[Scheduler] Sheets quota headroom: {GoogleSheetsService.quota_summary()}")
+
+    @tasks.loop(seconds=int(os.getenv("SHEETS_OUTBOX_INTERVAL", "60")))
+    async def sheets_outbox_task(self):
+        """Retries pending Google Sheets writes (see SheetsSyncService)."""
+        if not LeaderService.is_leader():
+            return
+        current_priority.set(PRIORITY_SCHEDULED)
+        try:
+            await SheetsSyncService.drain()
+        except Exception as e:
+            print(f"[Scheduler] Error draining Sheets outbox: {e}")
+
+    @tasks.loop(time=TIME_ARCHIVE)
+    async def archive_task(self):
+        """Moves closed months into compressed archive buckets (see ArchiveService)."""
+        if self._skip_if_standby("Archive"):
+            return
+        try:
+            await ArchiveService.archive_closed_months()
+        except Exception as e:
+            print(f"[Scheduler] Error archiving closed months: {e}")
+
+    @tasks.loop(seconds=LeaderService.RENEW_INTERVAL)
+    async def leader_heartbeat_task(self):
+        was_leader = LeaderService.is_leader()
+        if await LeaderService.heartbeat() and not was_leader:
+            # Just took over (startup or failover): replay whatever the previous leader missed
+            self.bot.loop.create_task(self.catch_up_missed_runs())
 
     @auto_absent_task.before_loop
     async def before_auto_absent(self):
@@ -258,8 +339,16 @@ class Scheduler(commands.Cog):
     async def before_auto_drop(self):
         await self.bot.wait_until_ready()
 
-    @shift_start_task.before_loop
-    async def before_shift_start(self):
+    @leader_heartbeat_task.before_loop
+    async def before_leader_heartbeat(self):
+        await self.bot.wait_until_ready()
+
+    @archive_task.before_loop
+    async def before_archive(self):
+        await self.bot.wait_until_ready()
+
+    @sheets_outbox_task.before_loop
+    async def before_sheets_outbox(self):
         await self.bot.wait_until_ready()
 
 async def setup(bot):
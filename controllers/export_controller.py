@@ -1,36 +1,56 @@
 import discord
 from datetime import datetime, timedelta
-from services.export_service import ExportService
 from utils.time_utils import get_ist_time
 
 class ExportController:
     @staticmethod
-    async def download_csv(interaction: discord.Interaction, start_date: str = None, end_date: str = None):
-        await interaction.response.defer(ephemeral=False)
-        
+    async def _resolve_range(interaction: discord.Interaction, start_date, end_date, default):
+        """
+        Fills in missing dates and validates the range for /csv, /parquet and /sheet.
+        default="month": the current month; default="yesterday": yesterday only (matches the scheduler).
+        Returns (start_date, end_date, start datetime), or None after telling the user what is wrong.
+        """
         now = get_ist_time()
-        
-        # Default: Current Month
-        if not start_date:
-            start_date = now.replace(day=1).strftime('%Y-%m-%d')
-        if not end_date:
-            # End of current month logic
-            # (First day of next month - 1 day)
-            next_month = now.replace(day=28) + timedelta(days=4)
-            last_day = next_month - timedelta(days=next_month.day)
-            end_date = last_day.strftime('%Y-%m-%d')
-            
+
+        if default == "month":
+            if not start_date:
+                start_date = now.replace(day=1).strftime('%Y-%m-%d')
+            if not end_date:
+                # End of current month logic
+                # (First day of next month - 1 day)
+                next_month = now.replace(day=28) + timedelta(days=4)
+                last_day = next_month - timedelta(days=next_month.day)
+                end_date = last_day.strftime('%Y-%m-%d')
+        else:
+            if not start_date:
+                yesterday = now - timedelta(days=1)
+                start_date = yesterday.strftime('%Y-%m-%d')
+            if not end_date:
+                end_date = start_date # Default to single day if only start_date provided or both missing
+
         # Validation
         try:
             s_dt = datetime.strptime(start_date, '%Y-%m-%d')
             e_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            if s_dt > e_dt:
-                await interaction.followup.send("❌ Start date cannot be after End date.", ephemeral=False)
-                return
         except ValueError:
             await interaction.followup.send("❌ Invalid date format. Please use YYYY-MM-DD.", ephemeral=False)
+            return None
+        if s_dt > e_dt:
+            await interaction.followup.send("❌ Start date cannot be after End date.", ephemeral=False)
+            return None
+        return start_date, end_date, s_dt
+
+    @staticmethod
+    async def download_csv(interaction: discord.Interaction, start_date: str = None, end_date: str = None):
+        # Imported on first use: keeps the export code out of startup
+        from services.export_service import ExportService
+
+        await interaction.response.defer(ephemeral=False)
+        
+        dates = await ExportController._resolve_range(interaction, start_date, end_date, "month")
+        if not dates:
             return
+        start_date, end_date, _ = dates
 
         try:
             files = await ExportService.generate_csv_reports(interaction.guild, start_date, end_date)
@@ -39,34 +59,39 @@ class ExportController:
             print(f"[ExportController] Error: {e}")
             await interaction.followup.send("❌ An error occurred while generating the CSV.", ephemeral=False)
 
+    @staticmethod
+    async def download_parquet(interaction: discord.Interaction, start_date: str = None, end_date: str = None):
+        from services.export_service import ExportService
+
+        await interaction.response.defer(ephemeral=False)
+
+        dates = await ExportController._resolve_range(interaction, start_date, end_date, "month")
+        if not dates:
+            return
+        start_date, end_date, _ = dates
+
+        try:
+            file = await ExportService.generate_parquet_report(interaction.guild, start_date, end_date)
+            await interaction.followup.send(content=f"📦 **Activity Data (Parquet)**\n📅 {start_date} to {end_date}", file=file, ephemeral=False)
+        except ImportError:
+            await interaction.followup.send("❌ Parquet export requires `pyarrow`. Please install it on the bot host.", ephemeral=False)
+        except Exception as e:
+            print(f"[ExportController] Error: {e}")
+            await interaction.followup.send("❌ An error occurred while generating the Parquet file.", ephemeral=False)
+
     @staticmethod
     async def export_to_sheets(interaction: discord.Interaction, start_date: str = None, end_date: str = None, sheet_id: str = None):
+        from services.export_service import ExportService
+
         await interaction.response.defer(ephemeral=False)
         
-        now = get_ist_time()
-        
-        # Default: Yesterday (to match scheduler behavior)
-        if not start_date:
-            yesterday = now - timedelta(days=1)
-            start_date = yesterday.strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = start_date # Default to single day if only start_date provided or both missing
-            
-        # Validation
-        try:
-            s_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            e_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            if s_dt > e_dt:
-                await interaction.followup.send("❌ Start date cannot be after End date.", ephemeral=False)
-                return
-        except ValueError:
-            await interaction.followup.send("❌ Invalid date format. Please use YYYY-MM-DD.", ephemeral=False)
+        dates = await ExportController._resolve_range(interaction, start_date, end_date, "yesterday")
+        if not dates:
             return
+        start_date, end_date, s_dt = dates
 
         try:
             import os
-            from services.google_sheets_service import GoogleSheetsService
             
             # If sheet_id is provided, create a NEW worksheet in that sheet
             if sheet_id:
@@ -76,15 +101,15 @@ class ExportController:
                 else:
                     await interaction.followup.send(content=f"❌ Failed to export: {result['message']}", ephemeral=False)
             else:
-                # If NO sheet_id, sync to the MAIN tracker tabs (append logic)
+                # If NO sheet_id, sync to the MAIN tracker tabs via the outbox.
+                # The write happens in the background (and is retried), so the interaction isn't held open.
+                from services.sheets_sync_service import SheetsSyncService
                 data = await ExportService.fetch_activity_data(interaction.guild, start_date, end_date)
-                # Use s_dt for year/month context in append_daily_stats
-                result = await GoogleSheetsService.append_daily_stats(data, s_dt)
+                queued = await SheetsSyncService.enqueue_export(interaction.guild.id, data, s_dt)
+                SheetsSyncService.schedule_drain()
                 
-                if result['success']:
-                    await interaction.followup.send(content=f"✅ **Sync Success**: Data from {start_date} to {end_date} has been appended to the main tracker.", ephemeral=False)
-                else:
-                    await interaction.followup.send(content=f"❌ **Sync Failed**: {result['message']}", ephemeral=False)
+                from services.google_sheets_service import GoogleSheetsService
+                await interaction.followup.send(content=f"✅ **Sync Queued**: {queued} tab-day(s) from {start_date} to {end_date} will be written to the main tracker shortly.\n-# Sheets quota headroom: {GoogleSheetsService.quota_summary()}", ephemeral=False)
                     
         except Exception as e:
             import traceback
@@ -1,5 +1,6 @@
 import discord
 from services.general_service import GeneralService
+from services.maintenance_service import MaintenanceService
 from controllers.attendance_controller import AttendanceController
 
 class GeneralController:
@@ -14,6 +15,36 @@ class GeneralController:
 
     # General Logic
 
+    @staticmethod
+    async def update_stats(interaction: discord.Interaction, full: bool = False):
+        """Starts the global stats recompute in the background and edits one status message as it progresses."""
+        mode = "full rebuild" if full else "incremental"
+        await interaction.response.send_message(f"⏳ **Sync Started** ({mode}): Recomputing global stats...")
+        status = await interaction.original_response()
+        lines = []
+
+        async def progress(text):
+            lines.append(f"- {text}")
+            await status.edit(content="⏳ **Sync Running**\n" + "\n".join(lines))
+
+        async def on_done(stats, error):
+            try:
+                if error:
+                    await status.edit(content=f"❌ **Sync Failed**: {error}")
+                    return
+                bhai, voice = stats['bhai'], stats['voice']
+                await status.edit(content=(
+                    f"✅ **Sync Complete** ({stats['mode']}, settled through {stats['settled_through']}) in {stats['elapsed']}s\n"
+                    f"- Bhai Counts: {bhai['matched']} matched, {bhai['modified']} modified, {bhai['upserted']} new\n"
+                    f"- Voice Stats: {voice['matched']} matched, {voice['modified']} modified, {voice['upserted']} new"
+                ))
+            except Exception as e:
+                # The interaction token expires after 15 minutes
+                print(f"[GeneralController] Could not report sync result: {e}")
+
+        if not MaintenanceService.start_sync_global_stats(full, progress, on_done):
+            await status.edit(content="⚠️ A stats sync is already running. Try again when it finishes.")
+
     @staticmethod
     async def bhai_count(interaction: discord.Interaction, user: discord.Member, leaderboard_view: str):
         if leaderboard_view:
@@ -86,12 +117,13 @@ class GeneralController:
             "`/away [reason]` - Set status to Away\n"
             "`/resume` - Resume activity (Active)\n"
             "`/bhai-count [user] [leaderboard]` - Check stats or Leaderboard (Top 5, Lower 5, All)\n"
-            "`/update` - (Admin) Sync global stats from history"
+            "`/update [mode]` - (Admin) Sync global stats (Incremental or Full Rebuild)"
         ), inline=False)
         
         # Export
         embed.add_field(name="📂 Export", value=(
             "`/csv [start] [end]` - Download Activity Report\n"
+            "`/parquet [start] [end]` - Download typed data for analytics\n"
             "`/sync [start] [end]` - Manual Google Sheets Sync\n"
             "`/sheet [id] [start] [end]` - Export to new/specific Sheet"
         ), inline=False)
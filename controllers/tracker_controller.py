@@ -30,7 +30,7 @@ class TrackerController:
         today_str = now.strftime('%Y-%m-%d')
         
         # 1. Fetch Attendance
-        attendance_log = await AttendanceModel.find_by_date(target.id, guild.id, today_str)
+        attendance_log = await AttendanceModel.find_by_date(target.id, guild.id, today_str, cached=True)
         att_status = "Not Marked"
         if attendance_log:
              s = attendance_log.get('attendance_status', 'Unknown')
@@ -39,13 +39,12 @@ class TrackerController:
 
         # 2. Fetch Voice Stats
         today_date = now.date()
-        voice_data = await VoiceModel.get_stats(target.id, guild.id, today_str, today_str)
+        doc = await VoiceModel.get_day(target.id, guild.id, today_str, cached=True)
         
         total_voice_sec = 0
         total_overtime_sec = 0
         
-        if voice_data:
-            doc = voice_data[0]
+        if doc:
             total_voice_sec = doc.get('total_duration', 0)
             total_overtime_sec = doc.get('overtime_duration', 0)
             
@@ -1,6 +1,6 @@
-import json
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from bson import json_util
 
 GUILD_ID = 1430929869860245649
 USERS = [
@@ -10,18 +10,32 @@ USERS = [
 ]
 START_DATE = datetime(2025, 12, 10)
 DAYS_COUNT = 5
+IST = timezone(timedelta(hours=5, minutes=30))
 
+# Same shape as the bot writes (schema version 3, see database/migrations.py): daily documents
+# keyed by an integer `day` (YYYYMMDD), native datetimes, attendance commands in their own log
 daily_activity_data = []
 daily_logs_data = []
+attendance_events_data = []
 
 channels = ["General", "Dev", "Gaming", "Music"]
 
+def add_event(user, day, command, at, **extra):
+    attendance_events_data.append({
+        "user_id": user["id"],
+        "guild_id": GUILD_ID,
+        "day": day,
+        "command": command,
+        "ts": at.astimezone(timezone.utc),
+        **extra
+    })
+
 for i in range(DAYS_COUNT):
     current_date = START_DATE + timedelta(days=i)
-    date_str = current_date.strftime("%Y-%m-%d")
+    day = int(current_date.strftime("%Y%m%d"))
     
-    # Base start time: 10:00 AM IST approx
-    base_time = current_date.replace(hour=10, minute=0, second=0)
+    # Base start time: 10:00 AM IST
+    base_time = current_date.replace(hour=10, minute=0, second=0, tzinfo=IST)
 
     for user in USERS:
         # --- Daily Logs (Attendance) ---
@@ -38,44 +52,22 @@ for i in range(DAYS_COUNT):
         lunch_duration = random.randint(30, 60) if has_lunch else 0
         lunch_end = lunch_start + timedelta(minutes=lunch_duration) if has_lunch else None
         
-        commands = []
-        
         # Present
-        present_cmd = {
-            "timestamp": start_dt.isoformat() + "+05:30",
-            "command": "present",
-            "end_time": end_dt.isoformat() + "+05:30",
-            "duration": round((end_dt - start_dt).total_seconds(), 2)
-        }
-        commands.append(present_cmd)
+        add_event(user, day, "present", start_dt)
         
         if has_lunch:
-            lunch_cmd = {
-                "command": "lunch",
-                "timestamp": lunch_start.isoformat() + "+05:30",
-                "duration": round(lunch_duration * 60, 2),
-                "end_time": lunch_end.isoformat() + "+05:30"
-            }
-            resume_cmd = {
-                "command": "resume",
-                "timestamp": lunch_end.isoformat() + "+05:30"
-            }
-            commands.append(lunch_cmd)
-            commands.append(resume_cmd)
+            add_event(user, day, "lunch", lunch_start)
+            # Break and work durations are recorded on the event that closes them
+            add_event(user, day, "resume", lunch_end, duration=round(lunch_duration * 60, 2))
             
         # Drop
-        drop_cmd = {
-            "command": "drop",
-            "timestamp": end_dt.isoformat() + "+05:30"
-        }
-        commands.append(drop_cmd)
+        add_event(user, day, "drop", end_dt, duration=round((end_dt - start_dt).total_seconds(), 2))
         
         log_entry = {
-            "date": date_str,
+            "day": day,
             "guild_id": GUILD_ID,
             "user_id": user["id"],
             "attendance_status": "Present",
-            "commands_used": commands,
             "user_name": user["name"]
         }
         daily_logs_data.append(log_entry)
@@ -101,8 +93,8 @@ for i in range(DAYS_COUNT):
             
             session = {
                 "channel_name": random.choice(channels),
-                "start_time": curr_voice_time.isoformat() + "+00:00", # Using UTC format sim
-                "end_time": s_end.isoformat() + "+00:00",
+                "start_time": curr_voice_time.astimezone(timezone.utc),
+                "end_time": s_end.astimezone(timezone.utc),
                 "duration": round(duration, 2),
                 "disconnect": random.choice(["left", "hopped", "auto-disconnect"]),
                 "status": "regular"
@@ -121,8 +113,8 @@ for i in range(DAYS_COUNT):
             
             ot_session = {
                 "channel_name": "Gaming",
-                "start_time": ot_start.isoformat() + "+00:00",
-                "end_time": ot_end.isoformat() + "+00:00",
+                "start_time": ot_start.astimezone(timezone.utc),
+                "end_time": ot_end.astimezone(timezone.utc),
                 "duration": round(ot_dur, 2),
                 "disconnect": "left",
                 "status": "overtime"
@@ -131,7 +123,7 @@ for i in range(DAYS_COUNT):
             overtime_duration += ot_dur
             
         activity_entry = {
-            "date": date_str,
+            "day": day,
             "guild_id": GUILD_ID,
             "user_id": user["id"],
             "sessions": sessions,
@@ -141,11 +133,15 @@ for i in range(DAYS_COUNT):
         }
         daily_activity_data.append(activity_entry)
 
-# Write to files
-with open("dummy_daily_activity.json", "w") as f:
-    json.dump(daily_activity_data, f, indent=2)
-    
-with open("dummy_daily_logs.json", "w") as f:
-    json.dump(daily_logs_data, f, indent=2)
+# Write to files as MongoDB Extended JSON, so datetimes import as dates:
+# mongoimport --jsonArray --collection daily_logs --file dummy_daily_logs.json
+files = {
+    "dummy_daily_activity.json": daily_activity_data,
+    "dummy_daily_logs.json": daily_logs_data,
+    "dummy_attendance_events.json": attendance_events_data
+}
+for name, data in files.items():
+    with open(name, "w") as f:
+        f.write(json_util.dumps(data, indent=2, json_options=json_util.RELAXED_JSON_OPTIONS))
 
 print("Data generated successfully.")
@@ -1,28 +1,143 @@
+import os
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
 from config.settings import MONGO_URI, DB_NAME
 
+def _int_env(key, default):
+    value = os.getenv(key)
+    return int(value) if value else default
+
 class Database:
+    # "mongo" (default) or "sqlite" (embedded, single process; MongoDB-only features are disabled)
+    BACKEND = os.getenv("STORAGE_BACKEND", "mongo").strip().lower()
+    SQLITE_PATH = os.getenv("SQLITE_PATH", "activity_tracker.db")
+
     client: AsyncIOMotorClient = None
     db = None
+    sqlite = None
+    _repositories = {}
+    # Read-preference profiles: "primary" for hot paths that must read their own writes,
+    # "analytics" for reports and leaderboards (may lag the primary by up to max staleness)
+    PROFILES = ("primary", "analytics")
+    _profile_dbs = {}
+
+    @staticmethod
+    def read_preference(profile):
+        if profile == "analytics":
+            # The driver rejects max staleness below 90 seconds
+            staleness = max(90, _int_env("MONGO_ANALYTICS_MAX_STALENESS", 120))
+            return SecondaryPreferred(max_staleness=staleness)
+        return Primary()
+
+    @staticmethod
+    def client_options():
+        """Pool, compression and timeout settings (all overridable via env)."""
+        options = {
+            "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 50),
+            "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 2),
+            # zstd needs the `zstandard` package (in requirements), zlib is built in.
+            # snappy also needs `python-snappy`; listing it without that installed makes the driver warn
+            "compressors": os.getenv("MONGO_COMPRESSORS", "zstd,zlib"),
+            "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+            "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 10000),
+            "appname": os.getenv("MONGO_APP_NAME", "discord-activity-tracker")
+        }
+        socket_timeout = _int_env("MONGO_SOCKET_TIMEOUT_MS", None)
+        if socket_timeout:
+            options["socketTimeoutMS"] = socket_timeout
+        return options
+
+    @classmethod
+    def is_mongo(cls):
+        return cls.BACKEND != "sqlite"
+
+    @classmethod
+    def repository(cls, name):
+        """Storage backend for a model: "attendance", "voice" or "users"."""
+        if name not in cls._repositories:
+            if cls.is_mongo():
+                from database import mongo_repository as backend
+                classes = {
+                    "attendance": backend.MongoAttendanceRepository,
+                    "voice": backend.MongoVoiceRepository,
+                    "users": backend.MongoUserRepository
+                }
+                cls._repositories[name] = classes[name]()
+            else:
+                from database import sqlite_repository as backend
+                classes = {
+                    "attendance": backend.SqliteAttendanceRepository,
+                    "voice": backend.SqliteVoiceRepository,
+                    "users": backend.SqliteUserRepository
+                }
+                cls.connect()
+                cls._repositories[name] = classes[name](cls.sqlite)
+        return cls._repositories[name]
 
     @classmethod
     def connect(cls):
+        """Creates the client. The driver connects lazily; call warmup() to connect up front."""
+        if not cls.is_mongo():
+            if cls.sqlite is None:
+                from database.sqlite_repository import SqliteEngine
+                cls.sqlite = SqliteEngine(cls.SQLITE_PATH)
+                print(f"Using embedded SQLite storage ({cls.SQLITE_PATH})")
+            return
         if cls.client is None:
-            cls.client = AsyncIOMotorClient(MONGO_URI)
+            cls.client = AsyncIOMotorClient(MONGO_URI, **cls.client_options())
             cls.db = cls.client[DB_NAME]
             print("Connected to MongoDB")
 
     @classmethod
-    def get_db(cls):
-        return cls.db
+    async def warmup(cls):
+        """
+        Opens the pool before commands are served: pings the server (fails fast if it is
+        unreachable), makes sure every collection's indexes exist, migrates stored documents
+        to the current schema and reads the hot indexes into the server's cache.
+        """
+        from database.indexes import ensure_indexes, warm_indexes
+        from database.migrations import run_migrations
+
+        cls.connect()
+        started = time.monotonic()
+        if not cls.is_mongo():
+            await cls.sqlite.open()
+            print(f"[Database] SQLite ready in {time.monotonic() - started:.2f}s")
+            return
+
+        await cls.client.admin.command("ping")
+        ping_ms = (time.monotonic() - started) * 1000
+
+        models = await ensure_indexes()
+        await run_migrations()
+        keys = await warm_indexes()
+        print(f"[Database] Warm: ping {ping_ms:.0f}ms, indexes ensured for {models} collections, {keys} index keys read in {time.monotonic() - started:.2f}s")
+
+    @classmethod
+    def get_db(cls, profile="primary"):
+        if not cls.is_mongo():
+            raise RuntimeError("This feature requires MongoDB (STORAGE_BACKEND=sqlite).")
+        if cls.db is None:
+            raise RuntimeError("Database is not connected. Call Database.connect() first.")
+        if profile == "primary":
+            return cls.db
+        if profile not in cls.PROFILES:
+            raise ValueError(f"Unknown read profile: {profile}")
+        if profile not in cls._profile_dbs:
+            cls._profile_dbs[profile] = cls.client.get_database(DB_NAME, read_preference=cls.read_preference(profile))
+        return cls._profile_dbs[profile]
 
     @classmethod
     def close(cls):
+        if cls.sqlite:
+            cls.sqlite.close()
+            cls.sqlite = None
+            cls._repositories = {}
+            print("Closed SQLite storage")
         if cls.client:
             cls.client.close()
             cls.client = None
+            cls.db = None
+            cls._profile_dbs = {}
             print("Closed MongoDB connection")
-
-# Initialize immediately for now, or lazily in app startup
-Database.connect()
-db = Database.db
@@ -0,0 +1,44 @@
+import os
+from datetime import timedelta
+
+# Days of the daily collections' indexes read at warmup
+WARM_DAYS = int(os.getenv("MONGO_WARM_DAYS", "7"))
+
+async def ensure_indexes():
+    """Creates every collection's indexes (no-op for existing ones). Returns how many models were processed."""
+    # Imported here: models import database.connection
+    from models.attendance_model import AttendanceModel
+    from models.voice_model import VoiceModel
+    from models.user_model import UserModel
+    from models.sheets_outbox_model import SheetsOutboxModel
+    from models.job_run_model import JobRunModel
+    from models.lease_model import LeaseModel
+    from models.archive_model import ArchiveModel
+
+    models = [AttendanceModel, VoiceModel, UserModel, SheetsOutboxModel, JobRunModel, LeaseModel, ArchiveModel]
+    for model in models:
+        await model.ensure_indexes()
+    return len(models)
+
+async def warm_indexes(days=WARM_DAYS):
+    """
+    Reads the hot indexes so their pages are in the server's cache before the first command:
+    the last `days` days of both daily-collection indexes (index-only counts, no documents are
+    fetched) and the top of the leaderboard index. Returns the number of index keys read.
+    """
+    from models.attendance_model import AttendanceModel
+    from models.voice_model import VoiceModel
+    from models.user_model import UserModel
+    from utils.time_utils import get_ist_time, day_key
+
+    recent = {"day": {"$gte": day_key(get_ist_time() - timedelta(days=days))}}
+    keys = 0
+    for model in (AttendanceModel, VoiceModel):
+        col = model.get_collection()
+        for index in ([("guild_id", 1), ("day", 1), ("user_id", 1)], [("day", 1)]):
+            keys += await col.count_documents(recent, hint=index)
+
+    top = UserModel.get_collection().find({}, {"_id": 0, "global_bhai_count": 1})\
+        .hint([("global_bhai_count", -1)]).sort("global_bhai_count", -1).limit(100)
+    keys += len(await top.to_list(length=100))
+    return keys
@@ -0,0 +1,186 @@
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from database.connection import Database
+from models.attendance_model import AttendanceModel
+from models.voice_model import VoiceModel
+from models.archive_model import ArchiveModel
+from models.maintenance_state_model import MaintenanceStateModel
+from utils.time_utils import day_key, parse_timestamp
+
+SCHEMA_KEY = "schema"
+BATCH_SIZE = 500
+
+# Per kind: source model, the array holding timestamped entries, and their timestamp fields
+DAILY = {
+    "attendance": (AttendanceModel, "commands_used", ["timestamp", "end_time"]),
+    "voice": (VoiceModel, "sessions", ["start_time", "end_time"])
+}
+# Indexes on `date` replaced by the `day` ones (see the repositories' ensure_indexes)
+LEGACY_INDEXES = ["guild_id_1_date_1_user_id_1", "date_1"]
+
+def upgrade_daily_doc(kind, doc):
+    """Converts one daily document to the version 2 shape, in place. Returns True if it changed."""
+    _, array, fields = DAILY[kind]
+    changed = False
+    if "date" in doc:
+        doc["day"] = day_key(doc.pop("date"))
+        changed = True
+    for entry in doc.get(array, []):
+        for field in fields:
+            if isinstance(entry.get(field), str):
+                entry[field] = datetime.fromisoformat(entry[field])
+                changed = True
+    return changed
+
+async def _index_size(col):
+    try:
+        stats = await col.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(length=1)
+        return stats[0]["storageStats"]["totalIndexSize"]
+    except (OperationFailure, IndexError, KeyError):
+        return None
+
+async def _migrate_collection(kind):
+    model, array, _ = DAILY[kind]
+    col = model.get_collection()
+    migrated = 0
+    # Converted documents drop out of the filter, so re-querying resumes where a previous run stopped
+    while True:
+        docs = await col.find({"date": {"$exists": True}}).limit(BATCH_SIZE).to_list(length=BATCH_SIZE)
+        if not docs:
+            break
+        ops = []
+        for doc in docs:
+            upgrade_daily_doc(kind, doc)
+            update = {"$set": {"day": doc["day"]}, "$unset": {"date": ""}}
+            if array in doc:
+                update["$set"][array] = doc[array]
+            ops.append(UpdateOne({"_id": doc["_id"]}, update))
+        await col.bulk_write(ops, ordered=False)
+        migrated += len(ops)
+
+    for name in LEGACY_INDEXES:
+        try:
+            await col.drop_index(name)
+        except OperationFailure:
+            pass  # Already dropped (or never created)
+    return migrated
+
+async def _migrate_archive():
+    col = ArchiveModel.get_collection()
+    buckets = 0
+    async for bucket in col.find({"totals.date": {"$exists": True}}, {"kind": 1, "guild_id": 1, "month": 1}):
+        docs = await ArchiveModel.get_docs(bucket["kind"], bucket["guild_id"], bucket["month"])
+        for doc in docs:
+            upgrade_daily_doc(bucket["kind"], doc)
+        await ArchiveModel.save_bucket(bucket["kind"], bucket["guild_id"], bucket["month"], docs)
+        buckets += 1
+    return buckets
+
+async def _native_types():
+    for kind, (model, _, _) in DAILY.items():
+        col = model.get_collection()
+        before = await _index_size(col)
+        migrated = await _migrate_collection(kind)
+        after = await _index_size(col)
+        sizes = f", index size {before} -> {after} bytes" if before is not None and after is not None else ""
+        print(f"[Migrations] {col.name}: converted {migrated} documents{sizes}.")
+
+    buckets = await _migrate_archive()
+    if buckets:
+        print(f"[Migrations] activity_archive: converted {buckets} buckets.")
+
+def legacy_events(doc):
+    """
+    Replays a daily log's legacy commands_used list as attendance events.
+    Returns (events, derived state). Break and work durations move from the closed entry
+    (end_time/duration) to the event that closed it (resume/drop), as the live code records them.
+    """
+    state, events = None, []
+    for cmd in doc.get("commands_used", []):
+        event = {k: v for k, v in cmd.items() if k not in ("timestamp", "end_time", "duration")}
+        event["ts"] = parse_timestamp(cmd["timestamp"])
+        opened = None
+        if state and event["command"] == "resume" and state.get("status") in AttendanceModel.BREAK_COMMANDS:
+            opened = state["at"]
+        elif state and event["command"] in AttendanceModel.DROP_COMMANDS and not state.get("dropped_at"):
+            opened = state.get("work_start")
+        if opened:
+            event["duration"] = round((event["ts"] - parse_timestamp(opened)).total_seconds(), 2)
+        state = AttendanceModel.fold_event(state, event)
+        events.append(event)
+    return events, state
+
+async def _attendance_events():
+    col = AttendanceModel.get_collection()
+    events_col = AttendanceModel.repo().events()
+    migrated = events = 0
+    while True:
+        docs = await col.find({"commands_used": {"$exists": True}}).limit(BATCH_SIZE).to_list(length=BATCH_SIZE)
+        if not docs:
+            break
+        event_ops, doc_ops = [], []
+        for doc in docs:
+            doc_events, state = legacy_events(doc)
+            for i, event in enumerate(doc_events):
+                # Deterministic ids: re-running after an interruption never duplicates events
+                event_ops.append(UpdateOne(
+                    {"_id": f"{doc['_id']}:{i}"},
+                    {"$setOnInsert": {"user_id": doc.get("user_id"), "guild_id": doc.get("guild_id"), "day": doc.get("day"), **event}},
+                    upsert=True
+                ))
+            update = {"$unset": {"commands_used": ""}}
+            if state:
+                update["$set"] = {"state": state}
+            doc_ops.append(UpdateOne({"_id": doc["_id"]}, update))
+        if event_ops:
+            await events_col.bulk_write(event_ops, ordered=False)
+        await col.bulk_write(doc_ops, ordered=False)
+        migrated += len(doc_ops)
+        events += len(event_ops)
+    print(f"[Migrations] {col.name}: moved {events} commands of {migrated} documents to {events_col.name}.")
+
+# (version, description, step). Steps are idempotent and resumable.
+MIGRATIONS = [
+    # Daily documents keyed by an integer `day` (YYYYMMDD) instead of a 'YYYY-MM-DD' `date`
+    # string, command/session timestamps stored as datetimes instead of ISO-8601 strings
+    (2, "native timestamps and integer day keys", _native_types),
+    # commands_used arrays split out into the attendance_events log, daily logs keep a derived state
+    (3, "attendance event log", _attendance_events)
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+async def run_migrations(force=False):
+    """
+    Brings stored documents up to SCHEMA_VERSION. Runs at startup (see Database.warmup) and is
+    skipped once the recorded version is current; force=True re-checks every collection
+    (e.g. after importing legacy data). Safe to interrupt and re-run.
+    Returns True if a migration ran.
+    """
+    state = await MaintenanceStateModel.get(SCHEMA_KEY) or {}
+    current = 1 if force else state.get("version", 1)
+    pending = [migration for migration in MIGRATIONS if migration[0] > current]
+    if not pending:
+        return False
+
+    for version, description, step in pending:
+        print(f"[Migrations] Version {version}: {description}...")
+        await step()
+        await MaintenanceStateModel.set(SCHEMA_KEY, {"version": version})
+    print(f"[Migrations] Schema is at version {SCHEMA_VERSION}.")
+    return True
+
+async def _main():
+    if not Database.is_mongo():
+        print("[Migrations] Nothing to migrate: the SQLite store is created with the current schema.")
+        return
+    Database.connect()
+    try:
+        await run_migrations(force=True)
+    finally:
+        Database.close()
+
+if __name__ == "__main__":
+    # python -m database.migrations
+    asyncio.run(_main())
@@ -0,0 +1,211 @@
+from database.connection import Database
+from database.repository import AttendanceRepository, VoiceRepository, UserRepository
+from models.archive_model import ArchiveModel
+from utils.time_utils import day_key
+
+class MongoAttendanceRepository(AttendanceRepository):
+    def collection(self, profile="primary"):
+        return Database.get_db(profile)['daily_logs']
+
+    def events(self, profile="primary"):
+        # Append-only log of attendance commands
+        return Database.get_db(profile)['attendance_events']
+
+    async def ensure_indexes(self):
+        col = self.collection()
+        # Per-user day lookups and per-guild day ranges (reports)
+        await col.create_index([("guild_id", 1), ("day", 1), ("user_id", 1)])
+        # Day-window scans (global stats recompute)
+        await col.create_index([("day", 1)])
+        await self.events().create_index([("guild_id", 1), ("user_id", 1), ("day", 1), ("ts", 1)])
+        # Closed-month scans (archival)
+        await self.events().create_index([("day", 1)])
+
+    async def find_by_date(self, user_id, guild_id, date_str):
+        return await self.collection().find_one({
+            "user_id": user_id,
+            "guild_id": guild_id,
+            "day": day_key(date_str)
+        })
+
+    async def create_or_update(self, user_id, guild_id, date_str, update_data):
+        await self.collection().update_one(
+            {
+                "user_id": user_id,
+                "guild_id": guild_id,
+                "day": day_key(date_str)
+            },
+            update_data,
+            upsert=True
+        )
+
+    async def add_event(self, user_id, guild_id, date_str, event):
+        await self.events().insert_one({
+            "user_id": user_id,
+            "guild_id": guild_id,
+            "day": day_key(date_str),
+            **event
+        })
+
+    async def get_events(self, guild_id, user_id, date_str, profile="primary"):
+        cursor = self.events(profile).find({
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "day": day_key(date_str)
+        }).sort("ts", 1)
+        return await cursor.to_list(length=None)
+
+    async def update_state(self, user_id, guild_id, date_str, update, ts):
+        await self.collection().update_one(
+            {
+                "user_id": user_id,
+                "guild_id": guild_id,
+                "day": day_key(date_str),
+                "$or": [{"state.at": None}, {"state.at": {"$lte": ts}}]
+            },
+            update
+        )
+
+    async def get_logs_in_range(self, guild_id, start_date, end_date, profile="primary"):
+        cursor = self.collection(profile).find({
+            "guild_id": guild_id,
+            "day": {
+                "$gte": day_key(start_date),
+                "$lte": day_key(end_date)
+            }
+        })
+        live = await cursor.to_list(length=None)
+        # Closed months may have been moved to the archive (see ArchiveService)
+        archived = await ArchiveModel.find_docs("attendance", guild_id, start_date, end_date, profile=profile)
+        return ArchiveModel.merge_live("attendance", live, archived)
+
+
+class MongoVoiceRepository(VoiceRepository):
+    def collection(self, profile="primary"):
+        return Database.get_db(profile)['daily_activity']
+
+    async def ensure_indexes(self):
+        col = self.collection()
+        await col.create_index([("guild_id", 1), ("day", 1), ("user_id", 1)])
+        await col.create_index([("day", 1)])
+
+    async def get_stats(self, user_id, guild_id, start_date_str, end_date_str, profile="primary"):
+        query = {
+            "guild_id": guild_id,
+            "day": {
+                "$gte": day_key(start_date_str),
+                "$lte": day_key(end_date_str)
+            }
+        }
+        if user_id:
+            query["user_id"] = user_id
+            
+        cursor = self.collection(profile).find(query)
+        live = await cursor.to_list(length=None)
+        # Closed months may have been moved to the archive (see ArchiveService)
+        archived = await ArchiveModel.find_docs("voice", guild_id, start_date_str, end_date_str, user_id, profile)
+        return ArchiveModel.merge_live("voice", live, archived)
+
+    async def append_session(self, user_id, guild_id, date_str, user_name, session_data, duration_seconds, is_overtime=False):
+        update_fields = {
+            "$set": {"user_name": user_name},
+            "$push": {"sessions": session_data}
+        }
+        
+        if is_overtime:
+             update_fields["$inc"] = {"overtime_duration": duration_seconds}
+        else:
+             update_fields["$inc"] = {"total_duration": duration_seconds}
+             
+        await self.collection().update_one(
+            {
+                "user_id": user_id,
+                "guild_id": guild_id,
+                "day": day_key(date_str)
+            },
+            update_fields,
+            upsert=True
+        )
+
+
+class MongoUserRepository(UserRepository):
+    def collection(self, profile="primary"):
+        return Database.get_db(profile)['users']
+
+    async def ensure_indexes(self):
+        col = self.collection()
+        # Leaderboards and rank counts
+        await col.create_index([("global_bhai_count", -1)])
+        # Reading back /update stamps
+        await col.create_index([("sync_run", 1)])
+
+    async def get_user(self, user_id):
+        return await self.collection().find_one({"_id": str(user_id)})
+
+    async def upsert_user(self, user_doc):
+        await self.collection().replace_one(
+            {"_id": user_doc["_id"]}, 
+            user_doc, 
+            upsert=True
+        )
+
+    async def increment_bhai_count(self, user_id, display_name):
+        await self.collection().update_one(
+            {"_id": str(user_id)},
+            {
+                "$inc": {"global_bhai_count": 1},
+                "$set": {"display_name": display_name}
+            },
+            upsert=True
+        )
+
+    async def increment_voice_time(self, user_id, user_name, regular_sec=0, overtime_sec=0):
+        await self.collection().update_one(
+            {"_id": str(user_id)},
+            {
+                "$inc": {
+                    "total_regular_seconds": regular_sec,
+                    "total_overtime_seconds": overtime_sec
+                },
+                "$set": {"display_name": user_name}
+            },
+            upsert=True
+        )
+
+    async def get_voice_stats(self, user_id):
+        doc = await self.collection().find_one({"_id": str(user_id)})
+        if not doc:
+            return {"regular": 0, "overtime": 0}
+        return {
+            "regular": doc.get('total_regular_seconds', 0),
+            "overtime": doc.get('total_overtime_seconds', 0)
+        }
+
+    async def get_bhai_count(self, user_id, profile="primary"):
+        doc = await self.collection(profile).find_one({"_id": str(user_id)}, {"global_bhai_count": 1})
+        return doc.get('global_bhai_count', 0) if doc else 0
+
+    async def get_top_bhai_users(self, limit=5, profile="primary"):
+        cursor = self.collection(profile).find({"global_bhai_count": {"$gt": 0}}, {"display_name": 1, "global_bhai_count": 1})\
+                   .sort("global_bhai_count", -1)\
+                   .limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def get_bottom_bhai_users(self, limit=5, profile="primary"):
+        # Only users with count > 0 to make it meaningful? Or include 0s?
+        # Assuming > 0 for now to avoid listing inactive people as "leaders"
+        cursor = self.collection(profile).find({"global_bhai_count": {"$gt": 0}}, {"display_name": 1, "global_bhai_count": 1})\
+                   .sort("global_bhai_count", 1)\
+                   .limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def get_all_bhai_users(self, profile="primary"):
+        cursor = self.collection(profile).find({"global_bhai_count": {"$gt": 0}}, {"display_name": 1, "global_bhai_count": 1})\
+                   .sort("global_bhai_count", -1)
+        return await cursor.to_list(length=None)
+
+    async def get_bhai_rank(self, user_id, profile="primary"):
+        user_count = await self.get_bhai_count(user_id, profile)
+        # Count how many have strictly more
+        rank = await self.collection(profile).count_documents({"global_bhai_count": {"$gt": user_count}})
+        return rank + 1
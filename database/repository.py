@@ -0,0 +1,89 @@
+from abc import ABC, abstractmethod
+
+class AttendanceRepository(ABC):
+    """
+    Storage for attendance: one daily document per (user, guild, date) with attendance_status,
+    bhai_count and the member's derived `state`, plus the append-only event log of attendance
+    commands. get_events returns a day's events in timestamp order. update_state applies an
+    update to an existing daily document only if its state.at is not later than `ts` (see
+    AttendanceModel.record_event).
+    Updates are expressed with MongoDB update operators ($set, $setOnInsert, $inc, $push, $unset);
+    non-Mongo backends apply them to the stored document.
+    Methods take 'YYYY-MM-DD' dates; documents are stored under an integer `day` key (YYYYMMDD)
+    and timestamps as datetimes, returned naive in UTC (read them with utils.time_utils.parse_timestamp).
+
+    Every backend must pass tests/test_repository_contract.py. Known differences:
+    `profile` picks a MongoDB read preference and is ignored by single-node backends (SQLite
+    has only one copy to read); document `_id`s are ObjectIds in MongoDB and hex strings in SQLite.
+    """
+
+    @abstractmethod
+    async def ensure_indexes(self): ...
+
+    @abstractmethod
+    async def find_by_date(self, user_id, guild_id, date_str): ...
+
+    @abstractmethod
+    async def create_or_update(self, user_id, guild_id, date_str, update_data): ...
+
+    @abstractmethod
+    async def add_event(self, user_id, guild_id, date_str, event): ...
+
+    @abstractmethod
+    async def get_events(self, guild_id, user_id, date_str, profile="primary"): ...
+
+    @abstractmethod
+    async def update_state(self, user_id, guild_id, date_str, update, ts): ...
+
+    @abstractmethod
+    async def get_logs_in_range(self, guild_id, start_date, end_date, profile="primary"): ...
+
+
+class VoiceRepository(ABC):
+    """Storage for daily voice activity: one document per (user, guild, date) with sessions and durations."""
+
+    @abstractmethod
+    async def ensure_indexes(self): ...
+
+    @abstractmethod
+    async def get_stats(self, user_id, guild_id, start_date_str, end_date_str, profile="primary"): ...
+
+    @abstractmethod
+    async def append_session(self, user_id, guild_id, date_str, user_name, session_data, duration_seconds, is_overtime=False): ...
+
+
+class UserRepository(ABC):
+    """Storage for global per-user totals (bhai count, regular/overtime voice seconds), keyed by str(user_id)."""
+
+    @abstractmethod
+    async def ensure_indexes(self): ...
+
+    @abstractmethod
+    async def get_user(self, user_id): ...
+
+    @abstractmethod
+    async def upsert_user(self, user_doc): ...
+
+    @abstractmethod
+    async def increment_bhai_count(self, user_id, display_name): ...
+
+    @abstractmethod
+    async def increment_voice_time(self, user_id, user_name, regular_sec=0, overtime_sec=0): ...
+
+    @abstractmethod
+    async def get_voice_stats(self, user_id): ...
+
+    @abstractmethod
+    async def get_bhai_count(self, user_id, profile="primary"): ...
+
+    @abstractmethod
+    async def get_top_bhai_users(self, limit=5, profile="primary"): ...
+
+    @abstractmethod
+    async def get_bottom_bhai_users(self, limit=5, profile="primary"): ...
+
+    @abstractmethod
+    async def get_all_bhai_users(self, profile="primary"): ...
+
+    @abstractmethod
+    async def get_bhai_rank(self, user_id, profile="primary"): ...
@@ -0,0 +1,325 @@
+import copy
+import sqlite3
+import uuid
+from bson import json_util
+from database.repository import AttendanceRepository, VoiceRepository, UserRepository
+from utils.async_utils import BlockingExecutor
+from utils.time_utils import day_key
+
+SCHEMA = [
+    # Daily documents: key columns for indexing, the full document as JSON
+    *[stmt for table in ("daily_logs", "daily_activity") for stmt in (
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+                _id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                doc TEXT NOT NULL,
+                UNIQUE (user_id, guild_id, day)
+            )""",
+        f"CREATE INDEX IF NOT EXISTS {table}_guild_day ON {table} (guild_id, day)",
+    )],
+    # Append-only attendance event log (see AttendanceModel.record_event)
+    """CREATE TABLE IF NOT EXISTS attendance_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            doc TEXT NOT NULL
+        )""",
+    "CREATE INDEX IF NOT EXISTS attendance_events_member_day ON attendance_events (guild_id, user_id, day, id)",
+    """CREATE TABLE IF NOT EXISTS users (
+            _id TEXT PRIMARY KEY,
+            doc TEXT NOT NULL
+        )""",
+    # Leaderboards and rank counts
+    "CREATE INDEX IF NOT EXISTS users_bhai ON users (json_extract(doc, '$.global_bhai_count'))",
+]
+
+BHAI = "json_extract(doc, '$.global_bhai_count')"
+
+def _dumps(doc):
+    # Extended JSON ({"$date": ...}) so datetimes round-trip like BSON (see _loads)
+    return json_util.dumps(doc)
+
+def _loads(text):
+    # Datetimes come back naive in UTC, as the MongoDB driver returns them
+    # (files written before this keep ISO-8601 strings, which parse_timestamp also accepts)
+    return json_util.loads(text)
+
+def apply_update(doc, update, inserting=False):
+    """
+    Applies MongoDB update operators to a document in place.
+    Supports $set, $setOnInsert, $inc, $min, $max, $push and $unset with dotted paths.
+    """
+    def resolve(path):
+        parts = path.split(".")
+        target = doc
+        for part in parts[:-1]:
+            if isinstance(target, list):
+                target = target[int(part)]
+            else:
+                target = target.setdefault(part, {})
+        return target, parts[-1]
+
+    def assign(path, value):
+        target, key = resolve(path)
+        if isinstance(target, list):
+            target[int(key)] = value
+        else:
+            target[key] = value
+
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, value in fields.items():
+            if op in ("$set", "$setOnInsert"):
+                assign(path, copy.deepcopy(value))
+            elif op == "$inc":
+                target, key = resolve(path)
+                target[key] = target.get(key, 0) + value
+            elif op in ("$min", "$max"):
+                target, key = resolve(path)
+                current = target.get(key)
+                if current is None or (value < current if op == "$min" else value > current):
+                    target[key] = copy.deepcopy(value)
+            elif op == "$push":
+                target, key = resolve(path)
+                target.setdefault(key, []).append(copy.deepcopy(value))
+            elif op == "$unset":
+                target, key = resolve(path)
+                target.pop(key, None)
+            else:
+                raise ValueError(f"Unsupported update operator for SQLite: {op}")
+    return doc
+
+
+class SqliteEngine:
+    """
+    Embedded storage: one sqlite3 connection in WAL mode, used only from a single worker
+    thread, so every operation (including read-modify-write of a document) is serialized
+    and never blocks the event loop.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.executor = BlockingExecutor("sqlite", max_workers=1, default_timeout=None)
+        self.conn = None
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        for stmt in SCHEMA:
+            conn.execute(stmt)
+        self.conn = conn
+
+    async def open(self):
+        if self.conn is None:
+            await self.executor.run(self._open)
+
+    async def run(self, func, *args):
+        """Runs func(conn, *args) on the worker thread inside one transaction."""
+        def call():
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self.conn, *args)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+        return await self.executor.run(call)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self.executor.shutdown()
+
+
+class _SqliteDailyStore:
+    """Shared document logic for the per-(user, guild, date) tables."""
+    table = None
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def ensure_indexes(self):
+        # Created with the schema (see SCHEMA)
+        await self.engine.open()
+
+    def _find(self, conn, user_id, guild_id, date_str):
+        row = conn.execute(
+            f"SELECT doc FROM {self.table} WHERE user_id = ? AND guild_id = ? AND day = ?",
+            (user_id, guild_id, day_key(date_str))
+        ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def _save(self, conn, doc):
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (_id, user_id, guild_id, day, doc) VALUES (?, ?, ?, ?, ?)",
+            (doc["_id"], doc["user_id"], doc["guild_id"], doc["day"], _dumps(doc))
+        )
+
+    def _upsert(self, conn, user_id, guild_id, date_str, update):
+        doc = self._find(conn, user_id, guild_id, date_str)
+        inserting = doc is None
+        if inserting:
+            doc = {"_id": uuid.uuid4().hex, "user_id": user_id, "guild_id": guild_id, "day": day_key(date_str)}
+        self._save(conn, apply_update(doc, update, inserting))
+
+    def _range(self, conn, guild_id, start, end, user_id=None):
+        query = f"SELECT doc FROM {self.table} WHERE guild_id = ? AND day >= ? AND day <= ?"
+        params = [guild_id, day_key(start), day_key(end)]
+        if user_id:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        return [_loads(row[0]) for row in conn.execute(query, params)]
+
+
+class SqliteAttendanceRepository(_SqliteDailyStore, AttendanceRepository):
+    table = "daily_logs"
+
+    async def find_by_date(self, user_id, guild_id, date_str):
+        return await self.engine.run(self._find, user_id, guild_id, date_str)
+
+    async def create_or_update(self, user_id, guild_id, date_str, update_data):
+        await self.engine.run(self._upsert, user_id, guild_id, date_str, update_data)
+
+    @staticmethod
+    def _add_event(conn, user_id, guild_id, date_str, event):
+        event = {"user_id": user_id, "guild_id": guild_id, "day": day_key(date_str), **event}
+        conn.execute(
+            "INSERT INTO attendance_events (user_id, guild_id, day, doc) VALUES (?, ?, ?, ?)",
+            (user_id, guild_id, event["day"], _dumps(event))
+        )
+
+    @staticmethod
+    def _events(conn, guild_id, user_id, date_str):
+        rows = conn.execute(
+            # Rows are only ever appended, so insertion order is timestamp order
+            "SELECT doc FROM attendance_events WHERE guild_id = ? AND user_id = ? AND day = ? ORDER BY id",
+            (guild_id, user_id, day_key(date_str))
+        )
+        return [_loads(row[0]) for row in rows]
+
+    async def add_event(self, user_id, guild_id, date_str, event):
+        await self.engine.run(self._add_event, user_id, guild_id, date_str, event)
+
+    async def get_events(self, guild_id, user_id, date_str, profile="primary"):
+        return await self.engine.run(self._events, guild_id, user_id, date_str)
+
+    def _update_state(self, conn, user_id, guild_id, date_str, update, ts):
+        doc = self._find(conn, user_id, guild_id, date_str)
+        at = (doc.get("state") or {}).get("at") if doc else None
+        if doc and (at is None or at <= ts):
+            self._save(conn, apply_update(doc, update))
+
+    async def update_state(self, user_id, guild_id, date_str, update, ts):
+        await self.engine.run(self._update_state, user_id, guild_id, date_str, update, ts)
+
+    async def get_logs_in_range(self, guild_id, start_date, end_date, profile="primary"):
+        return await self.engine.run(self._range, guild_id, start_date, end_date)
+
+
+class SqliteVoiceRepository(_SqliteDailyStore, VoiceRepository):
+    table = "daily_activity"
+
+    async def get_stats(self, user_id, guild_id, start_date_str, end_date_str, profile="primary"):
+        return await self.engine.run(self._range, guild_id, start_date_str, end_date_str, user_id)
+
+    async def append_session(self, user_id, guild_id, date_str, user_name, session_data, duration_seconds, is_overtime=False):
+        field = "overtime_duration" if is_overtime else "total_duration"
+        update = {
+            "$set": {"user_name": user_name},
+            "$push": {"sessions": session_data},
+            "$inc": {field: duration_seconds}
+        }
+        await self.engine.run(self._upsert, user_id, guild_id, date_str, update)
+
+
+class SqliteUserRepository(UserRepository):
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def ensure_indexes(self):
+        await self.engine.open()
+
+    @staticmethod
+    def _get(conn, user_id):
+        row = conn.execute("SELECT doc FROM users WHERE _id = ?", (str(user_id),)).fetchone()
+        return _loads(row[0]) if row else None
+
+    @staticmethod
+    def _put(conn, doc):
+        conn.execute("INSERT OR REPLACE INTO users (_id, doc) VALUES (?, ?)", (doc["_id"], _dumps(doc)))
+
+    @classmethod
+    def _upsert(cls, conn, user_id, update):
+        doc = cls._get(conn, user_id)
+        inserting = doc is None
+        cls._put(conn, apply_update(doc or {"_id": str(user_id)}, update, inserting))
+
+    @staticmethod
+    def _leaderboard(conn, order, limit):
+        query = f"SELECT doc FROM users WHERE {BHAI} > 0 ORDER BY {BHAI} {order}"
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (limit,)
+        users = []
+        for (doc,) in conn.execute(query, params):
+            doc = _loads(doc)
+            users.append({k: doc[k] for k in ("_id", "display_name", "global_bhai_count") if k in doc})
+        return users
+
+    async def get_user(self, user_id):
+        return await self.engine.run(self._get, user_id)
+
+    async def upsert_user(self, user_doc):
+        await self.engine.run(self._put, user_doc)
+
+    async def increment_bhai_count(self, user_id, display_name):
+        await self.engine.run(self._upsert, user_id, {
+            "$inc": {"global_bhai_count": 1},
+            "$set": {"display_name": display_name}
+        })
+
+    async def increment_voice_time(self, user_id, user_name, regular_sec=0, overtime_sec=0):
+        await self.engine.run(self._upsert, user_id, {
+            "$inc": {"total_regular_seconds": regular_sec, "total_overtime_seconds": overtime_sec},
+            "$set": {"display_name": user_name}
+        })
+
+    async def get_voice_stats(self, user_id):
+        doc = await self.get_user(user_id)
+        if not doc:
+            return {"regular": 0, "overtime": 0}
+        return {
+            "regular": doc.get('total_regular_seconds', 0),
+            "overtime": doc.get('total_overtime_seconds', 0)
+        }
+
+    async def get_bhai_count(self, user_id, profile="primary"):
+        doc = await self.get_user(user_id)
+        return doc.get('global_bhai_count', 0) if doc else 0
+
+    async def get_top_bhai_users(self, limit=5, profile="primary"):
+        return await self.engine.run(self._leaderboard, "DESC", limit)
+
+    async def get_bottom_bhai_users(self, limit=5, profile="primary"):
+        return await self.engine.run(self._leaderboard, "ASC", limit)
+
+    async def get_all_bhai_users(self, profile="primary"):
+        return await self.engine.run(self._leaderboard, "DESC", None)
+
+    async def get_bhai_rank(self, user_id, profile="primary"):
+        def rank(conn):
+            doc = self._get(conn, user_id)
+            user_count = doc.get('global_bhai_count', 0) if doc else 0
+            # Count how many have strictly more
+            (higher,) = conn.execute(f"SELECT COUNT(*) FROM users WHERE {BHAI} > ?", (user_count,)).fetchone()
+            return higher + 1
+        return await self.engine.run(rank)
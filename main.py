@@ -1,8 +1,13 @@
 import discord
 import os
 import asyncio
+import sys
 from config import settings
 from discord.ext import commands
+from utils.loop_monitor import LoopLagMonitor
+from database.connection import Database
+from services.change_stream_service import ChangeStreamService
+from services.command_sync_service import CommandSyncService
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -17,20 +22,8 @@ async def on_ready():
     
     target_guild_id = os.getenv("TARGET_GUILD_ID")
     try:
-        if target_guild_id:
-            guild = discord.Object(id=int(target_guild_id))
-            # Copy global commands to guild
-            bot.tree.copy_global_to(guild=guild)
-            synced = await bot.tree.sync(guild=guild)
-            
-            # Clear global commands to prevent duplicates
-            bot.tree.clear_commands(guild=None)
-            await bot.tree.sync(guild=None)
-            
-            print(f'✅ Synced {len(synced)} command(s) to Guild {target_guild_id} (Instant update)')
-        else:
-            synced = await bot.tree.sync()
-            print(f'Synced {len(synced)} command(s) globally (May take up to 1 hour)')
+        # Once per process, and only for scopes whose commands changed since the last sync
+        await CommandSyncService.sync_once(bot, target_guild_id)
     except Exception as e:
         print(f'Failed to sync commands: {e}')
     print('------')
@@ -49,14 +42,38 @@ async def load_extensions():
                     traceback.print_exc()
 
 async def main():
-    async with bot:
-        await load_extensions()
-        if not settings.TOKEN:
-            print("Error: DISCORD_TOKEN not found. Please check your .env file.")
-            return
-        await bot.start(settings.TOKEN)
+    if not settings.TOKEN:
+        print("Error: DISCORD_TOKEN not found. Please check your .env file.")
+        return
+
+    # Open the storage (MongoDB pool or SQLite file) and ensure indexes before any command can be served
+    Database.connect()
+    try:
+        await Database.warmup()
+    except Exception as e:
+        storage = "reach MongoDB" if Database.is_mongo() else f"open SQLite storage ({Database.SQLITE_PATH})"
+        print(f"Error: could not {storage}: {e}")
+        Database.close()
+        return
+
+    try:
+        async with bot:
+            # Track event-loop lag (blocking calls show up in scheduler logs)
+            LoopLagMonitor.start()
+            await load_extensions()
+            # After the cogs: their models have registered the caches to invalidate
+            ChangeStreamService.start()
+            await bot.start(settings.TOKEN)
+    finally:
+        ChangeStreamService.stop()
+        Database.close()
 
 if __name__ == '__main__':
+    if "--profile-startup" in sys.argv:
+        # Import-time breakdown of a cold start; exits 1 when over STARTUP_IMPORT_BUDGET_MS
+        from utils.startup_profile import report
+        sys.exit(0 if report(os.path.dirname(os.path.abspath(__file__))) else 1)
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
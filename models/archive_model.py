@@ -0,0 +1,188 @@
+from datetime import datetime, timezone
+from bson import Binary, json_util
+from database.connection import Database
+from models.attendance_model import AttendanceModel
+from utils.time_utils import doc_date, stored_time
+
+def _compress(docs):
+    import zstandard
+    return Binary(zstandard.ZstdCompressor(level=10).compress(json_util.dumps(docs).encode("utf-8")))
+
+def _decompress(blob):
+    import zstandard
+    return json_util.loads(zstandard.ZstdDecompressor().decompress(bytes(blob)).decode("utf-8"))
+
+class ArchiveModel:
+    """
+    Cold storage for closed months: one bucket per (kind, guild, month), where kind is
+    "attendance" (daily_logs) or "voice" (daily_activity).
+    A bucket holds per-user daily totals (readable by aggregation pipelines) and the original
+    documents as a zstd-compressed blob (for reports that need commands/sessions). Attendance
+    buckets also hold the month's attendance events, compressed the same way.
+    """
+    # Daily-doc fields copied into the uncompressed totals, per kind
+    TOTAL_FIELDS = {
+        "attendance": ["user_id", "user_name", "day", "attendance_status", "bhai_count"],
+        "voice": ["user_id", "user_name", "day", "total_duration", "overtime_duration"]
+    }
+    # When several documents share a (user, day): counters added up, lists concatenated
+    SUMMED_FIELDS = {
+        "attendance": ["bhai_count"],
+        "voice": ["total_duration", "overtime_duration"]
+    }
+    LIST_FIELDS = {
+        "attendance": [],
+        "voice": ["sessions"]
+    }
+
+    @staticmethod
+    def get_collection(profile="primary"):
+        return Database.get_db(profile)['activity_archive']
+
+    @classmethod
+    async def ensure_indexes(cls):
+        await cls.get_collection().create_index([("kind", 1), ("guild_id", 1), ("month", 1)])
+
+    @staticmethod
+    def make_key(kind, guild_id, month):
+        return f"{kind}:{guild_id}:{month}"
+
+    @classmethod
+    async def get_docs(cls, kind, guild_id, month):
+        bucket = await cls.get_collection().find_one({"_id": cls.make_key(kind, guild_id, month)})
+        return _decompress(bucket["raw"]) if bucket else []
+
+    @classmethod
+    async def get_events(cls, guild_id, month):
+        """The attendance events archived for a month, in time order per member and day."""
+        bucket = await cls.get_collection().find_one({"_id": cls.make_key("attendance", guild_id, month)}, {"events": 1})
+        return _decompress(bucket["events"]) if bucket and bucket.get("events") else []
+
+    @staticmethod
+    def merge_events(live_events, archived_events):
+        """Archived events plus the live ones not archived yet (events never change, so _id is enough)."""
+        archived_ids = {event["_id"] for event in archived_events}
+        events = archived_events + [event for event in live_events if event["_id"] not in archived_ids]
+        return sorted(events, key=lambda event: (event["user_id"], event["day"], stored_time(event["ts"])))
+
+    @classmethod
+    async def save_bucket(cls, kind, guild_id, month, docs, events=None):
+        """
+        Writes (replaces) the bucket for these documents. Totals have one row per (user, day),
+        see combine. events (attendance only) replace the archived events when given.
+        """
+        fields = cls.TOTAL_FIELDS[kind]
+        combined = cls.combine(kind, docs)
+        totals = [{f: doc.get(f) for f in fields} for doc in combined]
+        if kind == "voice":
+            for total, doc in zip(totals, combined):
+                total["session_count"] = len(doc.get("sessions", []))
+
+        bucket = {
+            "kind": kind,
+            "guild_id": guild_id,
+            "month": month,
+            "doc_count": len(docs),
+            "totals": totals,
+            "raw": _compress(docs),
+            "archived_at": datetime.now(timezone.utc)
+        }
+        if events is not None:
+            bucket["event_count"] = len(events)
+            bucket["events"] = _compress(events)
+        # $set keeps the archived events when only the documents are rewritten (see migrations)
+        await cls.get_collection().update_one(
+            {"_id": cls.make_key(kind, guild_id, month)},
+            {"$set": bucket},
+            upsert=True
+        )
+
+    @classmethod
+    async def find_docs(cls, kind, guild_id, start_date_str, end_date_str, user_id=None, profile="primary"):
+        """
+        Archived daily documents in [start, end] (optionally for one user), as originally stored:
+        a day can have several (see combine), so pass them through merge_live.
+        """
+        query = {"kind": kind, "guild_id": guild_id, "month": {"$gte": start_date_str[:7], "$lte": end_date_str[:7]}}
+        if user_id:
+            # Buckets without the user are never decompressed
+            query["totals.user_id"] = user_id
+        cursor = cls.get_collection(profile).find(query, {"raw": 1, "events": 1})
+        docs = []
+        async for bucket in cursor:
+            states = cls._archived_states(bucket)
+            for doc in _decompress(bucket["raw"]):
+                if not (start_date_str <= (doc_date(doc) or "") <= end_date_str):
+                    continue
+                if user_id and doc.get("user_id") != user_id:
+                    continue
+                key = (doc.get("user_id"), doc.get("day"))
+                if key in states:
+                    doc["state"] = states[key]
+                docs.append(doc)
+        return docs
+
+    @staticmethod
+    def _archived_states(bucket):
+        """{(user_id, day): state} rebuilt from an attendance bucket's events (the record of every transition)."""
+        if not bucket.get("events"):
+            return {}
+        events = {}
+        for event in _decompress(bucket["events"]):
+            events.setdefault((event["user_id"], event["day"]), []).append(event)
+        return {key: AttendanceModel.fold_events(day_events) for key, day_events in events.items()}
+
+    @staticmethod
+    def merge_parts(live_docs, archived_docs):
+        """
+        Archived documents with their live versions (same _id: an archival run interrupted before
+        deleting) swapped in, then the remaining live documents. Oldest first, nothing combined.
+        """
+        live = {doc["_id"]: doc for doc in live_docs}
+        return [live.pop(doc["_id"], doc) for doc in archived_docs] + list(live.values())
+
+    @classmethod
+    def combine(cls, kind, docs):
+        """
+        One document per (user, day), docs oldest first. A write that lands after its month was
+        archived (a catch-up auto-absent, a late session) creates a second daily document for the
+        day; both are kept in the bucket and folded together here: counters are added up, session
+        lists concatenated, attendance states merged, and other fields taken from the later document.
+        """
+        combined = {}
+        for doc in docs:
+            key = (doc.get("user_id"), doc_date(doc))
+            current = combined.get(key)
+            if current is None:
+                combined[key] = doc
+                continue
+            merged = {**current, **doc, "_id": current["_id"]}
+            for field in cls.SUMMED_FIELDS[kind]:
+                if field in current or field in doc:
+                    merged[field] = (current.get(field) or 0) + (doc.get(field) or 0)
+            for field in cls.LIST_FIELDS[kind]:
+                merged[field] = current.get(field, []) + doc.get(field, [])
+            if kind == "attendance":
+                merged["state"] = AttendanceModel.merge_states(current.get("state"), doc.get("state"))
+            combined[key] = merged
+        return list(combined.values())
+
+    @classmethod
+    def merge_live(cls, kind, live_docs, archived_docs):
+        """Live and archived daily documents of a range, one per (user, day)."""
+        if not archived_docs:
+            return live_docs
+        return cls.combine(kind, cls.merge_parts(live_docs, archived_docs))
+
+    @classmethod
+    def totals_union(cls, kind, day_match):
+        """$unionWith stage adding archived per-user daily totals (shaped like daily docs) to a pipeline."""
+        return {"$unionWith": {
+            "coll": cls.get_collection().name,
+            "pipeline": [
+                {"$match": {"kind": kind}},
+                {"$unwind": "$totals"},
+                {"$replaceRoot": {"newRoot": "$totals"}},
+                {"$match": {"user_id": {"$ne": None}, "day": day_match}}
+            ]
+        }}
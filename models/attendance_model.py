@@ -1,79 +1,156 @@
-from database.connection import Database
 from datetime import datetime
+from database.connection import Database
+from utils.cache import CacheBus, TTLCache
+from utils.time_utils import day_str, stored_time
 
 class AttendanceModel:
+    """Daily attendance logs (one document per user per guild per day) and the attendance event log.
+    Storage is delegated to the configured backend (see Database.repository)."""
+    WORK_COMMANDS = ("present", "halfday")
+    BREAK_COMMANDS = ("lunch", "away")
+    DROP_COMMANDS = ("drop", "auto-drop")
+    # Daily documents with their derived state, for display and auto-replies (find_by_date(cached=True))
+    cache = TTLCache("attendance_state", "daily_logs")
+
+    # State fields set by the latest event; work_start and dropped_at are kept by $min/$max
+    LATEST_FIELDS = ("status", "command", "at", "reason")
+
+    @classmethod
+    def fold_event(cls, state, event):
+        """
+        The member's state for the day after `event` (stored on the daily document, see record_event):
+        status ("active", "lunch", "away", "dropped" or "absent"), the last command and its time
+        (`command`, `at`), `reason` of a break or absence, `work_start` and `dropped_at`.
+        """
+        state = dict(state or {})
+        command, ts = event["command"], event["ts"]
+        state["command"] = command
+        state["at"] = ts
+        state.pop("reason", None)
+        if command in cls.WORK_COMMANDS:
+            # Re-marking attendance keeps the original start (the day is measured from the first mark)
+            state.setdefault("work_start", ts)
+            state["status"] = "active"
+        elif command in cls.BREAK_COMMANDS:
+            state["status"] = command
+            state["reason"] = event.get("reason")
+        elif command == "resume":
+            state["status"] = "active"
+        elif command in cls.DROP_COMMANDS:
+            state["status"] = "dropped"
+            state["dropped_at"] = ts
+        elif command == "absent":
+            state["status"] = "absent"
+            state["reason"] = event.get("reason")
+        return state
+
     @staticmethod
-    def get_collection():
-        return Database.get_db()['daily_logs']
+    def get_collection(profile="primary"):
+        # Raw MongoDB collection, for MongoDB-only features (maintenance pipelines, archival)
+        return Database.get_db(profile)['daily_logs']
+
+    @staticmethod
+    def repo():
+        return Database.repository("attendance")
 
     @classmethod
-    async def find_by_date(cls, user_id, guild_id, date_str):
-        return await cls.get_collection().find_one({
-            "user_id": user_id,
-            "guild_id": guild_id,
-            "date": date_str
-        })
+    async def ensure_indexes(cls):
+        return await cls.repo().ensure_indexes()
 
     @classmethod
-    async def create_or_update(cls, user_id, guild_id, date_str, update_data):
-        await cls.get_collection().update_one(
-            {
-                "user_id": user_id,
-                "guild_id": guild_id,
-                "date": date_str
-            },
-            update_data,
-            upsert=True
-        )
+    def fold_events(cls, events):
+        state = None
+        for event in events:
+            state = cls.fold_event(state, event)
+        return state
 
     @classmethod
-    async def push_command(cls, user_id, guild_id, date_str, command_cmd):
-        await cls.get_collection().update_one(
-            {
-                "user_id": user_id,
-                "guild_id": guild_id,
-                "date": date_str
-            },
-            {"$push": {"commands_used": command_cmd}},
-            upsert=True # Just in case, broadly safe
-        )
+    def merge_states(cls, older, newer):
+        """
+        One state from two states of the same day (two daily documents, see ArchiveModel.combine),
+        as if their events had been folded together.
+        """
+        if not older or not newer:
+            return newer or older
+        # A state without `at` (its latest-fields update never landed) counts as the older one
+        first, last = sorted((older, newer), key=lambda state: stored_time(state.get("at") or datetime.min))
+        merged = {k: v for k, v in last.items() if k in cls.LATEST_FIELDS}
+        starts = [state["work_start"] for state in (first, last) if state.get("work_start")]
+        if starts:
+            merged["work_start"] = min(starts, key=stored_time)
+        drops = [state["dropped_at"] for state in (first, last) if state.get("dropped_at")]
+        if drops:
+            merged["dropped_at"] = max(drops, key=stored_time)
+        return merged
 
     @classmethod
-    async def update_command(cls, log_id, command_name, update_fields):
+    async def find_by_date(cls, user_id, guild_id, date_str, cached=False):
         """
-        Updates a specific command entry within a log document.
-        Uses array filters logic or explicit positional operator $ if careful.
-        For simplicity matching by log_id and command name (assumes unique active or latest).
-        Ideally passing specific index or unique ID for command is better, 
-        but matching logic from original code: 'commands_used.command': 'present'
+        The daily document, with the member's `state` (None if there is no document).
+        cached=True may serve a copy invalidated through CacheBus (see utils.cache): fine for
+        status checks, not for decisions that must see the latest write.
         """
-        await cls.get_collection().update_one(
-            {
-                "_id": log_id,
-                "commands_used.command": command_name
-            },
-            {"$set": update_fields}
+        if not cached:
+            return await cls.repo().find_by_date(user_id, guild_id, date_str)
+        return await cls.cache.get_or_load(
+            (user_id, guild_id, date_str),
+            lambda: cls.repo().find_by_date(user_id, guild_id, date_str),
+            ids=lambda doc: [doc["_id"]] if doc else []
         )
-        
+
     @classmethod
-    async def update_command_by_index(cls, log_id, index, update_fields):
-        # Construct update dict dynamically
-        update_query = {}
-        for key, value in update_fields.items():
-            update_query[f"commands_used.{index}.{key}"] = value
-            
-        await cls.get_collection().update_one(
-            {"_id": log_id},
-            {"$set": update_query}
-        )
+    async def create_or_update(cls, user_id, guild_id, date_str, update_data):
+        await cls.repo().create_or_update(user_id, guild_id, date_str, update_data)
+        cls.cache.invalidate((user_id, guild_id, date_str))
+
+    @classmethod
+    async def record_event(cls, user_id, guild_id, date_str, event, fields=None):
+        """
+        Appends an attendance event ({"command", "ts", ...}) to the event log and applies it to
+        the daily document's state without reading it first, so concurrent commands can't
+        overwrite each other's transitions:
+        - fields (e.g. attendance_status), work_start ($min) and dropped_at ($max) are one
+          upsert, correct in any order;
+        - status, command, at and reason are set only if no later event already set them.
+        """
+        ts = stored_time(event["ts"])
+        state = cls.fold_event(None, {**event, "ts": ts})
+        update = {}
+        if fields:
+            update["$set"] = dict(fields)
+        if "work_start" in state:
+            update["$min"] = {"state.work_start": ts}
+        if "dropped_at" in state:
+            update["$max"] = {"state.dropped_at": ts}
+        if "$min" not in update and "$max" not in update:
+            # Makes sure there is a document for the guarded update below
+            update["$setOnInsert"] = {"state": {}}
+        await cls.repo().create_or_update(user_id, guild_id, date_str, update)
+
+        latest = {"$set": {f"state.{k}": v for k, v in state.items() if k in cls.LATEST_FIELDS}}
+        if "reason" not in state:
+            latest["$unset"] = {"state.reason": ""}
+        await cls.repo().update_state(user_id, guild_id, date_str, latest, ts)
+        await cls.repo().add_event(user_id, guild_id, date_str, event)
+        cls.cache.invalidate((user_id, guild_id, date_str))
+
+    @classmethod
+    async def get_events(cls, guild_id, user_id, date_str, profile="primary"):
+        return await cls.repo().get_events(guild_id, user_id, date_str, profile)
 
     @classmethod
-    async def get_logs_in_range(cls, guild_id, start_date, end_date):
-        cursor = cls.get_collection().find({
-            "guild_id": guild_id,
-            "date": {
-                "$gte": start_date,
-                "$lte": end_date
-            }
-        })
-        return await cursor.to_list(length=None)
+    async def get_logs_in_range(cls, guild_id, start_date, end_date, profile="primary"):
+        return await cls.repo().get_logs_in_range(guild_id, start_date, end_date, profile)
+
+    @classmethod
+    def on_change(cls, event):
+        if event["op"] == "invalidate":
+            cls.cache.clear()
+            return
+        doc = event["doc"]
+        if doc and "day" in doc:
+            cls.cache.invalidate((doc.get("user_id"), doc.get("guild_id"), day_str(doc["day"])))
+        cls.cache.invalidate_id(event["id"])
+
+
+CacheBus.subscribe("daily_logs", AttendanceModel.on_change)
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+from database.connection import Database
+
+class JobRunModel:
+    """
+    Ledger of scheduled job runs, one document per (job, guild, date).
+    `done_items` holds the idempotency keys of items already applied, so a resumed run skips them.
+    """
+
+    @staticmethod
+    def get_collection():
+        return Database.get_db()['job_runs']
+
+    @classmethod
+    async def ensure_indexes(cls):
+        await cls.get_collection().create_index([("job", 1), ("guild_id", 1), ("status", 1), ("date", -1)])
+
+    @staticmethod
+    def make_key(job, guild_id, date_str):
+        return f"{job}:{guild_id}:{date_str}"
+
+    @classmethod
+    async def get(cls, job, guild_id, date_str):
+        return await cls.get_collection().find_one({"_id": cls.make_key(job, guild_id, date_str)})
+
+    @classmethod
+    async def start(cls, job, guild_id, date_str):
+        """Creates (or reopens) the run document and returns it."""
+        now = datetime.now(timezone.utc)
+        await cls.get_collection().update_one(
+            {"_id": cls.make_key(job, guild_id, date_str)},
+            {
+                "$set": {"last_attempt_at": now},
+                "$setOnInsert": {
+                    "job": job,
+                    "guild_id": guild_id,
+                    "date": date_str,
+                    "status": "running",
+                    "done_items": [],
+                    "started_at": now
+                }
+            },
+            upsert=True
+        )
+        return await cls.get(job, guild_id, date_str)
+
+    @classmethod
+    async def mark_item_done(cls, job, guild_id, date_str, item_key):
+        await cls.get_collection().update_one(
+            {"_id": cls.make_key(job, guild_id, date_str)},
+            {"$addToSet": {"done_items": item_key}}
+        )
+
+    @classmethod
+    async def mark_complete(cls, job, guild_id, date_str):
+        await cls.get_collection().update_one(
+            {"_id": cls.make_key(job, guild_id, date_str)},
+            {"$set": {"status": "done", "completed_at": datetime.now(timezone.utc)}}
+        )
+
+    @classmethod
+    async def get_last_success_date(cls, job, guild_id):
+        """Latest date (YYYY-MM-DD) this job completed for the guild, or None."""
+        doc = await cls.get_collection().find_one(
+            {"job": job, "guild_id": guild_id, "status": "done"},
+            sort=[("date", -1)]
+        )
+        return doc['date'] if doc else None
@@ -0,0 +1,54 @@
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database.connection import Database
+
+class LeaseModel:
+    """
+    Named leases with an expiry, used for leader election between bot processes.
+    Expiry is compared against the server clock ($$NOW), so clock skew between hosts doesn't matter.
+    """
+
+    @staticmethod
+    def get_collection():
+        return Database.get_db()['leases']
+
+    @classmethod
+    async def ensure_indexes(cls):
+        # TTL index: Mongo deletes leases some time after they expire (belt and braces)
+        await cls.get_collection().create_index("expires_at", expireAfterSeconds=0)
+
+    @classmethod
+    async def try_acquire(cls, name, holder, ttl_seconds):
+        """
+        Acquires or renews the lease if it is free, expired, or already ours.
+        Returns True if `holder` owns the lease afterwards.
+        """
+        try:
+            doc = await cls.get_collection().find_one_and_update(
+                {
+                    "_id": name,
+                    "$or": [
+                        {"holder": holder},
+                        {"$expr": {"$lt": ["$expires_at", "$$NOW"]}}
+                    ]
+                },
+                [{"$set": {
+                    "holder": holder,
+                    "renewed_at": "$$NOW",
+                    "expires_at": {"$add": ["$$NOW", int(ttl_seconds * 1000)]}
+                }}],
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lease exists and is held by someone else (the upsert lost the race)
+            return False
+        return doc is not None and doc.get("holder") == holder
+
+    @classmethod
+    async def release(cls, name, holder):
+        await cls.get_collection().delete_one({"_id": name, "holder": holder})
+
+    @classmethod
+    async def get(cls, name):
+        return await cls.get_collection().find_one({"_id": name})
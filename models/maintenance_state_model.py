@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+from database.connection import Database
+
+class MaintenanceStateModel:
+    """Small key/value documents for maintenance jobs (e.g. the global stats watermark)."""
+
+    @staticmethod
+    def get_collection():
+        return Database.get_db()['maintenance_state']
+
+    @classmethod
+    async def get(cls, key):
+        return await cls.get_collection().find_one({"_id": key})
+
+    @classmethod
+    async def set(cls, key, fields):
+        await cls.get_collection().update_one(
+            {"_id": key},
+            {"$set": {**fields, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
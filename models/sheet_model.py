@@ -0,0 +1,25 @@
+from database.connection import Database
+
+class SheetModel:
+    """Persisted Google Sheets metadata (e.g. year -> spreadsheet id)."""
+
+    @staticmethod
+    def get_collection():
+        return Database.get_db()['sheets_meta']
+
+    @classmethod
+    async def get_year_spreadsheet_id(cls, year):
+        if not Database.is_mongo():
+            return None  # Not persisted with embedded storage: looked up by title instead
+        doc = await cls.get_collection().find_one({"_id": f"year:{year}"})
+        return doc.get('spreadsheet_id') if doc else None
+
+    @classmethod
+    async def set_year_spreadsheet_id(cls, year, spreadsheet_id):
+        if not Database.is_mongo():
+            return
+        await cls.get_collection().update_one(
+            {"_id": f"year:{year}"},
+            {"$set": {"spreadsheet_id": spreadsheet_id}},
+            upsert=True
+        )
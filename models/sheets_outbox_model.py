@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from database.connection import Database
+
+class SheetsOutboxModel:
+    """
+    Pending Google Sheets writes, one document per (guild, tab, date).
+    Re-enqueueing the same key replaces the payload, so enqueueing is idempotent.
+    Entries that keep failing are parked with status "dead" (kept for inspection, never retried)
+    until the same key is enqueued again.
+    """
+
+    @staticmethod
+    def get_collection():
+        return Database.get_db()['sheets_outbox']
+
+    @classmethod
+    async def ensure_indexes(cls):
+        await cls.get_collection().create_index([("status", 1), ("next_attempt_at", 1)])
+
+    @staticmethod
+    def make_key(guild_id, suffix, date_str):
+        return f"{guild_id}:{suffix}:{date_str}"
+
+    @classmethod
+    async def enqueue(cls, guild_id, suffix, date_str, rows):
+        now = datetime.now(timezone.utc)
+        await cls.get_collection().update_one(
+            {"_id": cls.make_key(guild_id, suffix, date_str)},
+            {
+                "$set": {
+                    "guild_id": guild_id,
+                    "suffix": suffix,
+                    "date": date_str,
+                    "rows": rows,
+                    "status": "pending",
+                    "attempts": 0,
+                    "next_attempt_at": now,
+                    "updated_at": now
+                },
+                "$unset": {"last_error": ""},
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
+
+    @classmethod
+    async def get_due(cls, now, limit=200):
+        cursor = cls.get_collection().find({
+            "status": "pending",
+            "next_attempt_at": {"$lte": now}
+        }).sort("next_attempt_at", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    @classmethod
+    async def mark_done(cls, docs):
+        # Only delete the version we wrote; a newer enqueue for the same key stays pending
+        if not docs:
+            return
+        await cls.get_collection().delete_many({
+            "$or": [{"_id": d["_id"], "updated_at": d["updated_at"]} for d in docs]
+        })
+
+    @classmethod
+    async def mark_failed(cls, docs, error, next_attempt_at, max_attempts):
+        """Schedules a retry, or parks the entries that reached max_attempts. Returns the number parked."""
+        if not docs:
+            return 0
+        col = cls.get_collection()
+        # Like mark_done: a newer enqueue for the same key starts over with its own attempts
+        versions = [{"_id": d["_id"], "updated_at": d["updated_at"]} for d in docs]
+        error = str(error)[:500]
+        parked = await col.update_many(
+            {"$or": versions, "status": "pending", "attempts": {"$gte": max_attempts - 1}},
+            {
+                "$inc": {"attempts": 1},
+                "$set": {"status": "dead", "last_error": error}
+            }
+        )
+        await col.update_many(
+            {"$or": versions, "status": "pending"},
+            {
+                "$inc": {"attempts": 1},
+                "$set": {"next_attempt_at": next_attempt_at, "last_error": error}
+            }
+        )
+        return parked.modified_count
+
+    @classmethod
+    async def count_pending(cls):
+        return await cls.get_collection().count_documents({"status": "pending"})
+
+    @classmethod
+    async def count_dead(cls):
+        return await cls.get_collection().count_documents({"status": "dead"})
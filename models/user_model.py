@@ -1,87 +1,76 @@
 from database.connection import Database
+from utils.cache import CacheBus, TTLCache
 
 class UserModel:
+    """Global per-user totals.
+    Storage is delegated to the configured backend (see Database.repository)."""
+    # Leaderboard reads (get_top_bhai_users(cached=True)); any change to these fields drops them
+    cache = TTLCache("leaderboard", "users")
+    LEADERBOARD_FIELDS = {"global_bhai_count", "display_name"}
+
+    @staticmethod
+    def get_collection(profile="primary"):
+        # Raw MongoDB collection, for MongoDB-only features (maintenance pipelines, archival)
+        return Database.get_db(profile)['users']
+
     @staticmethod
-    def get_collection():
-        return Database.get_db()['users']
+    def repo():
+        return Database.repository("users")
+
+    @classmethod
+    async def ensure_indexes(cls):
+        return await cls.repo().ensure_indexes()
 
     @classmethod
     async def get_user(cls, user_id):
-        return await cls.get_collection().find_one({"_id": str(user_id)})
+        return await cls.repo().get_user(user_id)
 
     @classmethod
     async def upsert_user(cls, user_doc):
-        await cls.get_collection().replace_one(
-            {"_id": user_doc["_id"]}, 
-            user_doc, 
-            upsert=True
-        )
+        await cls.repo().upsert_user(user_doc)
+        cls.cache.clear()
 
     @classmethod
     async def increment_bhai_count(cls, user_id, display_name):
-        await cls.get_collection().update_one(
-            {"_id": str(user_id)},
-            {
-                "$inc": {"global_bhai_count": 1},
-                "$set": {"display_name": display_name}
-            },
-            upsert=True
-        )
+        await cls.repo().increment_bhai_count(user_id, display_name)
+        cls.cache.clear()
 
     @classmethod
     async def increment_voice_time(cls, user_id, user_name, regular_sec=0, overtime_sec=0):
-        await cls.get_collection().update_one(
-            {"_id": str(user_id)},
-            {
-                "$inc": {
-                    "total_regular_seconds": regular_sec,
-                    "total_overtime_seconds": overtime_sec
-                },
-                "$set": {"display_name": user_name}
-            },
-            upsert=True
-        )
+        return await cls.repo().increment_voice_time(user_id, user_name, regular_sec, overtime_sec)
 
     @classmethod
     async def get_voice_stats(cls, user_id):
-        doc = await cls.get_collection().find_one({"_id": str(user_id)})
-        if not doc:
-            return {"regular": 0, "overtime": 0}
-        return {
-            "regular": doc.get('total_regular_seconds', 0),
-            "overtime": doc.get('total_overtime_seconds', 0)
-        }
+        return await cls.repo().get_voice_stats(user_id)
 
     @classmethod
-    async def get_bhai_count(cls, user_id):
-        doc = await cls.get_collection().find_one({"_id": str(user_id)}, {"global_bhai_count": 1})
-        return doc.get('global_bhai_count', 0) if doc else 0
+    async def get_bhai_count(cls, user_id, profile="primary"):
+        return await cls.repo().get_bhai_count(user_id, profile)
 
     @classmethod
-    async def get_top_bhai_users(cls, limit=5):
-        cursor = cls.get_collection().find({"global_bhai_count": {"$gt": 0}}, {"display_name": 1, "global_bhai_count": 1})\
-                   .sort("global_bhai_count", -1)\
-                   .limit(limit)
-        return await cursor.to_list(length=limit)
+    async def get_top_bhai_users(cls, limit=5, profile="primary", cached=False):
+        if not cached:
+            return await cls.repo().get_top_bhai_users(limit, profile)
+        return await cls.cache.get_or_load(("top", limit, profile), lambda: cls.repo().get_top_bhai_users(limit, profile))
 
     @classmethod
-    async def get_bottom_bhai_users(cls, limit=5):
-        # Only users with count > 0 to make it meaningful? Or include 0s?
-        # Assuming > 0 for now to avoid listing inactive people as "leaders"
-        cursor = cls.get_collection().find({"global_bhai_count": {"$gt": 0}}, {"display_name": 1, "global_bhai_count": 1})\
-                   .sort("global_bhai_count", 1)\
-                   .limit(limit)
-        return await cursor.to_list(length=limit)
+    async def get_bottom_bhai_users(cls, limit=5, profile="primary"):
+        return await cls.repo().get_bottom_bhai_users(limit, profile)
 
     @classmethod
-    async def get_all_bhai_users(cls):
-        cursor = cls.get_collection().find({"global_bhai_count": {"$gt": 0}}, {"display_name": 1, "global_bhai_count": 1})\
-                   .sort("global_bhai_count", -1)
-        return await cursor.to_list(length=None)
+    async def get_all_bhai_users(cls, profile="primary"):
+        return await cls.repo().get_all_bhai_users(profile)
 
     @classmethod
-    async def get_bhai_rank(cls, user_id):
-        user_count = await cls.get_bhai_count(user_id)
-        # Count how many have strictly more
-        rank = await cls.get_collection().count_documents({"global_bhai_count": {"$gt": user_count}})
-        return rank + 1
+    async def get_bhai_rank(cls, user_id, profile="primary"):
+        return await cls.repo().get_bhai_rank(user_id, profile)
+
+    @classmethod
+    def on_change(cls, event):
+        # Voice-time increments don't move the leaderboard
+        if event["op"] == "update" and not cls.LEADERBOARD_FIELDS & set(event["fields"] or ()):
+            return
+        cls.cache.clear()
+
+
+CacheBus.subscribe("users", UserModel.on_change)
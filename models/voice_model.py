@@ -1,43 +1,54 @@
 from database.connection import Database
+from utils.cache import CacheBus, TTLCache
+from utils.time_utils import day_str
 
 class VoiceModel:
+    """Daily voice activity (one document per user per guild per day).
+    Storage is delegated to the configured backend (see Database.repository)."""
+    # One user's document for a day (get_day(cached=True))
+    cache = TTLCache("voice_day", "daily_activity")
+
+    @staticmethod
+    def get_collection(profile="primary"):
+        # Raw MongoDB collection, for MongoDB-only features (maintenance pipelines, archival)
+        return Database.get_db(profile)['daily_activity']
+
     @staticmethod
-    def get_collection():
-        return Database.get_db()['daily_activity']
+    def repo():
+        return Database.repository("voice")
 
     @classmethod
-    async def get_stats(cls, user_id, guild_id, start_date_str, end_date_str):
-        query = {
-            "guild_id": guild_id,
-            "date": {
-                "$gte": start_date_str,
-                "$lte": end_date_str
-            }
-        }
-        if user_id:
-            query["user_id"] = user_id
-            
-        cursor = cls.get_collection().find(query)
-        return await cursor.to_list(length=None)
+    async def ensure_indexes(cls):
+        return await cls.repo().ensure_indexes()
+
+    @classmethod
+    async def get_stats(cls, user_id, guild_id, start_date_str, end_date_str, profile="primary"):
+        return await cls.repo().get_stats(user_id, guild_id, start_date_str, end_date_str, profile)
+
+    @classmethod
+    async def get_day(cls, user_id, guild_id, date_str, cached=False):
+        """The user's document for one day, or None."""
+        async def load():
+            docs = await cls.repo().get_stats(user_id, guild_id, date_str, date_str)
+            return docs[0] if docs else None
+        if not cached:
+            return await load()
+        return await cls.cache.get_or_load((user_id, guild_id, date_str), load, ids=lambda doc: [doc["_id"]] if doc else [])
 
     @classmethod
     async def append_session(cls, user_id, guild_id, date_str, user_name, session_data, duration_seconds, is_overtime=False):
-        update_fields = {
-            "$set": {"user_name": user_name},
-            "$push": {"sessions": session_data}
-        }
-        
-        if is_overtime:
-             update_fields["$inc"] = {"overtime_duration": duration_seconds}
-        else:
-             update_fields["$inc"] = {"total_duration": duration_seconds}
-             
-        await cls.get_collection().update_one(
-            {
-                "user_id": user_id,
-                "guild_id": guild_id,
-                "date": date_str
-            },
-            update_fields,
-            upsert=True
-        )
+        await cls.repo().append_session(user_id, guild_id, date_str, user_name, session_data, duration_seconds, is_overtime)
+        cls.cache.invalidate((user_id, guild_id, date_str))
+
+    @classmethod
+    def on_change(cls, event):
+        if event["op"] == "invalidate":
+            cls.cache.clear()
+            return
+        doc = event["doc"]
+        if doc and "day" in doc:
+            cls.cache.invalidate((doc.get("user_id"), doc.get("guild_id"), day_str(doc["day"])))
+        cls.cache.invalidate_id(event["id"])
+
+
+CacheBus.subscribe("daily_activity", VoiceModel.on_change)
@@ -0,0 +1,121 @@
+import os
+from database.connection import Database
+from models.archive_model import ArchiveModel
+from models.attendance_model import AttendanceModel
+from models.voice_model import VoiceModel
+from utils.time_utils import get_ist_time, day_key
+
+class ArchiveService:
+    """
+    Moves closed months of daily_logs / daily_activity, and the attendance_events of those
+    months, into compressed monthly buckets (see ArchiveModel), keeping the hot collections
+    and their indexes small.
+    """
+    # Months kept live, counting the current one (2 = this month and last month)
+    KEEP_MONTHS = max(1, int(os.getenv("ARCHIVE_KEEP_MONTHS", "2")))
+    SOURCES = {"attendance": AttendanceModel, "voice": VoiceModel}
+
+    @classmethod
+    def cutoff_month(cls, now=None):
+        """First month (YYYY-MM) that stays live; everything before it is archived."""
+        now = now or get_ist_time()
+        index = now.year * 12 + (now.month - 1) - (cls.KEEP_MONTHS - 1)
+        return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+    # Passes over a month when documents change while it is archived
+    MAX_PASSES = 3
+    DELETE_BATCH = 100
+
+    @classmethod
+    async def _delete_unchanged(cls, col, docs):
+        """
+        Deletes the originals that still match the archived copies exactly. A document updated
+        since it was read (late auto-drop, a session's $inc) stays live. Returns the number deleted.
+        """
+        deleted = 0
+        for i in range(0, len(docs), cls.DELETE_BATCH):
+            batch = docs[i:i + cls.DELETE_BATCH]
+            result = await col.delete_many({"$or": [
+                {"_id": doc["_id"], "$expr": {"$eq": ["$$ROOT", {"$literal": doc}]}} for doc in batch
+            ]})
+            deleted += result.deleted_count
+        return deleted
+
+    @classmethod
+    async def _delete_events(cls, col, events):
+        """Deletes archived events (they never change, so by _id)."""
+        for i in range(0, len(events), cls.DELETE_BATCH):
+            await col.delete_many({"_id": {"$in": [event["_id"] for event in events[i:i + cls.DELETE_BATCH]]}})
+
+    @staticmethod
+    async def _closed_groups(col, cutoff):
+        """[(guild_id, YYYYMM)] with documents dated before the cutoff month, oldest first."""
+        groups = await col.aggregate([
+            {"$match": {"day": {"$lt": day_key(f"{cutoff}-01")}}},
+            # YYYYMMDD -> YYYYMM
+            {"$group": {"_id": {"guild_id": "$guild_id", "month": {"$floor": {"$divide": ["$day", 100]}}}}}
+        ]).to_list(length=None)
+        return [(group["_id"]["guild_id"], int(group["_id"]["month"])) for group in groups]
+
+    @classmethod
+    async def archive_closed_months(cls):
+        """
+        Archives every (guild, month) older than the cutoff. Safe to re-run: a bucket is
+        written before its originals are deleted, and re-archiving replaces documents by _id.
+        Returns {'buckets', 'documents', 'cutoff'}.
+        """
+        cutoff = cls.cutoff_month()
+        if not Database.is_mongo():
+            return {"buckets": 0, "documents": 0, "cutoff": cutoff}
+        buckets = 0
+        documents = 0
+
+        for kind, model in cls.SOURCES.items():
+            col = model.get_collection()
+            # The attendance event log is archived with the attendance buckets
+            events_col = AttendanceModel.repo().events() if kind == "attendance" else None
+            groups = set(await cls._closed_groups(col, cutoff))
+            if events_col is not None:
+                # Months whose documents are gone but events are left (an interrupted run)
+                groups.update(await cls._closed_groups(events_col, cutoff))
+
+            for guild_id, month_key in sorted(groups, key=lambda group: group[1]):
+                month = f"{month_key // 100:04d}-{month_key % 100:02d}"
+                month_query = {"guild_id": guild_id, "day": {"$gte": month_key * 100 + 1, "$lte": month_key * 100 + 31}}
+                archived = moved_events = 0
+                for _ in range(cls.MAX_PASSES):
+                    docs = await col.find(month_query).to_list(length=None)
+                    events = await events_col.find(month_query).to_list(length=None) if events_col is not None else []
+                    if not docs and not events:
+                        break
+
+                    # A month archived earlier can still receive late writes: they join the bucket as
+                    # extra documents, combined per (user, day) in its totals and on read
+                    existing = await ArchiveModel.get_docs(kind, guild_id, month)
+                    bucket_events = None
+                    if events_col is not None:
+                        bucket_events = ArchiveModel.merge_events(events, await ArchiveModel.get_events(guild_id, month))
+                    await ArchiveModel.save_bucket(kind, guild_id, month, ArchiveModel.merge_parts(docs, existing), bucket_events)
+                    if events:
+                        await cls._delete_events(events_col, events)
+                        moved_events += len(events)
+                    deleted = await cls._delete_unchanged(col, docs)
+                    archived += deleted
+                    if deleted == len(docs):
+                        break
+                    # Changed meanwhile: the next pass archives their current version
+                    print(f"[Archive] {kind} {month} (guild {guild_id}): {len(docs) - deleted} documents changed while archiving, re-reading.")
+                else:
+                    print(f"[Archive] {kind} {month} (guild {guild_id}): documents still changing, left live until the next run.")
+                if moved_events:
+                    print(f"[Archive] {kind} {month} (guild {guild_id}): archived {moved_events} events.")
+                if not archived:
+                    continue
+
+                buckets += 1
+                documents += archived
+                print(f"[Archive] {kind} {month} (guild {guild_id}): archived {archived} documents.")
+
+        if buckets:
+            print(f"[Archive] Archived {documents} documents into {buckets} buckets (before {cutoff}).")
+        return {"buckets": buckets, "documents": documents, "cutoff": cutoff}
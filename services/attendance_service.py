@@ -1,10 +1,10 @@
 from datetime import datetime
 from models.attendance_model import AttendanceModel
 from services.voice_service import VoiceService
-from utils.time_utils import get_ist_time
+from utils.time_utils import get_ist_time, parse_timestamp
 
 class AttendanceService:
-    
+
     @classmethod
     async def mark_attendance(cls, user_id, user_name, guild_id, status_value):
         now = get_ist_time()
@@ -39,29 +39,23 @@ class AttendanceService:
                 print("Error parsing ATTENDANCE_START_TIME")
 
         # Prepare Command Entry
-        command_entry = {
-            "timestamp": now.isoformat()
+        event = {
+            "ts": now
         }
         
         status_name = "Present"
         if status_value == "Present":
-            command_entry["command"] = "present"
+            event["command"] = "present"
         else:
-            command_entry["command"] = "halfday"
-            command_entry["type"] = status_value
+            event["command"] = "halfday"
+            event["type"] = status_value
             status_name = "Half Day"
 
         # Update DB
-        await AttendanceModel.create_or_update(
-            user_id, guild_id, target_date_str,
-            {
-                "$set": {
-                    "attendance_status": status_value,
-                    "user_name": user_name
-                },
-                "$push": {"commands_used": command_entry}
-            }
-        )
+        await AttendanceModel.record_event(user_id, guild_id, target_date_str, event, {
+            "attendance_status": status_value,
+            "user_name": user_name
+        })
         
         return {"success": True, "message": f"You have been marked **{status_name}**."}
 
@@ -75,9 +69,9 @@ class AttendanceService:
         if not existing or existing.get('attendance_status') not in ['Present', 'joining_mid_day', 'leaving_mid_day']:
              return {"success": False, "message": "You must mark **Attendance** first."}
              
-        await AttendanceModel.push_command(user_id, guild_id, today_str, {
+        await AttendanceModel.record_event(user_id, guild_id, today_str, {
             "command": "lunch",
-            "timestamp": now.isoformat()
+            "ts": now
         })
         return {"success": True, "message": "Enjoy your meal! Status set to **Lunch**. Use `/resume` to resume."}
 
@@ -91,10 +85,10 @@ class AttendanceService:
         if not existing or existing.get('attendance_status') not in ['Present', 'joining_mid_day', 'leaving_mid_day']:
              return {"success": False, "message": "You must mark **Attendance** first."}
              
-        await AttendanceModel.push_command(user_id, guild_id, today_str, {
+        await AttendanceModel.record_event(user_id, guild_id, today_str, {
             "command": "away",
             "reason": reason,
-            "timestamp": now.isoformat()
+            "ts": now
         })
         return {"success": True, "message": f"Status set to **Away**: {reason}. Use `/resume` to resume."}
 
@@ -107,35 +101,18 @@ class AttendanceService:
         if not doc:
             return {"success": False, "message": "No attendance record found for today."}
             
-        # Find last open status (lunch or away)
-        commands = doc.get('commands_used', [])
-        target_idx = -1
-        target_cmd = None
-        
-        for i, cmd in enumerate(commands):
-            if cmd.get('command') in ['lunch', 'away'] and 'end_time' not in cmd:
-                target_idx = i
-                target_cmd = cmd
-                # Keep searching for the LATEST one? Usually just one open.
-                # But let's take the last one found.
-        
-        if target_idx == -1:
+        state = doc.get('state') or {}
+        if state.get('status') not in AttendanceModel.BREAK_COMMANDS:
             return {"success": False, "message": "You are not currently away or on lunch."}
             
-        # Calculate duration
-        start_time = datetime.fromisoformat(target_cmd['timestamp'])
+        # Calculate duration (the break started with the last command)
+        start_time = parse_timestamp(state['at'])
         duration = (now - start_time).total_seconds()
         
-        # Close the open status
-        await AttendanceModel.update_command_by_index(doc['_id'], target_idx, {
-            "end_time": now.isoformat(),
-            "duration": round(duration, 2)
-        })
-        
-        # Push resume
-        await AttendanceModel.push_command(user_id, guild_id, today_str, {
+        await AttendanceModel.record_event(user_id, guild_id, today_str, {
             "command": "resume",
-            "timestamp": now.isoformat()
+            "ts": now,
+            "duration": round(duration, 2)
         })
         
         return {"success": True, "message": "Welcome back! Status set to **Active**."}
@@ -149,29 +126,21 @@ class AttendanceService:
         if not doc:
             return {"success": False, "message": "No attendance record found for today."}
 
-        commands = doc.get('commands_used', [])
-        present_cmd = next((c for c in commands if c.get('command') in ['present', 'halfday']), None)
-        
-        if not present_cmd:
+        state = doc.get('state') or {}
+        if not state.get('work_start'):
              return {"success": False, "message": "You haven't marked **Attendance** today."}
         
-        if 'end_time' in present_cmd:
+        if state.get('dropped_at'):
              return {"success": False, "message": "You have already dropped for today."}
 
         # Calculate Duration
-        start_time = datetime.fromisoformat(present_cmd['timestamp'])
+        start_time = parse_timestamp(state['work_start'])
         duration = (now - start_time).total_seconds()
         
-        # Update Present/Halfday
-        await AttendanceModel.update_command(doc['_id'], present_cmd['command'], {
-            "commands_used.$.end_time": now.isoformat(),
-            "commands_used.$.duration": round(duration, 2)
-        })
-        
-        # Push drop
-        await AttendanceModel.push_command(user.id, guild_id, today_str, {
+        await AttendanceModel.record_event(user.id, guild_id, today_str, {
             "command": "drop",
-            "timestamp": now.isoformat()
+            "ts": now,
+            "duration": round(duration, 2)
         })
         
         # Trigger Voice Auto-Reconnect
@@ -180,51 +149,47 @@ class AttendanceService:
         return {"success": True, "message": f"Good bye! Day ended. Duration: {round(duration/3600, 2)}h"}
 
     @classmethod
-    async def auto_drop(cls, user, guild_id):
+    async def auto_drop(cls, user, guild_id, date_str=None, at=None):
         """
         Forcefully ends the day for a user (Auto-Drop).
+        date_str/at let the scheduler replay a missed run: the day is ended at the
+        scheduled time `at` rather than now.
         """
-        now = get_ist_time()
-        today_str = now.strftime('%Y-%m-%d')
+        now = at or get_ist_time()
+        today_str = date_str or now.strftime('%Y-%m-%d')
+        is_live = at is None
         
         doc = await AttendanceModel.find_by_date(user.id, guild_id, today_str)
         if not doc:
             return {"success": False, "message": "No attendance record found."}
 
-        commands = doc.get('commands_used', [])
-        # Find active Present/Halfday
-        present_cmd = next((c for c in commands if c.get('command') in ['present', 'halfday']), None)
-        
-        if not present_cmd:
+        state = doc.get('state') or {}
+        if not state.get('work_start'):
              return {"success": False, "message": "Not marked present."}
         
         # If already ended, skip
-        if 'end_time' in present_cmd:
+        if state.get('dropped_at'):
              return {"success": False, "message": "Already dropped."}
 
         # Calculate Duration
-        start_time = datetime.fromisoformat(present_cmd['timestamp'])
-        duration = (now - start_time).total_seconds()
-        
-        # Update Present/Halfday
-        await AttendanceModel.update_command(doc['_id'], present_cmd['command'], {
-            "commands_used.$.end_time": now.isoformat(),
-            "commands_used.$.duration": round(duration, 2)
-        })
+        start_time = parse_timestamp(state['work_start'])
+        duration = max(0, (now - start_time).total_seconds())
         
-        # Push auto-drop command
-        await AttendanceModel.push_command(user.id, guild_id, today_str, {
+        await AttendanceModel.record_event(user.id, guild_id, today_str, {
             "command": "auto-drop",
-            "timestamp": now.isoformat()
+            "ts": now,
+            "duration": round(duration, 2)
         })
         
-        # Trigger Voice Auto-Reconnect
-        await VoiceService.trigger_auto_reconnect(user, guild_id)
+        # Trigger Voice Auto-Reconnect (a replayed drop has no live session to switch)
+        if is_live:
+            await VoiceService.trigger_auto_reconnect(user, guild_id)
         
         return {"success": True, "message": f"Auto-dropped {user.display_name}."}
 
     @classmethod
-    async def mark_absent(cls, user_id, user_name, guild_id, date_str, reason):
+    async def mark_absent(cls, user_id, user_name, guild_id, date_str, reason, allow_past=False):
+        """allow_past is for the scheduler replaying a missed Auto-Absent run."""
         now = get_ist_time()
         today_date = now.date()
         
@@ -234,7 +199,7 @@ class AttendanceService:
         except ValueError:
              return {"success": False, "message": "Invalid date. Use YYYY-MM-DD"}
              
-        if target_date < today_date:
+        if target_date < today_date and not allow_past:
              return {"success": False, "message": "You cannot mark attendance for past dates."}
 
         if target_date.weekday() >= 5:
@@ -245,21 +210,13 @@ class AttendanceService:
         if existing and existing.get('attendance_status') in ['Present', 'Absent', 'joining_mid_day', 'leaving_mid_day']:
              return {"success": False, "message": f"Status already set to **{existing.get('attendance_status')}** for {date_str}."}
 
-        await AttendanceModel.create_or_update(
-            user_id, guild_id, date_str,
-            {
-                "$set": {
-                    "attendance_status": "Absent",
-                    "user_name": user_name,
-                    "reason": reason
-                },
-                "$push": {
-                    "commands_used": {
-                        "command": "absent",
-                        "reason": reason,
-                        "timestamp": now.isoformat()
-                    }
-                }
-            }
-        )
+        await AttendanceModel.record_event(user_id, guild_id, date_str, {
+            "command": "absent",
+            "reason": reason,
+            "ts": now
+        }, {
+            "attendance_status": "Absent",
+            "user_name": user_name,
+            "reason": reason
+        })
         return {"success": True, "message": f"Marked as **Absent** on {date_str}: {reason}"}
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+from pymongo.errors import OperationFailure, PyMongoError
+from database.connection import Database
+from models.maintenance_state_model import MaintenanceStateModel
+from utils.cache import CacheBus
+
+class ChangeStreamService:
+    """
+    Watches the collections that have in-process caches (see CacheBus) with MongoDB change
+    streams and publishes every change as an invalidation, so caches stay correct across bot
+    processes and direct database edits.
+    Resume tokens are saved in maintenance_state, so a restarted stream picks up where it
+    stopped. While a stream is down its collection falls back to TTL expiry (CACHE_FALLBACK_TTL).
+    Change streams need a replica set; on a standalone server every cache stays on TTL expiry.
+    """
+    TOKEN_SAVE_INTERVAL = 10  # seconds between resume token writes
+    MAX_RETRY_DELAY = int(os.getenv("CHANGE_STREAM_MAX_RETRY_DELAY", "60"))
+    # Server error codes
+    HISTORY_LOST = 286  # resume token no longer in the oplog
+    NOT_REPLICA_SET = 40573
+
+    _tasks = {}
+
+    @classmethod
+    def start(cls):
+        if not Database.is_mongo():
+            # Single process and every write goes through the models: local invalidation is exact
+            for collection in CacheBus.collections():
+                CacheBus.set_live(collection, True)
+            return
+        for collection in CacheBus.collections():
+            task = cls._tasks.get(collection)
+            if task is None or task.done():
+                cls._tasks[collection] = asyncio.create_task(cls._watch(collection))
+
+    @classmethod
+    def stop(cls):
+        for task in cls._tasks.values():
+            task.cancel()
+        cls._tasks = {}
+
+    @staticmethod
+    def _state_key(collection):
+        return f"change_stream:{collection}"
+
+    @classmethod
+    async def _load_token(cls, collection):
+        try:
+            state = await MaintenanceStateModel.get(cls._state_key(collection))
+        except PyMongoError as e:
+            print(f"[ChangeStream] Could not load resume token for {collection}: {e}")
+            return None
+        return state.get("resume_token") if state else None
+
+    @classmethod
+    async def _save_token(cls, collection, token):
+        try:
+            await MaintenanceStateModel.set(cls._state_key(collection), {"resume_token": token})
+        except PyMongoError as e:
+            print(f"[ChangeStream] Could not save resume token for {collection}: {e}")
+
+    @staticmethod
+    def _publish(collection, change):
+        op = change["operationType"]
+        if op in ("insert", "update", "replace", "delete"):
+            description = change.get("updateDescription") or {}
+            fields = list(description.get("updatedFields", {})) + list(description.get("removedFields", []))
+            CacheBus.publish(collection, op, change["documentKey"]["_id"], change.get("fullDocument"), fields or None)
+        else:
+            # drop, rename, dropDatabase, invalidate
+            CacheBus.publish(collection, "invalidate")
+
+    @classmethod
+    async def _watch(cls, collection):
+        col = Database.get_db()[collection]
+        token = await cls._load_token(collection)
+        delay = 1
+        while True:
+            try:
+                async with col.watch(resume_after=token, max_await_time_ms=1000) as stream:
+                    CacheBus.set_live(collection, True)
+                    delay = 1
+                    saved_at = time.monotonic()
+                    while stream.alive:
+                        change = await stream.try_next()
+                        if change is not None:
+                            cls._publish(collection, change)
+                            if change["operationType"] == "invalidate":
+                                token = None  # An invalidated stream cannot be resumed
+                                break
+                        token = stream.resume_token
+                        if token and time.monotonic() - saved_at >= cls.TOKEN_SAVE_INTERVAL:
+                            await cls._save_token(collection, token)
+                            saved_at = time.monotonic()
+                if token:
+                    await cls._save_token(collection, token)
+            except asyncio.CancelledError:
+                if token:
+                    await cls._save_token(collection, token)
+                raise
+            except OperationFailure as e:
+                CacheBus.set_live(collection, False)
+                if e.code == cls.NOT_REPLICA_SET:
+                    print(f"[ChangeStream] {collection}: change streams need a replica set, caches use TTL expiry.")
+                    return
+                if e.code == cls.HISTORY_LOST:
+                    # Changes since the token are gone: the TTL fallback already dropped the cache
+                    print(f"[ChangeStream] {collection}: resume token expired, restarting from now.")
+                    token = None
+                    continue
+                print(f"[ChangeStream] {collection}: {e}, retrying in {delay}s")
+            except PyMongoError as e:
+                CacheBus.set_live(collection, False)
+                print(f"[ChangeStream] {collection}: {e}, retrying in {delay}s")
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, cls.MAX_RETRY_DELAY)
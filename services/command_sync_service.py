@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import discord
+from database.connection import Database
+from models.maintenance_state_model import MaintenanceStateModel
+
+class CommandSyncService:
+    """
+    Syncs the slash-command tree with Discord only when it changed: each scope (a guild or
+    "global") is fingerprinted from its command payloads, and the fingerprint of the last
+    successful sync is stored in maintenance_state. Runs once per process, however many
+    times on_ready fires (it fires again after reconnects).
+    With SQLite storage nothing is stored, so every process start syncs once.
+    FORCE_COMMAND_SYNC=1 syncs regardless (e.g. after commands were changed from elsewhere).
+    """
+    FORCE = os.getenv("FORCE_COMMAND_SYNC", "").strip().lower() in ("1", "true", "yes")
+    _done = False
+
+    @staticmethod
+    def fingerprint(tree, guild=None):
+        """Stable hash of the payloads Discord would receive for this scope."""
+        payloads = []
+        for command in tree.get_commands(guild=guild):
+            try:
+                payloads.append(command.to_dict(tree))
+            except TypeError:
+                # discord.py < 2.4: to_dict() takes no tree
+                payloads.append(command.to_dict())
+        payloads.sort(key=lambda payload: (payload.get("type", 1), payload["name"]))
+        encoded = json.dumps(payloads, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _state_key(bot, guild):
+        return f"command_sync:{bot.application_id}:{guild.id if guild else 'global'}"
+
+    @classmethod
+    async def _stored_fingerprint(cls, key):
+        if not Database.is_mongo():
+            return None
+        try:
+            state = await MaintenanceStateModel.get(key)
+        except Exception as e:
+            print(f"[CommandSync] Could not read the stored fingerprint ({e}), syncing.")
+            return None
+        return state.get("fingerprint") if state else None
+
+    @classmethod
+    async def sync_scope(cls, bot, guild=None):
+        """Syncs one scope if its fingerprint changed. Returns the synced command count, or None if unchanged."""
+        key = cls._state_key(bot, guild)
+        fingerprint = cls.fingerprint(bot.tree, guild)
+        if not cls.FORCE and await cls._stored_fingerprint(key) == fingerprint:
+            return None
+
+        synced = await bot.tree.sync(guild=guild)
+        if Database.is_mongo():
+            await MaintenanceStateModel.set(key, {"fingerprint": fingerprint, "commands": len(synced)})
+        return len(synced)
+
+    @classmethod
+    async def sync_once(cls, bot, target_guild_id=None):
+        """
+        Registers the commands for target_guild_id (instant) and clears the global ones,
+        or registers them globally (may take up to an hour) when no guild is set.
+        """
+        if cls._done:
+            return
+        cls._done = True
+        try:
+            if target_guild_id:
+                guild = discord.Object(id=int(target_guild_id))
+                # Copy global commands to guild
+                bot.tree.copy_global_to(guild=guild)
+                synced = await cls.sync_scope(bot, guild)
+
+                # Clear global commands to prevent duplicates
+                bot.tree.clear_commands(guild=None)
+                await cls.sync_scope(bot, None)
+
+                if synced is None:
+                    print(f'✅ Commands for Guild {target_guild_id} unchanged, sync skipped')
+                else:
+                    print(f'✅ Synced {synced} command(s) to Guild {target_guild_id} (Instant update)')
+            else:
+                synced = await cls.sync_scope(bot, None)
+                if synced is None:
+                    print('Global commands unchanged, sync skipped')
+                else:
+                    print(f'Synced {synced} command(s) globally (May take up to 1 hour)')
+        except Exception:
+            # Let the next on_ready try again
+            cls._done = False
+            raise
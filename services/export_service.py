@@ -1,43 +1,99 @@
-import csv
-import io
+import asyncio
+import os
+import tempfile
+from collections import deque
 import discord
 from datetime import datetime, timedelta
 from models.attendance_model import AttendanceModel
 from models.voice_model import VoiceModel
 from models.user_model import UserModel
+from utils.time_utils import doc_date
 
 class ExportService:
+    # Max month-chunks fetched in parallel for long ranges
+    FETCH_CONCURRENCY = int(os.getenv("EXPORT_FETCH_CONCURRENCY", "3"))
+
+    # Long-format columnar export (see generate_parquet_report)
+    PARQUET_COLUMNS = [
+        "guild_id", "user_id", "date", "status",
+        "regular_seconds", "overtime_seconds", "session_count"
+    ]
+
+    @staticmethod
+    def _iter_month_chunks(start_dt, end_dt):
+        """
+        Splits [start_dt, end_dt] into month-bounded (chunk_start, chunk_end) pairs.
+        """
+        chunk_start = start_dt
+        while chunk_start <= end_dt:
+            next_month = chunk_start.replace(day=28) + timedelta(days=4)
+            month_end = next_month - timedelta(days=next_month.day)
+            chunk_end = min(month_end, end_dt)
+            yield chunk_start, chunk_end
+            chunk_start = chunk_end + timedelta(days=1)
+
+    @classmethod
+    async def _fetch_chunk(cls, guild_id, chunk_start, chunk_end, profile="analytics"):
+        start_str = chunk_start.strftime('%Y-%m-%d')
+        end_str = chunk_end.strftime('%Y-%m-%d')
+        # Attendance and Voice are independent, fetch them together
+        attendance_logs, voice_logs = await asyncio.gather(
+            AttendanceModel.get_logs_in_range(guild_id, start_str, end_str, profile=profile),
+            VoiceModel.get_stats(None, guild_id, start_str, end_str, profile=profile)
+        )
+        return chunk_start, chunk_end, attendance_logs, voice_logs
+
+    @classmethod
+    async def iter_activity_chunks(cls, guild_id, start_dt, end_dt, concurrency=None, profile="analytics"):
+        """
+        Async generator over month-sized chunks of the range.
+        Yields (chunk_start, chunk_end, attendance_logs, voice_logs) in date order,
+        while up to `concurrency` chunks are fetched ahead in the background.
+        At most `concurrency` chunks are held in memory at once.
+        Reads use the "analytics" profile (secondaries) unless `profile` says otherwise.
+        """
+        concurrency = max(1, concurrency or cls.FETCH_CONCURRENCY)
+        chunks = cls._iter_month_chunks(start_dt, end_dt)
+        pending = deque()
+
+        def schedule_next():
+            chunk = next(chunks, None)
+            if chunk:
+                pending.append(asyncio.create_task(cls._fetch_chunk(guild_id, *chunk, profile)))
+
+        for _ in range(concurrency):
+            schedule_next()
+
+        try:
+            while pending:
+                result = await pending.popleft()
+                schedule_next()
+                yield result
+        finally:
+            # Consumer stopped early (or failed): don't leave fetches running
+            for task in pending:
+                task.cancel()
+
     @classmethod
-    async def fetch_activity_data(cls, guild, start_date, end_date):
+    async def fetch_activity_data(cls, guild, start_date, end_date, profile="analytics"):
         """
         Fetches and structures activity data for export.
+        profile="primary" is for data written moments ago (e.g. a replayed auto-absent).
         Returns: {
             'attendance': rows (list of lists) -> [[Date, User1, User2...], ...],
             'voice': rows (list of lists) -> [[Date, U1(V), U1(OT), " ", ...], ...]
         }
         """
         guild_id = guild.id
-        
-        # 1. Fetch Data
-        attendance_logs = await AttendanceModel.get_logs_in_range(guild_id, start_date, end_date)
-        voice_logs = await VoiceModel.get_stats(None, guild_id, start_date, end_date)
-        
-        # 2. Organize Data
-        attendance_map = {}
-        for log in attendance_logs:
-            d = log['date']
-            u = log['user_id']
-            if d not in attendance_map: attendance_map[d] = {}
-            attendance_map[d][u] = log
-            
-        voice_map = {}
-        for log in voice_logs:
-            d = log['date']
-            u = log['user_id']
-            if d not in voice_map: voice_map[d] = {}
-            voice_map[d][u] = log
-            
-        # 3. Identify all Users
+
+        try:
+            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            start_dt = datetime.now()
+            end_dt = datetime.now()
+
+        # 1. Identify current Users
         all_user_ids = set()
         user_names = {} # {id: name}
         
@@ -46,30 +102,34 @@ class ExportService:
             if not member.bot:
                 all_user_ids.add(member.id)
                 user_names[member.id] = member.display_name
-        
-        # Add historical users
-        for log in attendance_logs:
-            uid = log['user_id']
-            all_user_ids.add(uid)
-            if uid not in user_names and 'user_name' in log: 
-                user_names[uid] = log['user_name']
-            
-        for log in voice_logs:
-            uid = log['user_id']
-            all_user_ids.add(uid)
-            if uid not in user_names and 'user_name' in log:
-                 user_names[uid] = log['user_name']
+
+        # 2. Fetch Data (month chunks, fetched concurrently) and merge as they arrive.
+        # Only the fields needed for the report are kept, not the raw documents.
+        attendance_map = {} # {date: {uid: status}}
+        voice_map = {} # {date: {uid: (regular_sec, overtime_sec)}}
+
+        async for _, _, attendance_logs, voice_logs in cls.iter_activity_chunks(guild_id, start_dt, end_dt, profile=profile):
+            for log in attendance_logs:
+                uid = log['user_id']
+                attendance_map.setdefault(doc_date(log), {})[uid] = log.get('attendance_status', 'Absent')
+                # Add historical users
+                all_user_ids.add(uid)
+                if uid not in user_names and 'user_name' in log:
+                    user_names[uid] = log['user_name']
+
+            for log in voice_logs:
+                uid = log['user_id']
+                voice_map.setdefault(doc_date(log), {})[uid] = (
+                    log.get('total_duration', 0),
+                    log.get('overtime_duration', 0)
+                )
+                all_user_ids.add(uid)
+                if uid not in user_names and 'user_name' in log:
+                    user_names[uid] = log['user_name']
             
         sorted_users = sorted(list(all_user_ids), key=lambda x: user_names.get(x, str(x)))
         
-        # 4. Generate Date Range
-        try:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-        except ValueError:
-            start_dt = datetime.now()
-            end_dt = datetime.now()
-            
+        # 3. Generate Date Range
         delta = end_dt - start_dt
         
         date_list = []
@@ -77,7 +137,7 @@ class ExportService:
             day = start_dt + timedelta(days=i)
             date_list.append(day)
 
-        # 5. Build Headers
+        # 4. Build Headers
         # Attendance Headers: Date, User A, User B...
         att_headers = ["Date"]
         for uid in sorted_users:
@@ -102,7 +162,7 @@ class ExportService:
             m = minutes % 60
             return f"{h:02}:{m:02}"
 
-        # 6. Build Data Rows
+        # 5. Build Data Rows
         for day in date_list:
             day_str = day.strftime('%Y-%m-%d')
             
@@ -115,14 +175,14 @@ class ExportService:
             
             for uid in sorted_users:
                 # Get Data
-                att_record = attendance_map.get(day_str, {}).get(uid)
+                att_status = attendance_map.get(day_str, {}).get(uid)
                 voice_record = voice_map.get(day_str, {}).get(uid)
                 
                 # --- Attendance Logic ---
                 if is_weekend:
                     status = "Holiday"
-                elif att_record:
-                    status = att_record.get('attendance_status', 'Absent')
+                elif att_status:
+                    status = att_status
                 else:
                     status = "Absent"
                 att_row.append(status)
@@ -132,8 +192,7 @@ class ExportService:
                 ot_mins = 0
                 
                 if voice_record:
-                    reg_sec = voice_record.get('total_duration', 0)
-                    ot_sec = voice_record.get('overtime_duration', 0)
+                    reg_sec, ot_sec = voice_record
                     reg_mins = int(round(reg_sec / 60))
                     ot_mins = int(round(ot_sec / 60))
                 
@@ -160,6 +219,9 @@ class ExportService:
 
     @classmethod
     async def generate_csv_reports(cls, guild, start_date, end_date):
+        import csv
+        import io
+
         data = await cls.fetch_activity_data(guild, start_date, end_date)
         att_rows = data['attendance']
         voice_rows = data['voice']
@@ -189,11 +251,91 @@ class ExportService:
         from services.google_sheets_service import GoogleSheetsService
         
         data = await cls.fetch_activity_data(guild, start_date, end_date)
-        
-        # NOTE: Manual Export to manual sheet ID needs update?
-        # User only uses this via Command.
-        # This function 'generate_sheet_report' relies on 'export_to_sheet'.
-        # We need to update export_to_sheet to handle dict? Or call it twice?
-        # For now, let's just export Attendance to keep it simple, OR refactor this too.
-        # Let's assume for now commands just get Attendance.
-        return await GoogleSheetsService.export_to_sheet(sheet_id_or_url, data['attendance'])
+
+        # Both Attendance and Voice tabs, written in a single batched request
+        return await GoogleSheetsService.export_to_sheet(sheet_id_or_url, data)
+
+    @classmethod
+    async def generate_parquet_report(cls, guild, start_date, end_date):
+        """
+        Writes a long-format, typed Parquet file (one row per user per day):
+        guild_id, user_id, date, status, regular_seconds, overtime_seconds, session_count.
+        Data is fetched and written one month at a time (one row group per month),
+        so memory stays bounded regardless of the range length.
+        Returns a discord.File backed by a temporary file.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("guild_id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("date", pa.date32()),
+            ("status", pa.dictionary(pa.int8(), pa.string())),
+            ("regular_seconds", pa.float64()),
+            ("overtime_seconds", pa.float64()),
+            ("session_count", pa.int32())
+        ])
+
+        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+        guild_id = guild.id
+
+        member_ids = {m.id for m in guild.members if not m.bot}
+
+        fp = tempfile.TemporaryFile()
+        try:
+            writer = pq.ParquetWriter(fp, schema, compression="zstd")
+            try:
+                async for chunk_start, chunk_end, attendance_logs, voice_logs in cls.iter_activity_chunks(guild_id, start_dt, end_dt):
+                    attendance_map = {(doc_date(log), log['user_id']): log for log in attendance_logs}
+                    voice_map = {(doc_date(log), log['user_id']): log for log in voice_logs}
+
+                    user_ids = set(member_ids)
+                    user_ids.update(log['user_id'] for log in attendance_logs)
+                    user_ids.update(log['user_id'] for log in voice_logs)
+                    sorted_users = sorted(user_ids)
+
+                    columns = {name: [] for name in cls.PARQUET_COLUMNS}
+                    day = chunk_start
+                    while day <= chunk_end:
+                        day_str = day.strftime('%Y-%m-%d')
+                        is_weekend = day.weekday() >= 5
+
+                        for uid in sorted_users:
+                            att_record = attendance_map.get((day_str, uid))
+                            voice_record = voice_map.get((day_str, uid))
+
+                            if is_weekend:
+                                status = "Holiday"
+                            elif att_record:
+                                status = att_record.get('attendance_status', 'Absent')
+                            else:
+                                status = "Absent"
+
+                            columns["guild_id"].append(guild_id)
+                            columns["user_id"].append(uid)
+                            columns["date"].append(day.date())
+                            columns["status"].append(status)
+                            if voice_record:
+                                columns["regular_seconds"].append(float(voice_record.get('total_duration', 0)))
+                                columns["overtime_seconds"].append(float(voice_record.get('overtime_duration', 0)))
+                                columns["session_count"].append(len(voice_record.get('sessions', [])))
+                            else:
+                                columns["regular_seconds"].append(0.0)
+                                columns["overtime_seconds"].append(0.0)
+                                columns["session_count"].append(0)
+
+                        day += timedelta(days=1)
+
+                    # One row group per month chunk
+                    writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            finally:
+                writer.close()
+        except BaseException:
+            # Failed or cancelled export: don't leave the descriptor open until GC
+            fp.close()
+            raise
+
+        fp.seek(0)
+        return discord.File(fp=fp, filename=f"Activity_{start_date}_to_{end_date}.parquet")
@@ -1,6 +1,7 @@
 import discord
 from models.attendance_model import AttendanceModel
 from models.user_model import UserModel
+from services.notification_service import NotificationService
 from utils.time_utils import get_ist_time
 
 class GeneralService:
@@ -29,19 +30,19 @@ class GeneralService:
         
     @classmethod
     async def get_top_bhai_users(cls, limit=5):
-        return await UserModel.get_top_bhai_users(limit)
+        return await UserModel.get_top_bhai_users(limit, profile="analytics")
 
     @classmethod
     async def get_bottom_bhai_users(cls, limit=5):
-        return await UserModel.get_bottom_bhai_users(limit)
+        return await UserModel.get_bottom_bhai_users(limit, profile="analytics")
 
     @classmethod
     async def get_all_bhai_users(cls):
-        return await UserModel.get_all_bhai_users()
+        return await UserModel.get_all_bhai_users(profile="analytics")
 
     @classmethod
     async def get_bhai_rank(cls, user):
-        return await UserModel.get_bhai_rank(user.id)
+        return await UserModel.get_bhai_rank(user.id, profile="analytics")
 
     @classmethod
     async def process_message(cls, message: discord.Message):
@@ -53,15 +54,16 @@ class GeneralService:
         # 1. Bhai Count
         if "bhai" in message.content.lower():
             if message.guild:
-                 # Check Leaderboard Before
-                 top_before = await UserModel.get_top_bhai_users(limit=1)
+                 # Check Leaderboard Before (primary: must see our own increment below)
+                 top_before = await UserModel.get_top_bhai_users(limit=1, cached=True)
                  old_king = top_before[0] if top_before else None
                  
                  # Increment
                  await cls.increment_bhai(message.author.id, message.author.display_name, message.guild.id)
                  
                  # Check Leaderboard After
-                 top_after = await UserModel.get_top_bhai_users(limit=1)
+                 # (our increment dropped the cached top-1, so this re-reads it)
+                 top_after = await UserModel.get_top_bhai_users(limit=1, cached=True)
                  new_king = top_after[0] if top_after else None
                  
                  # Surpass Logic
@@ -105,7 +107,7 @@ class GeneralService:
                          ]
                          troll = random.choice(trolls)
                          
-                         await message.channel.send(f"👑 **LEADERBOARD UPDATE**: **{new_name}** has surpassed **{old_name}** with **{new_count}** searches!\n*{troll}*")
+                         NotificationService.notify(message.channel, f"👑 **LEADERBOARD UPDATE**: **{new_name}** has surpassed **{old_name}** with **{new_count}** searches!\n*{troll}*")
         
         # 2. Auto-Reply
         if message.mentions:
@@ -116,25 +118,24 @@ class GeneralService:
                 today_str = now.strftime('%Y-%m-%d')
                 
                 # Check DB
-                doc = await AttendanceModel.find_by_date(mention.id, message.guild.id, today_str)
+                doc = await AttendanceModel.find_by_date(mention.id, message.guild.id, today_str, cached=True)
                 if doc:
                     # Check Absent
                     if doc.get('attendance_status') == 'Absent':
                         reason = doc.get('reason', 'Absent')
-                        await message.channel.send(f"⚠️ **{mention.display_name}** is absent today ({today_str}): {reason}")
+                        NotificationService.notify(message.channel, f"⚠️ **{mention.display_name}** is absent today ({today_str}): {reason}")
                         continue
                     
                     # Check Status (Lunch/Away/Drop)
-                    commands = doc.get('commands_used', [])
-                    if commands:
-                        last_cmd = commands[-1]
-                        cmd_name = last_cmd.get('command')
+                    state = doc.get('state')
+                    if state:
+                        cmd_name = state.get('command')
                         
-                        # Only if Open (no end_time) or Drop
+                        # Only an open break (status still lunch/away) or Drop
                         if cmd_name == 'drop':
-                            await message.channel.send(f"⚠️ **{mention.display_name}** has signed out for the day.")
-                        elif cmd_name == 'lunch' and 'end_time' not in last_cmd:
-                            await message.channel.send(f"🍔 **{mention.display_name}** is on lunch break.")
-                        elif cmd_name == 'away' and 'end_time' not in last_cmd:
-                            r = last_cmd.get('reason', 'AFK')
-                            await message.channel.send(f"⚠️ **{mention.display_name}** is currently away: {r}")
+                            NotificationService.notify(message.channel, f"⚠️ **{mention.display_name}** has signed out for the day.")
+                        elif state.get('status') == 'lunch':
+                            NotificationService.notify(message.channel, f"🍔 **{mention.display_name}** is on lunch break.")
+                        elif state.get('status') == 'away':
+                            r = state.get('reason') or 'AFK'
+                            NotificationService.notify(message.channel, f"⚠️ **{mention.display_name}** is currently away: {r}")
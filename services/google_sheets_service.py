@@ -1,112 +1,328 @@
 import gspread
 import os
+import random
+import threading
+from datetime import datetime
 from google.oauth2.service_account import Credentials
+from models.sheet_model import SheetModel
+from utils import sheets_utils
+from utils.async_utils import BlockingExecutor
+from utils.rate_limiter import RateLimiter
 
 class GoogleSheetsService:
     SCOPES = [
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive"
     ]
-    
+
+    # gspread is synchronous: every Sheets call runs on this pool, never on the event loop.
+    executor = BlockingExecutor(
+        "sheets-io",
+        max_workers=int(os.getenv("SHEETS_MAX_WORKERS", "4")),
+        default_timeout=float(os.getenv("SHEETS_CALL_TIMEOUT", "60"))
+    )
+
+    # --- Caches (live for the whole process) ---
+    _client = None
+    _client_lock = threading.Lock()
+    _spreadsheets = {} # {sheet_id_or_url: Spreadsheet}
+    _worksheets = {} # {(spreadsheet_id, title): {id, title, row_count, col_count, next_row}}
+
+    # Shared quota for every Sheets API call made by this process (per-minute, per-user quotas)
+    read_limiter = RateLimiter("sheets-read", per_minute=int(os.getenv("SHEETS_READS_PER_MINUTE", "60")))
+    write_limiter = RateLimiter("sheets-write", per_minute=int(os.getenv("SHEETS_WRITES_PER_MINUTE", "60")))
+    MAX_RATE_LIMIT_RETRIES = 3
+
+    @classmethod
+    async def _run(cls, func, *args, **kwargs):
+        """Runs a blocking gspread call on the Sheets executor (with per-call timeout)."""
+        return await cls.executor.run(func, *args, **kwargs)
+
+    @classmethod
+    async def _read(cls, func, *args, **kwargs):
+        return await cls._limited(cls.read_limiter, func, *args, **kwargs)
+
+    @classmethod
+    async def _write(cls, func, *args, **kwargs):
+        return await cls._limited(cls.write_limiter, func, *args, **kwargs)
+
+    @classmethod
+    async def _limited(cls, limiter, func, *args, **kwargs):
+        """
+        Runs an API call once a token is available, in priority order (see utils.rate_limiter).
+        On 429 the bucket is paused for Retry-After (or an exponential fallback) and the call is retried.
+        """
+        for attempt in range(cls.MAX_RATE_LIMIT_RETRIES + 1):
+            await limiter.acquire()
+            try:
+                return await cls._run(func, *args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                response = e.response
+                if response is None or response.status_code != 429 or attempt == cls.MAX_RATE_LIMIT_RETRIES:
+                    raise
+                try:
+                    retry_after = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    retry_after = 2 ** (attempt + 2)
+                print(f"[GoogleSheets] Rate limited ({limiter.name}), retrying in {retry_after}s")
+                limiter.penalize(retry_after)
+
+    @classmethod
+    def quota_stats(cls):
+        """Token-bucket counters, e.g. for showing quota headroom."""
+        return {
+            "read": cls.read_limiter.stats(),
+            "write": cls.write_limiter.stats()
+        }
+
+    @classmethod
+    def quota_summary(cls):
+        stats = cls.quota_stats()
+        return (
+            f"reads {stats['read']['available']}/{stats['read']['capacity']}, "
+            f"writes {stats['write']['available']}/{stats['write']['capacity']} "
+            f"(429s: {stats['read']['throttled'] + stats['write']['throttled']})"
+        )
+
     @classmethod
     def get_client(cls):
+        """
+        Returns the shared authorized client (created once per process).
+        The underlying AuthorizedSession refreshes the access token by itself when it expires.
+        """
+        with cls._client_lock:
+            if cls._client is None:
+                cls._client = cls._create_client()
+            return cls._client
+
+    @classmethod
+    def _create_client(cls):
         # Path to JSON key file
         creds_path = os.getenv("GOOGLE_CREDENTIALS_JSON", "service_account.json")
-        
+
         if not os.path.exists(creds_path):
             raise FileNotFoundError(f"Credential file not found at: {creds_path}")
-            
+
         creds = Credentials.from_service_account_file(creds_path, scopes=cls.SCOPES)
         client = gspread.authorize(creds)
         return client
 
+    @classmethod
+    def reset_cache(cls):
+        """Drops the cached client and all spreadsheet/worksheet handles (e.g. after auth errors)."""
+        with cls._client_lock:
+            cls._client = None
+        cls._spreadsheets.clear()
+        cls._worksheets.clear()
+
+    @classmethod
+    async def _open_spreadsheet(cls, sheet_id_or_url):
+        sh = cls._spreadsheets.get(sheet_id_or_url)
+        if sh:
+            return sh
+
+        client = await cls._run(cls.get_client)
+        try:
+            # Handle both ID and URL
+            if "docs.google.com" in sheet_id_or_url:
+                sh = await cls._read(client.open_by_url, sheet_id_or_url)
+            else:
+                sh = await cls._read(client.open_by_key, sheet_id_or_url)
+        except gspread.exceptions.APIError as e:
+            # Credentials revoked/rotated: start from a fresh client next time
+            if e.response is not None and e.response.status_code == 401:
+                cls.reset_cache()
+            raise
+
+        cls._spreadsheets[sheet_id_or_url] = sh
+        return sh
+
+    @classmethod
+    def _cache_worksheet(cls, sh, sheet_id, title, row_count, col_count, next_row=None):
+        meta = {
+            "id": sheet_id,
+            "title": title,
+            "row_count": row_count,
+            "col_count": col_count,
+            "next_row": next_row
+        }
+        cls._worksheets[(sh.id, title)] = meta
+        return meta
+
+    @classmethod
+    async def _get_worksheet_meta(cls, sh, title):
+        """
+        Returns cached metadata for a tab, or None if the tab doesn't exist.
+        On a miss, all tabs are loaded with a single metadata request.
+        """
+        meta = cls._worksheets.get((sh.id, title))
+        if meta:
+            return meta
+
+        metadata = await cls._read(sh.fetch_sheet_metadata)
+        for sheet in metadata.get("sheets", []):
+            props = sheet["properties"]
+            if (sh.id, props["title"]) not in cls._worksheets:
+                grid = props.get("gridProperties", {})
+                cls._cache_worksheet(sh, props["sheetId"], props["title"], grid.get("rowCount", 0), grid.get("columnCount", 0))
+        return cls._worksheets.get((sh.id, title))
+
+    @classmethod
+    def _new_sheet_id(cls, sh, exclude=()):
+        # Sheet ids are chosen client-side so later requests in the same batch can refer to them
+        taken = {meta["id"] for (sid, _), meta in cls._worksheets.items() if sid == sh.id}
+        taken.update(exclude)
+        while True:
+            sheet_id = random.randint(1, 2**31 - 1)
+            if sheet_id not in taken:
+                return sheet_id
+
+    @classmethod
+    def _invalidate_worksheet(cls, sh, title):
+        cls._worksheets.pop((sh.id, title), None)
+
     @classmethod
     async def get_or_create_year_spreadsheet(cls, year):
         """
-        Finds a spreadsheet named 'Activity_Tracker_{year}'.
-        If not found, creates it.
-        Returns the spreadsheet object.
+        Returns the 'Activity_Tracker_{year}' spreadsheet, creating it if needed.
+        Uses the persisted year -> spreadsheet id mapping; the (slow) search by title
+        only happens once, for spreadsheets created before the mapping existed.
         """
-        client = cls.get_client()
+        sheet_id = await SheetModel.get_year_spreadsheet_id(year)
+        if sheet_id:
+            try:
+                return await cls._open_spreadsheet(sheet_id)
+            except gspread.SpreadsheetNotFound:
+                print(f"Spreadsheet {sheet_id} for {year} no longer exists. Looking it up again...")
+
+        client = await cls._run(cls.get_client)
         sheet_name = f"Activity_Tracker_{year}"
-        
-        # 1. Search for existing sheet
-        # listing all main spreadsheets to find match
-        # Note: open_by_url/key is faster if we knew it, but here we search by name.
-        # This might be slow if there are 1000s of sheets, but usually fine for a bot.
-        
-        # Optimization: We can try to open by name directly if library supports it, 
-        # but gspread usually requires 'open' (by title).
+
         try:
-            sh = client.open(sheet_name)
-            return sh
+            sh = await cls._read(client.open, sheet_name)
         except gspread.SpreadsheetNotFound:
             # Create new
             print(f"Spreadsheet '{sheet_name}' not found. Creating...")
-            sh = client.create(sheet_name)
+            sh = await cls._write(client.create, sheet_name)
             # Share with the service account is automatic (it owns it).
             # But the user needs access.
             # We can't share with the user without knowing their email.
-            # So we just print the URL.
             # If we had an Admin Email env var, we could share it here.
-            # For now, just return it.
-            return sh
+
+        await SheetModel.set_year_spreadsheet_id(year, sh.id)
+        cls._spreadsheets[sh.id] = sh
+        return sh
 
     @classmethod
     async def export_to_sheet(cls, sheet_id_or_url, data_payload):
         """
-        Exports data to a SPECIFIC sheet (manual override).
+        Exports a report to a SPECIFIC sheet (manual override).
+        data_payload: { 'attendance': rows, 'voice': rows } (or a list of attendance rows).
+        Creates 'Report_{timestamp} Attendance' and 'Report_{timestamp} Voice' tabs, fills them,
+        and sets column widths and word wrap, all in one batchUpdate.
         """
-        # Handle split dict - Default to Attendance for manual exports for now
-        rows = []
         if isinstance(data_payload, dict):
-             rows = data_payload.get('attendance', [])
+            tabs = [("Attendance", data_payload.get('attendance', [])), ("Voice", data_payload.get('voice', []))]
         else:
-             rows = data_payload
-             
-        client = cls.get_client()
+            tabs = [("Attendance", data_payload)]
+        tabs = [(suffix, rows) for suffix, rows in tabs if rows]
+        if not tabs:
+            return {"success": False, "message": "Nothing to export."}
+
         try:
-            if "docs.google.com" in sheet_id_or_url:
-                sh = client.open_by_url(sheet_id_or_url)
-            else:
-                sh = client.open_by_key(sheet_id_or_url)
+            sh = await cls._open_spreadsheet(sheet_id_or_url)
         except Exception as e:
             return {"success": False, "message": f"Failed to open sheet: {str(e)}"}
 
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        title = f"Report_{timestamp}"
-        
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+        requests = []
+        sheet_ids = []
+        titles = []
+        for suffix, rows in tabs:
+            title = f"Report_{timestamp} {suffix}"
+            sheet_id = cls._new_sheet_id(sh, exclude=sheet_ids)
+            width = max(len(r) for r in rows)
+
+            requests.append(sheets_utils.add_sheet_request(sheet_id, title, len(rows) + 10, width + 5))
+            requests.append(sheets_utils.wrap_sheet_request(sheet_id))
+            requests.append(sheets_utils.update_cells_request(sheet_id, 1, rows))
+            requests.extend(sheets_utils.column_width_requests(sheet_id, rows))
+
+            sheet_ids.append(sheet_id)
+            titles.append(title)
+
         try:
-            worksheet = sh.add_worksheet(title=title, rows=len(rows)+10, cols=len(rows[0])+5)
-            worksheet.update(range_name='A1', values=rows)
-            return {"success": True, "message": f"Exported to {title}", "url": f"{sh.url}"}
+            await cls._write(sh.batch_update, {"requests": requests})
         except Exception as e:
              return {"success": False, "message": f"Failed to export: {str(e)}"}
 
+        return {
+            "success": True,
+            "message": f"Exported to {', '.join(titles)}",
+            "url": f"{sh.url}#gid={sheet_ids[0]}"
+        }
+
     @classmethod
-    async def append_daily_stats(cls, data_payload, date_obj):
+    async def append_daily_stats(cls, data_payload, date_obj, guild_id=None):
         """
-        Appends daily stats to Year-based tabs: '{Year} Attendance' and '{Year} Voice Stats'.
+        Appends daily stats to Year-based tabs: '{Year} Attendance' and '{Year} Voice Stats'
+        (see tab_name for guilds other than TARGET_GUILD_ID).
         data_payload: { 'attendance': rows, 'voice': rows } (or list for backward compatibility)
+        date_obj: fallback date for rows whose first cell isn't a YYYY-MM-DD date.
+        All tabs are written with a single spreadsheets.batchUpdate.
+        """
+        # "2025 Attendance" / "2025 Voice Stats" -> [(date, [headers, row]), ...]
+        tab_entries = {}
+        for suffix, day, day_rows in cls.split_payload(data_payload, date_obj):
+            tab_entries.setdefault(cls.tab_name(suffix, day, guild_id), []).append((day, day_rows))
+
+        return await cls.write_tab_entries(tab_entries)
+
+    @classmethod
+    async def write_tab_entries(cls, tab_entries, upsert=False):
+        """
+        Writes {tab_name: [(date, [headers, row]), ...]} to the main tracker sheet (GOOGLE_SHEET_ID).
+        upsert=False appends every row; upsert=True rewrites existing dates in place
+        (only if changed) and appends the rest, so re-syncing a range is idempotent.
         """
         sheet_id_or_url = os.getenv("GOOGLE_SHEET_ID")
         if not sheet_id_or_url:
              return {"success": False, "message": "GOOGLE_SHEET_ID not set in .env"}
 
-        client = cls.get_client()
-        
         try:
-             # Open Sheet (Handle both ID and URL)
-             if "docs.google.com" in sheet_id_or_url:
-                 sh = client.open_by_url(sheet_id_or_url)
-             else:
-                 sh = client.open_by_key(sheet_id_or_url)
+             sh = await cls._open_spreadsheet(sheet_id_or_url)
         except Exception as e:
              return {"success": False, "message": f"Failed to open sheet: {e}"}
 
-        year_str = date_obj.strftime("%Y")
-        
+        if upsert:
+            counts = await cls._upsert_entries(sh, tab_entries) if tab_entries else {"updated": 0, "appended": 0, "unchanged": 0}
+            return {
+                "success": True,
+                "message": f"Processed {len(tab_entries)} tabs: {counts['updated']} rows updated, {counts['appended']} appended, {counts['unchanged']} unchanged",
+                **counts
+            }
+
+        if tab_entries:
+            await cls._append_entries(sh, tab_entries)
+
+        return {"success": True, "message": f"Processed {len(tab_entries)} tabs: {', '.join(tab_entries)}"}
+
+    @staticmethod
+    def tab_name(suffix, day, guild_id=None):
+        # User request: "2025 Attendance" and "2025 Voice Stats"
+        name = f"{day.strftime('%Y')} {suffix}"
+        # Rows are keyed by date, so every guild needs tabs of its own:
+        # TARGET_GUILD_ID keeps the plain names, any other guild gets "2025 Attendance (<guild id>)"
+        if guild_id is not None and str(guild_id) != os.getenv("TARGET_GUILD_ID", ""):
+            name += f" ({guild_id})"
+        return name
+
+    @classmethod
+    def split_payload(cls, data_payload, date_obj):
+        """
+        Flattens an export payload into (suffix, date, [headers, row]) entries, one per tab per day.
+        """
         # Unpack Data
         if isinstance(data_payload, list):
             attendance_rows = data_payload
@@ -115,117 +331,234 @@ class GoogleSheetsService:
             attendance_rows = data_payload.get('attendance', [])
             voice_rows = data_payload.get('voice', [])
 
-        results = []
-        
-        # Process Attendance -> "2025 Attendance"
-        if attendance_rows:
-            res_att = cls._append_data_to_year_tab(sh, year_str, "Attendance", attendance_rows, date_obj)
-            results.append(res_att)
-            
-        # Process Voice -> "2025 Voice Stats"
-        if voice_rows:
-            res_voice = cls._append_data_to_year_tab(sh, year_str, "Voice Stats", voice_rows, date_obj)
-            results.append(res_voice)
-            
-        return {"success": True, "message": f"Processed {len(results)} tabs: {', '.join(results)}"}
+        entries = []
+        for suffix, rows in (("Attendance", attendance_rows), ("Voice Stats", voice_rows)):
+            for day, day_rows in cls._split_rows_by_date(rows, date_obj):
+                entries.append((suffix, day, day_rows))
+        return entries
+
+    @staticmethod
+    def _split_rows_by_date(rows, date_obj):
+        """
+        Splits [headers, row, row...] into one (date, [headers, row]) entry per data row.
+        """
+        if not rows:
+            return []
+        headers = rows[0]
+        entries = []
+        for row in rows[1:]:
+            try:
+                day = datetime.strptime(str(row[0]), '%Y-%m-%d')
+            except (ValueError, IndexError):
+                day = date_obj
+            entries.append((day, [headers, row]))
+        return entries
+
+    @staticmethod
+    def _build_append_rows(entries, is_new_tab, tab_name):
+        """
+        Lays out entries the way the tracker tabs look:
+        - New tab: title, month label, headers, then data.
+        - Existing tab: a month separator (+ headers) before the 1st of every month.
+        Returns (values, {date_str: offset of its row in values}).
+        """
+        values = []
+        date_offsets = {}
+        for i, (day, rows) in enumerate(entries):
+            headers, data_rows = rows[0], rows[1:]
+            month_label = day.strftime("%B").upper()
+
+            if is_new_tab and i == 0:
+                values += [
+                    [tab_name],     # Row 1
+                    [],             # Row 2
+                    [],             # Row 3
+                    [month_label],  # Row 4
+                    [],             # Row 5
+                    headers
+                ]
+            elif day.day == 1:
+                values += [
+                    [], [],                 # 2 Empty rows
+                    [month_label],          # Month Name
+                    [],                     # 1 Empty Row
+                    headers                 # Headers
+                ]
+            for row in data_rows:
+                if row and sheets_utils.is_date_key(row[0]):
+                    date_offsets[str(row[0])] = len(values)
+                values.append(row)
+        return values, date_offsets
 
     @classmethod
-    def _append_data_to_year_tab(cls, sh, year_str, suffix, rows, date_obj):
+    async def _load_tab_state(cls, sh, tab_entries, with_index=False):
         """
-        Helper to append rows to a specific Year+Suffix tab.
+        Returns {tab: meta or None} for every tab, making sure existing tabs have a row cursor
+        (and, if with_index, a date -> row index). Missing cursors/indexes for all tabs
+        are loaded with a single values.batchGet of column A.
         """
-        # User request: "2025 Attendance" and "2025 Voice Stats"
-        tab_name = f"{year_str} {suffix}"
-        
-        try:
-             worksheet = sh.worksheet(tab_name)
-             
-             # Prepare Separator Rows if 1st of Month (Existing Sheet)
-             separator_rows = []
-             if date_obj.day == 1:
-                 month_label = date_obj.strftime("%B").upper()
-                 current_headers = rows[0] if rows else []
-                 
-                 separator_rows = [
-                     [], [],                 # 2 Empty rows
-                     [month_label],          # Month Name
-                     [],                     # 1 Empty Row
-                     current_headers         # Headers
-                 ]
-
-             # Append Logic
-             if len(rows) > 0:
-                 data_rows = rows[1:] # rows[0] is headers
-                 
-                 final_rows_to_append = []
-                 if separator_rows:
-                     final_rows_to_append = separator_rows + data_rows
-                 else:
-                     final_rows_to_append = data_rows
-                 
-                 if final_rows_to_append:
-                     # Calculate insertion point (Column A height)
-                     col_a = worksheet.col_values(1)
-                     next_row = len(col_a) + 1
-                     
-                     # Check if we need to resize rows
-                     current_row_count = worksheet.row_count
-                     needed_rows = next_row + len(final_rows_to_append)
-                     
-                     if needed_rows > current_row_count:
-                         worksheet.add_rows(needed_rows - current_row_count)
-                     
-                     # Check if we need to resize columns
-                     current_col_count = worksheet.col_count
-                     needed_cols = max(len(r) for r in final_rows_to_append)
-                     if needed_cols > current_col_count:
-                         worksheet.add_cols(needed_cols - current_col_count)
-                     
-                     # Explicitly update starting at A{next_row}
-                     worksheet.update(range_name=f'A{next_row}', values=final_rows_to_append)
-
-        except gspread.WorksheetNotFound:
-             # Create new
-             # Determine needed columns from data
-             needed_cols = max(len(rows[0]), 20) if rows else 20
-             worksheet = sh.add_worksheet(title=tab_name, rows=1000, cols=needed_cols)
-             
-             # NEW SHEET LAYOUT
-             title_label = tab_name
-             month_label = date_obj.strftime("%B").upper()
-             
-             layout_rows = [
-                 [title_label],  # Row 1
-                 [],             # Row 2
-                 [],             # Row 3
-                 [month_label],  # Row 4
-                 []              # Row 5
-             ]
-             
-             if len(rows) > 0:
-                final_values = layout_rows + rows
-                # Ensure enough columns for final_values
-                needed_cols_final = max(len(r) for r in final_values)
-                if needed_cols_final > worksheet.col_count:
-                    worksheet.add_cols(needed_cols_final - worksheet.col_count)
-                
-                worksheet.update(range_name='A1', values=final_values)
-        
-        # Apply Word Wrap to the entire sheet
+        metas = {}
+        for tab in tab_entries:
+            metas[tab] = await cls._get_worksheet_meta(sh, tab)
+
+        missing = [
+            tab for tab, meta in metas.items()
+            if meta and (meta["next_row"] is None or (with_index and meta.get("date_rows") is None))
+        ]
+        if missing:
+            result = await cls._read(sh.values_batch_get, [f"'{tab}'!A:A" for tab in missing])
+            for tab, value_range in zip(missing, result.get("valueRanges", [])):
+                col_a = value_range.get("values", [])
+                metas[tab]["next_row"] = len(col_a) + 1
+                metas[tab]["date_rows"] = {
+                    str(row[0]): i for i, row in enumerate(col_a, start=1) if row and sheets_utils.is_date_key(row[0])
+                }
+        return metas
+
+    @classmethod
+    def _plan_append(cls, sh, tab, entries, meta, requests, allocated):
+        """
+        Adds the requests appending `entries` to one tab (creating/resizing it as needed).
+        `allocated` holds the sheet ids already given to new tabs in this batch (updated in place).
+        Returns the tab's state after the write, or None if there is nothing to write.
+        """
+        values, date_offsets = cls._build_append_rows(entries, meta is None, tab)
+        if not values:
+            return None
+        width = max(len(r) for r in values)
+
+        if meta is None:
+            sheet_id = cls._new_sheet_id(sh, exclude=allocated)
+            allocated.add(sheet_id)
+            row_count = max(1000, len(values))
+            col_count = max(width, 20)
+            requests.append(sheets_utils.add_sheet_request(sheet_id, tab, row_count, col_count))
+            requests.append(sheets_utils.wrap_sheet_request(sheet_id))
+            next_row = 1
+            date_rows = {}
+        else:
+            sheet_id = meta["id"]
+            next_row = meta["next_row"]
+            row_count = meta["row_count"]
+            col_count = meta["col_count"]
+            date_rows = meta.get("date_rows")
+
+            # Resize the grid if needed
+            needed_rows = next_row + len(values) - 1
+            if needed_rows > row_count:
+                requests.append(sheets_utils.append_dimension_request(sheet_id, "ROWS", needed_rows - row_count))
+                row_count = needed_rows
+            if width > col_count:
+                requests.append(sheets_utils.append_dimension_request(sheet_id, "COLUMNS", width - col_count))
+                col_count = width
+
+        requests.append(sheets_utils.update_cells_request(sheet_id, next_row, values))
+
+        if date_rows is not None:
+            date_rows = dict(date_rows)
+            for date_str, offset in date_offsets.items():
+                date_rows[date_str] = next_row + offset
+
+        return {
+            "id": sheet_id,
+            "row_count": row_count,
+            "col_count": col_count,
+            "next_row": next_row + len(values),
+            "date_rows": date_rows
+        }
+
+    @classmethod
+    async def _commit(cls, sh, requests, planned, touched_tabs):
+        """Sends one batchUpdate and, only if it succeeds, updates the local tab state."""
+        if not requests:
+            return
         try:
-            # Format all columns that have data
-            last_col = worksheet.col_count
-            # Convert column number to letter for range (e.g. 26 -> Z, 27 -> AA)
-            def col_to_letter(n):
-                string = ""
-                while n > 0:
-                    n, remainder = divmod(n - 1, 26)
-                    string = chr(65 + remainder) + string
-                return string
-            
-            last_col_letter = col_to_letter(last_col)
-            worksheet.format(f"A:{last_col_letter}", {"wrapStrategy": "WRAP"})
-        except Exception as e:
-            print(f"Warning: Failed to apply word wrap: {e}")
+            await cls._write(sh.batch_update, {"requests": requests})
+        except Exception:
+            # Local cursors/sizes may no longer match the sheet
+            for tab in touched_tabs:
+                cls._invalidate_worksheet(sh, tab)
+            raise
+
+        for tab, state in planned.items():
+            meta = cls._cache_worksheet(sh, state["id"], tab, state["row_count"], state["col_count"], state["next_row"])
+            meta["date_rows"] = state["date_rows"]
+
+    @classmethod
+    async def _append_entries(cls, sh, tab_entries):
+        """
+        Appends per-day entries to several tabs with one batchUpdate:
+        tab creation, grid resizing, values and word wrap all go in the same request.
+        The next free row of each tab comes from the local cursor; when it isn't known yet,
+        column A of all such tabs is read with a single values.batchGet.
+        """
+        metas = await cls._load_tab_state(sh, tab_entries)
+
+        requests = []
+        planned = {}
+        allocated = set()
+        for tab, entries in tab_entries.items():
+            state = cls._plan_append(sh, tab, entries, metas[tab], requests, allocated)
+            if state:
+                planned[tab] = state
+
+        await cls._commit(sh, requests, planned, tab_entries)
+
+    @classmethod
+    async def _upsert_entries(cls, sh, tab_entries):
+        """
+        Keyed sync: rows whose date already exists in a tab are compared with the cells there
+        and rewritten only if something changed; unseen dates are appended as usual.
+        Everything is sent in one batchUpdate (nothing at all if no cell changed).
+        Returns {'updated': n, 'appended': n, 'unchanged': n}.
+        """
+        metas = await cls._load_tab_state(sh, tab_entries, with_index=True)
+
+        # 1. Split entries into existing rows (to diff) and new dates (to append)
+        existing = [] # [(tab, row_number, new_row)]
+        to_append = {} # {tab: [(date, rows)]}
+        for tab, entries in tab_entries.items():
+            date_rows = (metas[tab] or {}).get("date_rows") or {}
+            for day, rows in entries:
+                date_str = day.strftime('%Y-%m-%d')
+                for row in rows[1:]:
+                    if date_str in date_rows:
+                        existing.append((tab, date_rows[date_str], row))
+                    else:
+                        to_append.setdefault(tab, []).append((day, [rows[0], row]))
+
+        # 2. Read the current cells of every existing row in one call
+        changed = []
+        if existing:
+            ranges = [f"'{tab}'!{row_number}:{row_number}" for tab, row_number, _ in existing]
+            result = await cls._read(sh.values_batch_get, ranges, params={"valueRenderOption": "UNFORMATTED_VALUE"})
+            for (tab, row_number, new_row), value_range in zip(existing, result.get("valueRanges", [])):
+                current = (value_range.get("values") or [[]])[0]
+                if not sheets_utils.rows_equal(current, new_row):
+                    changed.append((tab, row_number, new_row))
+
+        # 3. One batch: in-place updates + appends
+        requests = []
+        planned = {}
+        for tab, row_number, new_row in changed:
+            meta = metas[tab]
+            if len(new_row) > meta["col_count"]:
+                requests.append(sheets_utils.append_dimension_request(meta["id"], "COLUMNS", len(new_row) - meta["col_count"]))
+                meta["col_count"] = len(new_row)
+            requests.append(sheets_utils.update_cells_request(meta["id"], row_number, [new_row]))
+
+        appended = 0
+        allocated = set()
+        for tab, entries in to_append.items():
+            state = cls._plan_append(sh, tab, entries, metas[tab], requests, allocated)
+            if state:
+                planned[tab] = state
+                appended += len(entries)
+
+        await cls._commit(sh, requests, planned, tab_entries)
 
-        return tab_name
+        return {
+            "updated": len(changed),
+            "appended": appended,
+            "unchanged": len(existing) - len(changed)
+        }
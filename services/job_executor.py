@@ -0,0 +1,59 @@
+import asyncio
+import os
+import time
+
+class JobExecutor:
+    """
+    Runs a scheduler job's per-item work (e.g. one call per member) on a bounded pool of asyncio workers.
+    """
+    DEFAULT_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "10"))
+
+    @classmethod
+    async def run(cls, job_name, items, worker, concurrency=None, describe=str):
+        """
+        Awaits worker(item) for every item, at most `concurrency` at a time.
+        One failing item never stops the others.
+        Returns a summary: {
+            'job', 'total', 'concurrency', 'duration', 'throughput',
+            'results': [(item, result)], 'errors': [(item, exception)]   # both in input order
+        }
+        """
+        items = list(items)
+        concurrency = max(1, min(concurrency or cls.DEFAULT_CONCURRENCY, len(items) or 1))
+
+        queue = asyncio.Queue()
+        for index, item in enumerate(items):
+            queue.put_nowait((index, item))
+
+        results = []
+        errors = []
+
+        async def run_worker():
+            while True:
+                try:
+                    index, item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    results.append((index, item, await worker(item)))
+                except Exception as e:
+                    print(f"[JobExecutor] {job_name}: error on {describe(item)}: {e}")
+                    errors.append((index, item, e))
+
+        started = time.monotonic()
+        await asyncio.gather(*(run_worker() for _ in range(concurrency)))
+        duration = time.monotonic() - started
+        throughput = len(items) / duration if duration > 0 else float(len(items))
+
+        print(f"[JobExecutor] {job_name}: {len(results)} ok, {len(errors)} failed of {len(items)} "
+              f"in {duration:.2f}s ({throughput:.1f} items/s, concurrency {concurrency})")
+
+        return {
+            "job": job_name,
+            "total": len(items),
+            "concurrency": concurrency,
+            "duration": duration,
+            "throughput": throughput,
+            "results": [(item, result) for _, item, result in sorted(results, key=lambda r: r[0])],
+            "errors": [(item, error) for _, item, error in sorted(errors, key=lambda r: r[0])]
+        }
@@ -0,0 +1,75 @@
+import os
+from datetime import datetime, timedelta
+from config.settings import IST
+from database.connection import Database
+from models.job_run_model import JobRunModel
+from services.job_executor import JobExecutor
+
+class JobLedgerService:
+    """
+    Records scheduled job runs per (job, guild, date) so that runs missed while the bot was down
+    can be replayed, and a partially finished run resumes without re-applying finished items.
+    """
+    CATCHUP_DAYS = int(os.getenv("JOB_CATCHUP_DAYS", "3"))
+
+    @classmethod
+    async def run(cls, job, guild_id, date_str, items, worker, key=str, describe=str):
+        """
+        Runs worker(item) through JobExecutor for every item not yet recorded for this run.
+        key(item) is the item's idempotency key; it is recorded as soon as its worker returns.
+        The run is marked complete once no item failed.
+        Returns the JobExecutor summary plus 'skipped' (items already done earlier).
+        """
+        items = list(items)
+        if not Database.is_mongo():
+            # No ledger with embedded storage: run everything, nothing to resume or replay
+            summary = await JobExecutor.run(f"{job} {date_str}", items, worker, describe=describe)
+            summary['skipped'] = 0
+            return summary
+
+        run = await JobRunModel.start(job, guild_id, date_str)
+        done = set(run.get('done_items', []))
+        pending = [item for item in items if key(item) not in done]
+
+        async def tracked(item):
+            result = await worker(item)
+            await JobRunModel.mark_item_done(job, guild_id, date_str, key(item))
+            return result
+
+        summary = await JobExecutor.run(f"{job} {date_str}", pending, tracked, describe=describe)
+        summary['skipped'] = len(items) - len(pending)
+
+        if not summary['errors']:
+            await JobRunModel.mark_complete(job, guild_id, date_str)
+        return summary
+
+    @staticmethod
+    def scheduled_at(date_obj, scheduled_time, day_offset=0):
+        """IST datetime at which the run for `date_obj` is due."""
+        day = date_obj + timedelta(days=day_offset)
+        return IST.localize(datetime(day.year, day.month, day.day, scheduled_time.hour, scheduled_time.minute))
+
+    @classmethod
+    async def missed_dates(cls, job, guild_id, scheduled_time, now, day_offset=0, weekdays_only=True):
+        """
+        Dates (oldest first) whose run was due before `now` but never completed,
+        starting after the job's last successful date and at most CATCHUP_DAYS back.
+        A job with no successful run yet has nothing to catch up: the ledger starts with its first run.
+        """
+        if not Database.is_mongo():
+            return []
+        last = await JobRunModel.get_last_success_date(job, guild_id)
+        if last is None:
+            return []
+
+        first = max(
+            datetime.strptime(last, '%Y-%m-%d').date() + timedelta(days=1),
+            now.date() - timedelta(days=cls.CATCHUP_DAYS)
+        )
+        missed = []
+        day = first
+        while cls.scheduled_at(day, scheduled_time, day_offset) <= now:
+            if not (weekdays_only and day.weekday() >= 5):
+                missed.append(day)
+            day += timedelta(days=1)
+        return missed
@@ -0,0 +1,53 @@
+import os
+import socket
+import uuid
+from database.connection import Database
+from models.lease_model import LeaseModel
+
+class LeaderService:
+    """
+    Lease-based leader election so that scheduled jobs run in only one bot process.
+    Every process renews/attempts the lease every RENEW_INTERVAL seconds; if the leader dies,
+    its lease expires after LEASE_TTL seconds and a standby takes over on its next heartbeat.
+    """
+    LEASE_NAME = "scheduler"
+    LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", "15"))  # seconds
+    RENEW_INTERVAL = max(1, LEASE_TTL // 3)
+
+    holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    _is_leader = False
+
+    @classmethod
+    def is_leader(cls):
+        return cls._is_leader
+
+    @classmethod
+    async def heartbeat(cls):
+        """Acquires or renews the lease. Returns True while this process is the leader."""
+        if not Database.is_mongo():
+            # Embedded storage is single-process: nothing to elect
+            cls._is_leader = True
+            return True
+        try:
+            acquired = await LeaseModel.try_acquire(cls.LEASE_NAME, cls.holder_id, cls.LEASE_TTL)
+        except Exception as e:
+            # Can't prove we still hold the lease: step down rather than risk two leaders
+            print(f"[Leader] Heartbeat failed: {e}")
+            acquired = False
+
+        if acquired and not cls._is_leader:
+            print(f"[Leader] {cls.holder_id} is now the scheduler leader.")
+        elif not acquired and cls._is_leader:
+            print(f"[Leader] {cls.holder_id} lost the scheduler lease, standing by.")
+        cls._is_leader = acquired
+        return acquired
+
+    @classmethod
+    async def release(cls):
+        """Gives the lease up (on shutdown) so a standby can take over immediately."""
+        if cls._is_leader:
+            cls._is_leader = False
+            try:
+                await LeaseModel.release(cls.LEASE_NAME, cls.holder_id)
+            except Exception as e:
+                print(f"[Leader] Failed to release lease: {e}")
@@ -1,79 +1,241 @@
+import asyncio
+import time
+import uuid
+from datetime import timedelta
 from models.attendance_model import AttendanceModel
 from models.voice_model import VoiceModel
 from models.user_model import UserModel
+from models.maintenance_state_model import MaintenanceStateModel
+from models.archive_model import ArchiveModel
+from utils.time_utils import get_ist_time, day_key
+from database.connection import Database
 
 class MaintenanceService:
-    
+    # The running /update job, if any (only one recompute at a time)
+    _sync_task = None
+
+    @staticmethod
+    def _merge_into_users(run_id, fields):
+        """
+        Final stages of a recompute pipeline: writes `fields` onto users (upserting missing ones).
+        Every touched user is stamped with `sync_run`; users whose values actually changed get
+        `sync_changed`, inserted users get `sync_inserted`. _merge_counts reads the stamps back
+        (since $merge itself reports nothing) and then removes them.
+        """
+        changed = {"$or": [{"$ne": [f"${f}", f"$$new.{f}"]} for f in fields]}
+        return [
+            {"$project": {
+                "_id": {"$toString": "$_id"},
+                **{f: 1 for f in fields},
+                "sync_run": run_id,
+                "sync_changed": run_id,
+                "sync_inserted": run_id
+            }},
+            {"$merge": {
+                "into": UserModel.get_collection().name,
+                "on": "_id",
+                "whenMatched": [{"$set": {
+                    "sync_changed": {"$cond": [changed, run_id, "$sync_changed"]},
+                    **{f: f"$$new.{f}" for f in fields},
+                    "sync_run": run_id
+                }}],
+                "whenNotMatched": "insert"
+            }}
+        ]
+
+    STAMP_FIELDS = ("sync_run", "sync_changed", "sync_inserted")
+
+    @classmethod
+    async def _merge_counts(cls, run_id):
+        """{'matched', 'modified', 'upserted'} for one recompute run. Clears the run's stamps."""
+        pipeline = [
+            {"$match": {"sync_run": run_id}},
+            {"$group": {
+                "_id": None,
+                "upserted": {"$sum": {"$cond": [{"$eq": ["$sync_inserted", run_id]}, 1, 0]}},
+                "modified": {"$sum": {"$cond": [
+                    {"$and": [{"$eq": ["$sync_changed", run_id]}, {"$ne": ["$sync_inserted", run_id]}]}, 1, 0
+                ]}},
+                "total": {"$sum": 1}
+            }}
+        ]
+        users_col = UserModel.get_collection()
+        docs = await users_col.aggregate(pipeline).to_list(length=1)
+        # Also clears stamps left behind by an interrupted run (one recompute runs at a time)
+        await users_col.update_many(
+            {"sync_run": {"$exists": True}},
+            {"$unset": {field: "" for field in cls.STAMP_FIELDS}}
+        )
+        if not docs:
+            return {"matched": 0, "modified": 0, "upserted": 0}
+        doc = docs[0]
+        return {
+            "matched": doc["total"] - doc["upserted"],
+            "modified": doc["modified"],
+            "upserted": doc["upserted"]
+        }
+
+    # Per metric: source model, archive kind, and {users total field: (users settled field, daily-doc field)}.
+    # Note: In VoiceModel schema, 'total_duration' seems to act as 'Regular Duration'
+    # based on the exclusive if/else in append_session.
+    METRICS = {
+        "bhai": (AttendanceModel, "attendance", {
+            "global_bhai_count": ("settled_bhai_count", "$bhai_count")
+        }),
+        "voice": (VoiceModel, "voice", {
+            "total_regular_seconds": ("settled_regular_seconds", "$total_duration"),
+            "total_overtime_seconds": ("settled_overtime_seconds", "$overtime_duration")
+        })
+    }
+    STATE_KEY = "global_stats"
+
     @staticmethod
-    async def sync_global_stats():
+    async def _fold_closed_days(name, model, kind, spec, since, through, full):
+        """
+        Adds daily docs dated (since, through] onto each user's settled_* fields
+        (full: replaces settled_* with the sum of everything up to `through`).
+        Each user records how far it was settled (settled_<name>_through), so re-running
+        an interrupted fold never adds the same days twice.
+        Archived months are read from the archive's per-user daily totals.
+        """
         users_col = UserModel.get_collection()
-        
-        # 1. Aggregate Bhai Counts from Attendance Logs
-        # We need to access the collection directly
-        logs_col = AttendanceModel.get_collection()
-        
-        bhai_pipeline = [
-            {
-                "$group": {
-                    "_id": "$user_id",
-                    "total_bhai": {"$sum": "$bhai_count"}
-                }
-            }
+        marker = f"settled_{name}_through"
+        settled_fields = [settled for settled, _ in spec.values()]
+
+        if full:
+            await users_col.update_many({}, {"$unset": {marker: "", **{f: "" for f in settled_fields}}})
+
+        day_match = {"$lte": day_key(through)}
+        if since and not full:
+            day_match["$gt"] = day_key(since)
+
+        not_yet_folded = {"$lt": [{"$ifNull": [f"${marker}", ""]}, through]}
+        pipeline = [
+            {"$match": {"user_id": {"$ne": None}, "day": day_match}},
+            ArchiveModel.totals_union(kind, day_match),
+            {"$group": {"_id": "$user_id", **{settled: {"$sum": src} for settled, src in spec.values()}}},
+            {"$project": {"_id": {"$toString": "$_id"}, **{f: 1 for f in settled_fields}, marker: through}},
+            {"$merge": {
+                "into": users_col.name,
+                "on": "_id",
+                "whenMatched": [{"$set": {
+                    **{f: {"$cond": [
+                        not_yet_folded,
+                        {"$add": [{"$ifNull": [f"${f}", 0]}, f"$$new.{f}"]},
+                        f"${f}"
+                    ]} for f in settled_fields},
+                    marker: {"$cond": [not_yet_folded, through, f"${marker}"]}
+                }}],
+                "whenNotMatched": "insert"
+            }}
         ]
-        
-        bhai_cursor = logs_col.aggregate(bhai_pipeline)
-        
-        count_updates = 0
-        async for doc in bhai_cursor:
-            user_id = doc["_id"]
-            total = doc["total_bhai"]
-            
-            # Update User
-            await users_col.update_one(
-                {"_id": str(user_id)},
-                {"$set": {"global_bhai_count": total}},
-                upsert=True
-            )
-            count_updates += 1
-            
-        print(f"[Maintenance] Synced Bhai Counts for {count_updates} users.")
-        
-        # 2. Aggregate Voice Stats from Daily Activity
-        # Note: In VoiceModel schema, 'total_duration' seems to act as 'Regular Duration' 
-        # based on the exclusive if/else in append_session.
-        activity_col = VoiceModel.get_collection()
-        
-        voice_pipeline = [
-            {
-                "$group": {
-                    "_id": "$user_id",
-                    "total_regular": {"$sum": "$total_duration"},
-                    "total_overtime": {"$sum": "$overtime_duration"}
-                }
-            }
+        await model.get_collection().aggregate(pipeline).to_list(length=None)
+
+    @classmethod
+    async def _refresh_totals(cls, name, model, spec, through, run_id):
+        """
+        Sets each user's totals to settled_* plus the still-open days (after `through`),
+        so only the open days are read from the daily collection.
+        """
+        users_col = UserModel.get_collection()
+        marker = f"settled_{name}_through"
+        pipeline = [
+            {"$match": {"user_id": {"$ne": None}, "day": {"$gt": day_key(through)}}},
+            {"$group": {"_id": "$user_id", **{settled: {"$sum": src} for settled, src in spec.values()}}},
+            {"$project": {"_id": {"$toString": "$_id"}, **{settled: 1 for settled, _ in spec.values()}}},
+            {"$unionWith": {
+                "coll": users_col.name,
+                "pipeline": [
+                    {"$match": {marker: {"$exists": True}}},
+                    {"$project": {settled: 1 for settled, _ in spec.values()}}
+                ]
+            }},
+            {"$group": {"_id": "$_id", **{
+                total: {"$sum": {"$ifNull": [f"${settled}", 0]}} for total, (settled, _) in spec.items()
+            }}},
+            *cls._merge_into_users(run_id, list(spec))
         ]
-        
-        voice_cursor = activity_col.aggregate(voice_pipeline)
-        
-        voice_updates = 0
-        async for doc in voice_cursor:
-            user_id = doc["_id"]
-            reg = doc["total_regular"]
-            ot = doc["total_overtime"]
-            
-            await users_col.update_one(
-                {"_id": str(user_id)},
-                {"$set": {
-                    "total_regular_seconds": reg,
-                    "total_overtime_seconds": ot
-                }},
-                upsert=True
-            )
-            voice_updates += 1
-            
-        print(f"[Maintenance] Synced Voice Stats for {voice_updates} users.")
-        
+        await model.get_collection().aggregate(pipeline).to_list(length=None)
+
+    @classmethod
+    async def sync_global_stats(cls, full=False, progress=None):
+        """
+        Recomputes every user's bhai and voice totals from the daily logs, entirely server-side.
+
+        Closed days (before today, IST) are folded once into per-user settled_* fields and a
+        watermark records the last folded date. Incremental mode folds only days after the
+        watermark and re-reads just the open days; full=True rebuilds settled_* from all history.
+        progress: optional async callback(str) called between steps.
+        """
+        if not Database.is_mongo():
+            # Embedded storage keeps users' totals live only (no server-side recompute)
+            raise RuntimeError("/update needs MongoDB; totals are kept up to date live with SQLite storage.")
+
+        started = time.monotonic()
+        through = (get_ist_time() - timedelta(days=1)).strftime('%Y-%m-%d')
+        state = await MaintenanceStateModel.get(cls.STATE_KEY) or {}
+
+        async def report(text):
+            print(f"[Maintenance] {text}")
+            if progress:
+                try:
+                    await progress(text)
+                except Exception as e:
+                    print(f"[Maintenance] Progress update failed: {e}")
+
+        results = {}
+        for name, (model, kind, spec) in cls.METRICS.items():
+            since = state.get(f"{name}_through")
+            # Without a watermark there is nothing to build on: fall back to a full rebuild
+            rebuild = full or not since
+
+            if rebuild or since < through:
+                window = "all history" if rebuild else f"{since} → {through}"
+                await report(f"Settling {name} ({window})...")
+                if rebuild and since:
+                    # The rebuild zeroes settled_* first: until it finishes, the old watermark would
+                    # make an interrupted rebuild resume as an incremental fold onto zeroed totals
+                    await MaintenanceStateModel.set(cls.STATE_KEY, {f"{name}_through": None})
+                await cls._fold_closed_days(name, model, kind, spec, since, through, rebuild)
+                await MaintenanceStateModel.set(cls.STATE_KEY, {f"{name}_through": through})
+
+            await report(f"Refreshing {name} totals...")
+            run_id = uuid.uuid4().hex
+            await cls._refresh_totals(name, model, spec, through, run_id)
+            counts = await cls._merge_counts(run_id)
+            await report(f"{name.capitalize()}: {counts['matched']} matched, {counts['modified']} modified, {counts['upserted']} new.")
+            results[name] = counts
+
+        bhai, voice = results["bhai"], results["voice"]
         return {
-            "bhai_updates": count_updates,
-            "voice_updates": voice_updates
+            "mode": "full" if full else "incremental",
+            "settled_through": through,
+            "bhai": bhai,
+            "voice": voice,
+            "bhai_updates": bhai['matched'] + bhai['upserted'],
+            "voice_updates": voice['matched'] + voice['upserted'],
+            "elapsed": round(time.monotonic() - started, 2)
         }
+
+    @classmethod
+    def start_sync_global_stats(cls, full=False, progress=None, on_done=None):
+        """
+        Runs sync_global_stats as a background task.
+        on_done: optional async callback(result, error). Returns False if a sync is already running.
+        """
+        if cls._sync_task and not cls._sync_task.done():
+            return False
+
+        async def job():
+            try:
+                result = await cls.sync_global_stats(full, progress)
+            except Exception as e:
+                print(f"[Maintenance] Sync failed: {e}")
+                if on_done:
+                    await on_done(None, e)
+                return
+            if on_done:
+                await on_done(result, None)
+
+        cls._sync_task = asyncio.create_task(job())
+        return True
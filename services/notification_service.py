@@ -0,0 +1,60 @@
+import asyncio
+import os
+import discord
+from utils.discord_utils import split_message
+
+class NotificationService:
+    """
+    Fire-and-forget channel messages. Each channel has its own queue and worker:
+    messages arriving within MERGE_WINDOW are merged into one send (split at Discord's size limit),
+    and rate limits / server errors are retried here with backoff, so callers never wait on Discord.
+    """
+    MERGE_WINDOW = float(os.getenv("NOTIFY_MERGE_WINDOW", "1.0"))  # seconds
+    MAX_RETRIES = 3
+    BASE_BACKOFF = 2.0  # seconds, doubled per retry
+
+    _queues = {}   # {channel_id: [content, ...]}
+    _workers = {}  # {channel_id: asyncio.Task}
+
+    @classmethod
+    def notify(cls, channel, content):
+        """Queues `content` for `channel` and returns immediately."""
+        if channel is None or not content:
+            return
+        cls._queues.setdefault(channel.id, []).append(content)
+        worker = cls._workers.get(channel.id)
+        if worker is None or worker.done():
+            cls._workers[channel.id] = asyncio.create_task(cls._run(channel))
+
+    @classmethod
+    async def _run(cls, channel):
+        try:
+            while cls._queues.get(channel.id):
+                # Let a burst accumulate, then send it as one message
+                await asyncio.sleep(cls.MERGE_WINDOW)
+                batch = cls._queues.pop(channel.id, [])
+                for chunk in split_message("\n".join(batch)):
+                    await cls._send(channel, chunk)
+        finally:
+            cls._workers.pop(channel.id, None)
+            # Anything queued after the last check gets a fresh worker
+            if cls._queues.get(channel.id):
+                cls._workers[channel.id] = asyncio.create_task(cls._run(channel))
+
+    @classmethod
+    async def _send(cls, channel, content):
+        for attempt in range(cls.MAX_RETRIES + 1):
+            try:
+                await channel.send(content)
+                return True
+            except (discord.Forbidden, discord.NotFound) as e:
+                print(f"[NotificationService] Cannot send to #{getattr(channel, 'name', channel.id)}: {e}")
+                return False
+            except discord.HTTPException as e:
+                if attempt == cls.MAX_RETRIES or (e.status != 429 and e.status < 500):
+                    print(f"[NotificationService] Dropping message for #{getattr(channel, 'name', channel.id)}: {e}")
+                    return False
+                delay = getattr(e, 'retry_after', None) or cls.BASE_BACKOFF * (2 ** attempt)
+                print(f"[NotificationService] Send failed ({e.status}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        return False
@@ -0,0 +1,39 @@
+class GoogleSheetsBackend:
+    """
+    Writes outbox entries to the main tracker sheet through GoogleSheetsService.
+    Uses the keyed (upsert) mode, so a retried or repeated write never duplicates rows.
+    """
+
+    async def write_tab_entries(self, tab_entries):
+        # Imported lazily: gspread/google-auth are only needed when we actually write
+        from services.google_sheets_service import GoogleSheetsService
+        return await GoogleSheetsService.write_tab_entries(tab_entries, upsert=True)
+
+
+class FakeSheetsBackend:
+    """
+    In-memory stand-in for the Sheets API, for running the outbox locally without Google credentials.
+    `fail_times` makes the first N writes fail, to exercise retries; a write containing any
+    date in `fail_dates` ('YYYY-MM-DD') always fails, like an entry the API keeps rejecting.
+    """
+
+    def __init__(self, fail_times=0, fail_dates=()):
+        self.fail_times = fail_times
+        self.fail_dates = set(fail_dates)
+        self.tabs = {} # {tab_name: {date_str: [row, ...]}}
+        self.calls = 0
+
+    async def write_tab_entries(self, tab_entries):
+        self.calls += 1
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("Fake Sheets backend: simulated 503")
+        if any(day.strftime('%Y-%m-%d') in self.fail_dates for entries in tab_entries.values() for day, _ in entries):
+            raise RuntimeError("Fake Sheets backend: simulated 400")
+
+        # Keyed by date like the real upsert mode: rewriting a day replaces its row
+        for tab, entries in tab_entries.items():
+            rows_by_date = self.tabs.setdefault(tab, {})
+            for day, rows in entries:
+                rows_by_date[day.strftime('%Y-%m-%d')] = rows[1:]
+        return {"success": True, "message": f"Processed {len(tab_entries)} tabs: {', '.join(tab_entries)}"}
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from database.connection import Database
+from models.sheets_outbox_model import SheetsOutboxModel
+from services.sheets_backend import GoogleSheetsBackend
+
+class SheetsSyncService:
+    """
+    Durable outbox for the main tracker sheet.
+    Exports are enqueued per (guild, tab, date) and a background worker drains them
+    (each guild writes to its own tabs, see GoogleSheetsService.tab_name),
+    retrying failures with exponential backoff. All due days are coalesced into one write;
+    if it fails, the batch is split in halves so healthy entries still get written. Entries
+    that fail SHEETS_OUTBOX_MAX_ATTEMPTS times are parked (status "dead").
+    """
+    backend = GoogleSheetsBackend()
+
+    BASE_BACKOFF = int(os.getenv("SHEETS_OUTBOX_BASE_BACKOFF", "30"))   # seconds
+    MAX_BACKOFF = int(os.getenv("SHEETS_OUTBOX_MAX_BACKOFF", "3600"))   # seconds
+    MAX_ATTEMPTS = int(os.getenv("SHEETS_OUTBOX_MAX_ATTEMPTS", "10"))
+    BATCH_LIMIT = 200
+    # Writes per drain when splitting a failed batch (bounds the calls spent during an outage)
+    MAX_WRITES_PER_DRAIN = 8
+
+    _drain_lock = asyncio.Lock()
+    _background_tasks = set()
+
+    @classmethod
+    async def enqueue_export(cls, guild_id, data_payload, date_obj):
+        """
+        Stores an export payload ({'attendance': rows, 'voice': rows}) in the outbox.
+        Returns the number of (tab, date) entries enqueued.
+        """
+        from services.google_sheets_service import GoogleSheetsService
+
+        if not Database.is_mongo():
+            # No durable outbox with embedded storage: write straight away (errors go to the caller)
+            tab_entries = {}
+            for suffix, day, day_rows in GoogleSheetsService.split_payload(data_payload, date_obj):
+                tab_entries.setdefault(GoogleSheetsService.tab_name(suffix, day, guild_id), []).append((day, day_rows))
+            result = await cls.backend.write_tab_entries(tab_entries)
+            if not result.get("success"):
+                raise RuntimeError(result.get("message", "Google Sheets write failed"))
+            return sum(len(entries) for entries in tab_entries.values())
+
+        count = 0
+        for suffix, day, day_rows in GoogleSheetsService.split_payload(data_payload, date_obj):
+            await SheetsOutboxModel.enqueue(guild_id, suffix, day.strftime('%Y-%m-%d'), day_rows)
+            count += 1
+        return count
+
+    @classmethod
+    def _backoff(cls, attempts):
+        delay = min(cls.MAX_BACKOFF, cls.BASE_BACKOFF * (2 ** max(0, attempts - 1)))
+        # Jitter so retries from several failures don't line up
+        return delay * random.uniform(0.8, 1.2)
+
+    @classmethod
+    def schedule_drain(cls):
+        """Starts a drain in the background (callers don't wait on Sheets)."""
+        task = asyncio.create_task(cls.drain())
+        cls._background_tasks.add(task)
+        task.add_done_callback(cls._background_tasks.discard)
+        return task
+
+    @classmethod
+    async def _write_docs(cls, docs):
+        """Writes outbox entries in one coalesced call. Returns None on success, else the error."""
+        # Coalesce: {tab_name: [(date, rows), ...]} in date order
+        from services.google_sheets_service import GoogleSheetsService
+        tab_entries = {}
+        for doc in sorted(docs, key=lambda d: (d["date"], d["suffix"])):
+            day = datetime.strptime(doc["date"], '%Y-%m-%d')
+            tab = GoogleSheetsService.tab_name(doc["suffix"], day, doc["guild_id"])
+            tab_entries.setdefault(tab, []).append((day, doc["rows"]))
+
+        try:
+            result = await cls.backend.write_tab_entries(tab_entries)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+        if not result.get("success"):
+            return result.get("message", "Unknown error")
+        return None
+
+    @classmethod
+    async def drain(cls):
+        """
+        Writes every due outbox entry in one coalesced call. If that fails, the batch is
+        bisected (up to MAX_WRITES_PER_DRAIN calls) so one bad entry doesn't hold back the rest;
+        whatever still fails is retried later or parked.
+        Returns {'written': n, 'failed': n, 'parked': n, 'error': str|None, 'failed_guilds': {guild_id}}.
+        """
+        if not Database.is_mongo():
+            return {"written": 0, "failed": 0, "parked": 0, "error": None, "failed_guilds": set()}
+
+        async with cls._drain_lock:
+            now = datetime.now(timezone.utc)
+            docs = await SheetsOutboxModel.get_due(now, limit=cls.BATCH_LIMIT)
+            if not docs:
+                return {"written": 0, "failed": 0, "parked": 0, "error": None, "failed_guilds": set()}
+
+            # Contiguous halves keep each guild's days together while splitting
+            stack = [sorted(docs, key=lambda d: (d["guild_id"], d["date"], d["suffix"]))]
+            written, failed = [], []  # failed: [(docs, error)]
+            writes, error = 0, None
+            while stack:
+                batch = stack.pop()
+                if writes >= cls.MAX_WRITES_PER_DRAIN:
+                    failed.append((batch, error))
+                    continue
+                error = await cls._write_docs(batch)
+                writes += 1
+                if error is None:
+                    written.extend(batch)
+                elif len(batch) == 1:
+                    failed.append((batch, error))
+                else:
+                    middle = len(batch) // 2
+                    stack += [batch[middle:], batch[:middle]]
+
+            await SheetsOutboxModel.mark_done(written)
+            if written:
+                print(f"[SheetsSync] Wrote {len(written)} pending entries in {writes} call(s).")
+
+            parked = 0
+            for batch, batch_error in failed:
+                attempts = max(d.get("attempts", 0) for d in batch) + 1
+                retry_at = now + timedelta(seconds=cls._backoff(attempts))
+                parked += await SheetsOutboxModel.mark_failed(batch, batch_error, retry_at, cls.MAX_ATTEMPTS)
+                print(f"[SheetsSync] {len(batch)} entries failed (attempt {attempts}), retrying at {retry_at.isoformat()}: {batch_error}")
+            if parked:
+                print(f"[SheetsSync] Parked {parked} entries after {cls.MAX_ATTEMPTS} failed attempts.")
+
+            failed_docs = [doc for batch, _ in failed for doc in batch]
+            return {
+                "written": len(written),
+                "failed": len(failed_docs),
+                "parked": parked,
+                "error": failed[0][1] if failed else None,
+                "failed_guilds": {doc["guild_id"] for doc in failed_docs}
+            }
@@ -1,20 +1,26 @@
-from datetime import datetime, timezone
+from datetime import datetime, time, timedelta, timezone
 import os
+from config.settings import IST
 from models.voice_model import VoiceModel
 from models.user_model import UserModel
 from utils.time_utils import get_ist_time
+from utils.timer_wheel import TimerWheel
 from models.attendance_model import AttendanceModel
 
 class VoiceService:
     # State Management (Singleton-like behavior via class attributes)
     # State Management (Singleton-like behavior via class attributes)
     active_sessions = {} # {member_id: session_data}
+    # One pending boundary timer per session (shift start or midnight), see _schedule_boundary
+    boundaries = TimerWheel("VoiceBoundaries")
 
     # Removed in-memory overtime_users set in favor of DB checks
 
     @classmethod
-    async def start_session(cls, member, channel, silent=False):
-        now_ist = get_ist_time()
+    async def start_session(cls, member, channel, silent=False, start_time=None):
+        """start_time (UTC) is set when a session is restarted at a boundary instead of now."""
+        start_time = start_time or datetime.now(timezone.utc)
+        now_ist = start_time.astimezone(IST)
         is_overtime = False
 
         # 1. Force Overtime on Weekends
@@ -25,13 +31,12 @@ class VoiceService:
             # If user has "dropped" for the day, they are in Overtime.
             today_str = now_ist.strftime('%Y-%m-%d')
             try:
+                # Uncached read on the primary: a drop made moments ago (possibly by another
+                # process whose change stream event hasn't arrived yet) must decide this session
                 doc = await AttendanceModel.find_by_date(member.id, channel.guild.id, today_str)
-                if doc:
-                    commands = doc.get('commands_used', [])
-                    # Check if 'drop' or 'auto-drop' command exists
-                    has_dropped = any(c.get('command') in ['drop', 'auto-drop'] for c in commands)
-                    if has_dropped:
-                        is_overtime = True
+                # 'drop' or 'auto-drop' sets dropped_at on the day's state
+                if doc and (doc.get('state') or {}).get('dropped_at'):
+                    is_overtime = True
             except Exception as e:
                 print(f"[VoiceService] Error checking attendance for {member.display_name}: {e}")
 
@@ -52,8 +57,12 @@ class VoiceService:
         except Exception as e:
             print(f"[VoiceService] Error parsing ATTENDANCE_START_TIME: {e}")
 
+        if not cls._in_channel(member, channel):
+            # Left (or moved) while the drop check was awaited: its voice event found nothing to end
+            return
+
         cls.active_sessions[member.id] = {
-            'start_time': datetime.now(timezone.utc),
+            'start_time': start_time,
             'channel_id': channel.id,
             'channel_name': channel.name,
             'guild_id': channel.guild.id,
@@ -61,89 +70,64 @@ class VoiceService:
             'is_overtime': is_overtime,
             'overtime_reason': overtime_reason
         }
+        cls._schedule_boundary(member, channel, now_ist, start_threshold if overtime_reason == "pre_shift" else None)
         
         if not silent:
             status_msg = " [OVERTIME]" if is_overtime else ""
             print(f"[VoiceService] Session STARTED: {member.display_name} in {channel.name}{status_msg}")
 
+    @staticmethod
+    def _in_channel(member, channel):
+        voice = member.voice
+        return voice is not None and voice.channel is not None and voice.channel.id == channel.id
+
+    @classmethod
+    def _schedule_boundary(cls, member, channel, start_ist, shift_start=None):
+        """
+        Schedules the one boundary a session can cross next: shift start for pre-shift overtime,
+        otherwise midnight (so every session stays within one day).
+        """
+        if shift_start:
+            boundary = shift_start
+            reason = "shift_start"
+        else:
+            next_day = start_ist.date() + timedelta(days=1)
+            boundary = IST.localize(datetime.combine(next_day, time()))
+            reason = "midnight"
+
+        session = cls.active_sessions[member.id]
+        session['boundary_timer'] = cls.boundaries.schedule_at(
+            boundary.timestamp(), cls._on_boundary,
+            member, channel, session['start_time'], boundary.astimezone(timezone.utc), reason
+        )
+
     @classmethod
-    async def end_session(cls, member, channel, reason="left", silent=False):
+    async def _on_boundary(cls, member, channel, session_start, boundary_utc, reason):
+        """Ends the session exactly at the boundary and starts the next one from the same instant."""
+        session = cls.active_sessions.get(member.id)
+        if not session or session['start_time'] != session_start:
+            return  # Session ended (or was replaced) meanwhile
+
+        await cls.end_session(member, channel, reason=reason, silent=True, end_time=boundary_utc)
+        await cls.start_session(member, channel, silent=True, start_time=boundary_utc)
+        session = cls.active_sessions.get(member.id)
+        if not session:
+            print(f"[VoiceService] {reason} boundary for {member.display_name}: session ended, left during the split.")
+            return
+        status = "OVERTIME" if session['is_overtime'] else "REGULAR"
+        print(f"[VoiceService] {reason} boundary for {member.display_name}: session split, now {status}.")
+
+    @classmethod
+    async def end_session(cls, member, channel, reason="left", silent=False, end_time=None):
+        """end_time (UTC) is set when a session is cut at a boundary instead of now."""
         if member.id in cls.active_sessions:
             session = cls.active_sessions.pop(member.id)
+            if session.get('boundary_timer'):
+                session['boundary_timer'].cancel()
             
-            # Times are UTC for duration calc, but we need IST for logic
             start_time_utc = session['start_time']
-            end_time_utc = datetime.now(timezone.utc)
-            
-            # --- Logic for Pre-Shift Split (Overtime -> Regular) ---
-            # If session was marked overtime ONLY because it was before 9AM ("pre_shift"),
-            # AND it ends AFTER 9AM, we split it.
+            end_time_utc = end_time or datetime.now(timezone.utc)
             
-            # We need IST conversion to check the 9AM boundary
-            import pytz
-            ist = pytz.timezone('Asia/Kolkata')
-            start_ist = start_time_utc.astimezone(ist)
-            end_ist = end_time_utc.astimezone(ist)
-            
-            triggered_split = False
-            
-            if session.get('overtime_reason') == 'pre_shift' and reason != 'shift_start':
-                start_hour_str = os.getenv("ATTENDANCE_START_TIME", "09:00")
-                try:
-                    sh, sm = map(int, start_hour_str.split(':'))
-                    # 9:00 AM Today
-                    split_threshold = end_ist.replace(hour=sh, minute=sm, second=0, microsecond=0)
-                    
-                    if end_ist > split_threshold and start_ist < split_threshold:
-                        triggered_split = True
-                        
-                        # --- PART 1: Overtime (Start -> 9:00) ---
-                        # Calculate duration for part 1
-                        # We can subtract timestamps.
-                        # Note: split_threshold is IST. Convert to UTC for consistency or just diff.
-                        split_threshold_utc = split_threshold.astimezone(timezone.utc)
-                        
-                        dur_p1 = (split_threshold_utc - start_time_utc).total_seconds()
-                        
-                        # Log Part 1 (Overtime)
-                        await cls._log_single_session(
-                             user_id=member.id,
-                             guild_id=session['guild_id'],
-                             channel_name=session['channel_name'],
-                             user_name=session['user_name'],
-                             start_time=start_time_utc,
-                             end_time=split_threshold_utc,
-                             duration=dur_p1,
-                             disconnect_reason="split_regular", # Internal markers
-                             status="overtime",
-                             is_ot=True
-                        )
-                        
-                        # --- PART 2: Regular (9:00 -> End) ---
-                        dur_p2 = (end_time_utc - split_threshold_utc).total_seconds()
-                        
-                        record_p2 = await cls._log_single_session(
-                             user_id=member.id,
-                             guild_id=session['guild_id'],
-                             channel_name=session['channel_name'],
-                             user_name=session['user_name'],
-                             start_time=split_threshold_utc,
-                             end_time=end_time_utc,
-                             duration=dur_p2,
-                             disconnect_reason=reason,
-                             status="regular",
-                             is_ot=False
-                        )
-                        
-                        if not silent:
-                            print(f"[VoiceService] Session SPLIT for {member.display_name}: {round(dur_p1)}s OT + {round(dur_p2)}s Reg.")
-                        
-                        return record_p2
-
-                except Exception as e:
-                    print(f"[VoiceService] Error during split calculation: {e}")
-
-            # --- Standard Path (No Split) ---
             duration = (end_time_utc - start_time_utc).total_seconds()
             status = 'overtime' if session.get('is_overtime') else 'regular'
             
@@ -167,8 +151,8 @@ class VoiceService:
 
     @classmethod
     async def _log_single_session(cls, user_id, guild_id, channel_name, user_name, start_time, end_time, duration, disconnect_reason, status, is_ot):
-        ist_now = get_ist_time()
-        date_str = ist_now.strftime('%Y-%m-%d')
+        # Sessions never cross midnight (see _schedule_boundary), so the start date is the session's day
+        date_str = start_time.astimezone(IST).strftime('%Y-%m-%d')
         
         await VoiceModel.append_session(
             user_id=user_id,
@@ -177,8 +161,8 @@ class VoiceService:
             user_name=user_name,
             session_data={
                 "channel_name": channel_name,
-                "start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat(),
+                "start_time": start_time,
+                "end_time": end_time,
                 "duration": round(duration, 2),
                 "disconnect": disconnect_reason,
                 "status": status
@@ -234,7 +218,8 @@ class VoiceService:
             user_id=user_id,
             guild_id=guild_id,
             start_date_str=start_date.strftime('%Y-%m-%d'),
-            end_date_str=end_date.strftime('%Y-%m-%d')
+            end_date_str=end_date.strftime('%Y-%m-%d'),
+            profile="analytics"
         )
         
         # Aggregation Logic
@@ -255,7 +240,8 @@ class VoiceService:
             user_id=user_id_query,
             guild_id=guild_id,
             start_date_str=start_date.strftime('%Y-%m-%d'),
-            end_date_str=end_date.strftime('%Y-%m-%d')
+            end_date_str=end_date.strftime('%Y-%m-%d'),
+            profile="analytics"
         )
         
         # Aggregate
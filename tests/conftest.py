@@ -0,0 +1,19 @@
+import pytest
+from config.settings import DB_NAME
+from database.connection import Database
+
+
+@pytest.fixture
+def mongo():
+    """Points Database at an in-memory MongoDB stand-in (mongomock-motor) for one test."""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    Database.BACKEND = "mongo"
+    Database.client = mongomock_motor.AsyncMongoMockClient()
+    Database.db = Database.client[DB_NAME]
+    Database._repositories = {}
+    Database._profile_dbs = {}
+    yield Database.db
+    Database.client = None
+    Database.db = None
+    Database._repositories = {}
+    Database._profile_dbs = {}
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timezone
+from models.archive_model import ArchiveModel
+from models.attendance_model import AttendanceModel
+from models.voice_model import VoiceModel
+from services.archive_service import ArchiveService
+
+GUILD = 1
+DAY = "2024-01-15"
+
+
+def session(hour, seconds):
+    start = datetime(2024, 1, 15, hour, tzinfo=timezone.utc)
+    return {"channel_name": "Work", "start_time": start, "duration": seconds, "status": "regular"}
+
+
+async def bucket_totals(kind):
+    bucket = await ArchiveModel.get_collection().find_one({"_id": ArchiveModel.make_key(kind, GUILD, "2024-01")})
+    return bucket["totals"]
+
+
+def test_late_writes_to_an_archived_day_are_combined(mongo):
+    async def scenario():
+        await AttendanceModel.create_or_update(5, GUILD, DAY, {"$set": {"attendance_status": "Present"}, "$inc": {"bhai_count": 2}})
+        await VoiceModel.append_session(5, GUILD, DAY, "Alice", session(4, 3600), 3600)
+        assert (await ArchiveService.archive_closed_months())["documents"] == 2
+        attendance_totals = await bucket_totals("attendance")
+
+        # Catch-up replays and late sessions upsert a new daily document for the archived day
+        await AttendanceModel.create_or_update(5, GUILD, DAY, {"$set": {"attendance_status": "Present"}})
+        await VoiceModel.append_session(5, GUILD, DAY, "Alice", session(6, 600), 600)
+
+        # Read while the late documents are still live
+        logs = await AttendanceModel.get_logs_in_range(GUILD, "2024-01-01", "2024-01-31")
+        assert [(doc["attendance_status"], doc["bhai_count"]) for doc in logs] == [("Present", 2)]
+        stats = await VoiceModel.get_stats(5, GUILD, "2024-01-01", "2024-01-31")
+        assert [(doc["total_duration"], len(doc["sessions"])) for doc in stats] == [(4200, 2)]
+
+        assert (await ArchiveService.archive_closed_months())["documents"] == 2
+        assert await bucket_totals("attendance") == attendance_totals
+        voice_totals = await bucket_totals("voice")
+        assert [(t["day"], t["total_duration"], t["session_count"]) for t in voice_totals] == [(20240115, 4200, 2)]
+
+        # Re-archiving with nothing new changes nothing either
+        assert (await ArchiveService.archive_closed_months())["documents"] == 0
+        assert await bucket_totals("voice") == voice_totals
+        stats = await VoiceModel.get_stats(5, GUILD, "2024-01-01", "2024-01-31")
+        assert [doc["total_duration"] for doc in stats] == [4200]
+
+    asyncio.run(scenario())
+
+
+def test_attendance_events_move_into_the_bucket(mongo):
+    at = lambda hour: datetime(2024, 1, 15, hour, tzinfo=timezone.utc)
+
+    async def scenario():
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "present", "ts": at(4)}, {"attendance_status": "Present"})
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "lunch", "ts": at(8)})
+        await ArchiveService.archive_closed_months()
+        events_col = AttendanceModel.repo().events()
+        assert await events_col.count_documents({}) == 0
+        assert [event["command"] for event in await ArchiveModel.get_events(GUILD, "2024-01")] == ["present", "lunch"]
+
+        # A late catch-up drop for the archived day: its own document and event, archived next run
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "auto-drop", "ts": at(12)})
+        [doc] = await AttendanceModel.get_logs_in_range(GUILD, "2024-01-01", "2024-01-31")
+        assert (doc["state"]["status"], doc["state"]["work_start"]) == ("dropped", at(4).replace(tzinfo=None))
+
+        await ArchiveService.archive_closed_months()
+        assert await events_col.count_documents({}) == 0
+        assert [event["command"] for event in await ArchiveModel.get_events(GUILD, "2024-01")] == ["present", "lunch", "auto-drop"]
+        [doc] = await AttendanceModel.get_logs_in_range(GUILD, "2024-01-01", "2024-01-31")
+        # Rebuilt from the archived events
+        assert doc["state"] == AttendanceModel.fold_events(await ArchiveModel.get_events(GUILD, "2024-01"))
+        assert doc["state"]["status"] == "dropped"
+
+    asyncio.run(scenario())
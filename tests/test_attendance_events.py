@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime, timedelta
+from config.settings import IST
+from models.attendance_model import AttendanceModel
+from utils.cache import CacheBus
+from utils.time_utils import parse_timestamp
+
+GUILD = 1
+DAY = "2025-01-06"
+START = IST.localize(datetime(2025, 1, 6, 9, 0))
+
+
+def at(minutes):
+    return START + timedelta(minutes=minutes)
+
+
+def test_concurrent_commands_keep_every_transition(mongo):
+    async def scenario():
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "present", "ts": at(0)}, {"attendance_status": "Present"})
+        # Two commands in flight at once: both land, the later one decides the status
+        await asyncio.gather(
+            AttendanceModel.record_event(5, GUILD, DAY, {"command": "lunch", "ts": at(240)}),
+            AttendanceModel.record_event(5, GUILD, DAY, {"command": "resume", "ts": at(270)})
+        )
+        doc = await AttendanceModel.find_by_date(5, GUILD, DAY)
+        assert doc["attendance_status"] == "Present"
+        assert doc["state"]["status"] == "active"
+        assert doc["state"]["command"] == "resume"
+        assert parse_timestamp(doc["state"]["work_start"]) == at(0)
+        assert len(await AttendanceModel.get_events(GUILD, 5, DAY)) == 3
+
+    asyncio.run(scenario())
+
+
+def test_state_follows_the_log(mongo):
+    async def scenario():
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "present", "ts": at(0)}, {"attendance_status": "Present"})
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "away", "reason": "Dentist", "ts": at(60)})
+        state = (await AttendanceModel.find_by_date(5, GUILD, DAY))["state"]
+        assert (state["status"], state["reason"]) == ("away", "Dentist")
+
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "drop", "ts": at(480)})
+        state = (await AttendanceModel.find_by_date(5, GUILD, DAY))["state"]
+        assert state["status"] == "dropped"
+        assert "reason" not in state
+        assert parse_timestamp(state["dropped_at"]) == at(480)
+
+    asyncio.run(scenario())
+
+
+def test_out_of_order_commands_keep_the_latest_status(mongo):
+    async def scenario():
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "present", "ts": at(0)}, {"attendance_status": "Present"})
+        # A slower command lands after a later one: it must not overwrite the status
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "drop", "ts": at(480)})
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "away", "reason": "Dentist", "ts": at(60)})
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "present", "ts": at(-30)})
+        state = (await AttendanceModel.find_by_date(5, GUILD, DAY))["state"]
+        assert state["status"] == "dropped"
+        assert "reason" not in state
+        assert parse_timestamp(state["work_start"]) == at(-30)
+        assert parse_timestamp(state["dropped_at"]) == at(480)
+        # Same as replaying the log in time order
+        assert state == AttendanceModel.fold_events(await AttendanceModel.get_events(GUILD, 5, DAY))
+
+    asyncio.run(scenario())
+
+
+def test_cached_status_is_invalidated_by_changes_from_elsewhere(mongo, monkeypatch):
+    async def scenario():
+        AttendanceModel.cache.clear()
+        await AttendanceModel.record_event(5, GUILD, DAY, {"command": "present", "ts": at(0)}, {"attendance_status": "Present"})
+        assert (await AttendanceModel.find_by_date(5, GUILD, DAY, cached=True))["state"]["status"] == "active"
+
+        # Another process drops the member: only its change stream event reaches this one
+        with monkeypatch.context() as other_process:
+            other_process.setattr(AttendanceModel.cache, "invalidate", lambda key: None)
+            await AttendanceModel.record_event(5, GUILD, DAY, {"command": "drop", "ts": at(480)})
+        doc = await AttendanceModel.find_by_date(5, GUILD, DAY, cached=True)
+        assert doc["state"]["status"] == "active"
+        CacheBus.publish("daily_logs", "update", doc["_id"], None, ["state.status"])
+        assert (await AttendanceModel.find_by_date(5, GUILD, DAY, cached=True))["state"]["status"] == "dropped"
+
+    asyncio.run(scenario())
+
+
+def test_states_of_two_documents_merge_like_their_events():
+    events = [
+        {"command": "present", "ts": at(0)},
+        {"command": "drop", "ts": at(480)},
+        {"command": "absent", "reason": "Sick", "ts": at(20)}
+    ]
+    # An archived document and a late one for the same day, each with part of the log
+    archived = AttendanceModel.fold_events(events[:2])
+    late = AttendanceModel.fold_events(events[2:])
+    merged = AttendanceModel.fold_events(sorted(events, key=lambda event: event["ts"]))
+    assert AttendanceModel.merge_states(archived, late) == merged
+    assert AttendanceModel.merge_states(late, archived) == merged
+    assert AttendanceModel.merge_states(None, late) == late
@@ -0,0 +1,62 @@
+import asyncio
+from utils.cache import CacheBus, TTLCache
+
+
+def make_cache(collection):
+    cache = TTLCache("test", collection)
+    CacheBus.subscribe(collection, lambda event: cache.clear() if event["op"] == "invalidate" else cache.invalidate_id(event["id"]))
+    return cache
+
+
+def test_update_event_drops_entries_tagged_with_the_id():
+    cache = make_cache("test_tagged")
+    loads = []
+
+    async def load(value):
+        loads.append(value)
+        return {"_id": "a", "value": value}
+
+    async def scenario():
+        ids = lambda doc: [doc["_id"]]
+        assert (await cache.get_or_load("k", lambda: load(1), ids))["value"] == 1
+        assert (await cache.get_or_load("k", lambda: load(2), ids))["value"] == 1
+        CacheBus.publish("test_tagged", "update", "other")
+        assert (await cache.get_or_load("k", lambda: load(2), ids))["value"] == 1
+        CacheBus.publish("test_tagged", "update", "a")
+        assert (await cache.get_or_load("k", lambda: load(3), ids))["value"] == 3
+
+    asyncio.run(scenario())
+    assert loads == [1, 3]
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = make_cache("test_race")
+
+    async def scenario():
+        async def stale_load():
+            # The document changes while this read is in flight
+            CacheBus.publish("test_race", "invalidate")
+            return "stale"
+
+        async def fresh_load():
+            return "fresh"
+
+        assert await cache.get_or_load("k", stale_load) == "stale"
+        assert await cache.get_or_load("k", fresh_load) == "fresh"
+
+    asyncio.run(scenario())
+
+
+def test_stream_going_down_clears_the_cache():
+    cache = make_cache("test_live")
+    CacheBus.set_live("test_live", True)
+
+    async def scenario():
+        async def load():
+            return "cached"
+        await cache.get_or_load("k", load)
+        assert "k" in cache._entries
+        CacheBus.set_live("test_live", False)
+        assert "k" not in cache._entries
+
+    asyncio.run(scenario())
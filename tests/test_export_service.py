@@ -0,0 +1,28 @@
+import asyncio
+import tempfile
+from types import SimpleNamespace
+import pytest
+from services.export_service import ExportService
+
+
+def test_failed_parquet_export_closes_its_temp_file(monkeypatch):
+    pytest.importorskip("pyarrow")
+    opened = []
+    real_temporary_file = tempfile.TemporaryFile
+
+    def tracked_temporary_file(*args, **kwargs):
+        fp = real_temporary_file(*args, **kwargs)
+        opened.append(fp)
+        return fp
+
+    async def failing_chunks(*args):
+        raise RuntimeError("database went away")
+        yield
+
+    monkeypatch.setattr(tempfile, "TemporaryFile", tracked_temporary_file)
+    monkeypatch.setattr(ExportService, "iter_activity_chunks", failing_chunks)
+    guild = SimpleNamespace(id=1, members=[])
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ExportService.generate_parquet_report(guild, "2025-01-01", "2025-01-31"))
+    assert len(opened) == 1 and opened[0].closed
@@ -0,0 +1,169 @@
+"""
+Behaviour every storage backend must share (see database/repository.py).
+Each test runs against MongoDB (mongomock-motor) and SQLite (a temporary file).
+"""
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from database.connection import Database
+
+GUILD = 1
+OTHER_GUILD = 2
+
+
+@pytest.fixture(params=["mongo", "sqlite"])
+def repos(request, tmp_path, monkeypatch):
+    if request.param == "mongo":
+        request.getfixturevalue("mongo")
+    else:
+        monkeypatch.setattr(Database, "BACKEND", "sqlite")
+        monkeypatch.setattr(Database, "SQLITE_PATH", str(tmp_path / "contract.db"))
+        monkeypatch.setattr(Database, "_repositories", {})
+    yield lambda name: Database.repository(name)
+    if request.param == "sqlite":
+        Database.close()
+
+
+def run(scenario):
+    asyncio.run(scenario())
+
+
+def test_upsert_applies_operators_and_set_on_insert_once(repos):
+    attendance = repos("attendance")
+
+    async def scenario():
+        await attendance.ensure_indexes()
+        await attendance.create_or_update(5, GUILD, "2025-01-06", {
+            "$set": {"attendance_status": "Present"},
+            "$setOnInsert": {"user_name": "Alice"},
+            "$inc": {"bhai_count": 1}
+        })
+        await attendance.create_or_update(5, GUILD, "2025-01-06", {
+            "$set": {"attendance_status": "Late"},
+            "$setOnInsert": {"user_name": "Changed"},
+            "$inc": {"bhai_count": 2}
+        })
+        doc = await attendance.find_by_date(5, GUILD, "2025-01-06")
+        assert doc["day"] == 20250106
+        assert doc["attendance_status"] == "Late"
+        assert doc["user_name"] == "Alice"
+        assert doc["bhai_count"] == 3
+        assert await attendance.find_by_date(5, GUILD, "2025-01-07") is None
+        assert await attendance.find_by_date(5, OTHER_GUILD, "2025-01-06") is None
+
+    run(scenario)
+
+
+def test_range_reads_are_inclusive_and_scoped_to_the_guild(repos):
+    attendance = repos("attendance")
+
+    async def scenario():
+        await attendance.ensure_indexes()
+        for user_id, guild_id, date_str in [
+            (5, GUILD, "2025-01-05"), (5, GUILD, "2025-01-06"), (6, GUILD, "2025-01-10"),
+            (5, GUILD, "2025-01-11"), (5, OTHER_GUILD, "2025-01-06")
+        ]:
+            await attendance.create_or_update(user_id, guild_id, date_str, {"$set": {"attendance_status": "Present"}})
+        logs = await attendance.get_logs_in_range(GUILD, "2025-01-06", "2025-01-10", profile="analytics")
+        assert sorted((log["user_id"], log["day"]) for log in logs) == [(5, 20250106), (6, 20250110)]
+
+    run(scenario)
+
+
+def test_voice_sessions_accumulate_and_keep_datetimes(repos):
+    voice = repos("voice")
+    start = datetime(2025, 1, 6, 4, 30, tzinfo=timezone.utc)
+    end = datetime(2025, 1, 6, 5, 30, tzinfo=timezone.utc)
+
+    async def scenario():
+        await voice.ensure_indexes()
+        session = {"start_time": start, "end_time": end, "duration": 3600.0}
+        await voice.append_session(5, GUILD, "2025-01-06", "Alice", session, 3600.0)
+        await voice.append_session(5, GUILD, "2025-01-06", "Alice", session, 600.0, is_overtime=True)
+        await voice.append_session(6, GUILD, "2025-01-06", "Bob", session, 60.0)
+
+        docs = await voice.get_stats(5, GUILD, "2025-01-06", "2025-01-06")
+        assert len(docs) == 1
+        doc = docs[0]
+        assert doc["total_duration"] == 3600.0
+        assert doc["overtime_duration"] == 600.0
+        assert len(doc["sessions"]) == 2
+        # Returned like the MongoDB driver does: naive, in UTC
+        assert doc["sessions"][0]["start_time"] == start.replace(tzinfo=None)
+
+        everyone = await voice.get_stats(None, GUILD, "2025-01-01", "2025-01-31")
+        assert sorted(doc["user_id"] for doc in everyone) == [5, 6]
+
+    run(scenario)
+
+
+def test_events_are_read_back_in_order_per_member_and_day(repos):
+    attendance = repos("attendance")
+    at = lambda hour: datetime(2025, 1, 6, hour, tzinfo=timezone.utc)
+
+    async def scenario():
+        await attendance.ensure_indexes()
+        await attendance.add_event(5, GUILD, "2025-01-06", {"command": "attendance", "ts": at(4)})
+        await attendance.add_event(5, GUILD, "2025-01-06", {"command": "lunch", "ts": at(7)})
+        await attendance.add_event(6, GUILD, "2025-01-06", {"command": "attendance", "ts": at(5)})
+        await attendance.add_event(5, GUILD, "2025-01-07", {"command": "attendance", "ts": at(4)})
+        await attendance.add_event(5, GUILD, "2025-01-06", {"command": "resume", "ts": at(8)})
+
+        events = await attendance.get_events(GUILD, 5, "2025-01-06")
+        assert [event["command"] for event in events] == ["attendance", "lunch", "resume"]
+        assert all(event["day"] == 20250106 and event["user_id"] == 5 for event in events)
+        assert events[0]["ts"] == at(4).replace(tzinfo=None)
+
+    run(scenario)
+
+
+def test_state_updates_are_order_independent(repos):
+    attendance = repos("attendance")
+    at = lambda hour: datetime(2025, 1, 6, hour)
+
+    async def scenario():
+        await attendance.ensure_indexes()
+        day = "2025-01-06"
+        await attendance.create_or_update(5, GUILD, day, {"$min": {"state.work_start": at(5)}, "$max": {"state.dropped_at": at(12)}})
+        await attendance.create_or_update(5, GUILD, day, {"$min": {"state.work_start": at(4)}, "$max": {"state.dropped_at": at(11)}})
+        await attendance.update_state(5, GUILD, day, {"$set": {"state.status": "dropped", "state.at": at(12)}}, at(12))
+        # Older than the stored state: ignored
+        await attendance.update_state(5, GUILD, day, {"$set": {"state.status": "lunch", "state.at": at(8)}}, at(8))
+        # Never creates a document
+        await attendance.update_state(6, GUILD, day, {"$set": {"state.status": "active", "state.at": at(8)}}, at(8))
+
+        state = (await attendance.find_by_date(5, GUILD, day))["state"]
+        assert state == {"work_start": at(4), "dropped_at": at(12), "status": "dropped", "at": at(12)}
+        assert await attendance.find_by_date(6, GUILD, day) is None
+
+    run(scenario)
+
+
+def test_leaderboard_and_rank(repos):
+    users = repos("users")
+
+    async def scenario():
+        await users.ensure_indexes()
+        for user_id, name, count in [(1, "A", 3), (2, "B", 1), (3, "C", 5), (4, "D", 3)]:
+            for _ in range(count):
+                await users.increment_bhai_count(user_id, name)
+        await users.increment_voice_time(9, "Quiet", regular_sec=10)
+
+        top = await users.get_top_bhai_users(limit=2, profile="analytics")
+        assert [(u["_id"], u["global_bhai_count"]) for u in top] == [("3", 5), (top[1]["_id"], 3)]
+        assert top[1]["_id"] in ("1", "4")
+        bottom = await users.get_bottom_bhai_users(limit=1)
+        assert [(u["_id"], u["display_name"]) for u in bottom] == [("2", "B")]
+        # Users without any bhai are left out
+        assert len(await users.get_all_bhai_users()) == 4
+
+        assert await users.get_bhai_count(3) == 5
+        assert await users.get_bhai_count(42) == 0
+        assert await users.get_bhai_rank(3) == 1
+        assert await users.get_bhai_rank(1) == 2
+        assert await users.get_bhai_rank(4) == 2
+        assert await users.get_bhai_rank(2) == 4
+        assert await users.get_bhai_rank(9) == 5
+        assert await users.get_voice_stats(9) == {"regular": 10, "overtime": 0}
+
+    run(scenario)
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from models.sheets_outbox_model import SheetsOutboxModel
+from services.sheets_backend import FakeSheetsBackend
+from services.sheets_sync_service import SheetsSyncService
+
+HEADERS = ["Date", "Alice"]
+
+
+async def enqueue_days(guild_id, dates):
+    for date_str in dates:
+        await SheetsOutboxModel.enqueue(guild_id, "Attendance", date_str, [HEADERS, [date_str, "Present"]])
+
+
+async def make_due():
+    # Retries are scheduled with backoff; pull them forward so the next drain picks them up
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    await SheetsOutboxModel.get_collection().update_many({}, {"$set": {"next_attempt_at": past}})
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setenv("TARGET_GUILD_ID", "1")
+    fake = FakeSheetsBackend()
+    monkeypatch.setattr(SheetsSyncService, "backend", fake)
+    return fake
+
+
+def test_drain_coalesces_due_entries_into_one_write(mongo, backend):
+    async def scenario():
+        await enqueue_days(1, ["2025-01-01", "2025-01-02", "2025-01-03"])
+        result = await SheetsSyncService.drain()
+        assert result["written"] == 3 and result["failed"] == 0
+        assert backend.calls == 1
+        assert sorted(backend.tabs["2025 Attendance"]) == ["2025-01-01", "2025-01-02", "2025-01-03"]
+        assert await SheetsOutboxModel.count_pending() == 0
+
+    asyncio.run(scenario())
+
+
+def test_each_guild_writes_to_its_own_tabs(mongo, backend):
+    async def scenario():
+        await SheetsOutboxModel.enqueue(1, "Attendance", "2025-01-01", [HEADERS, ["2025-01-01", "Present"]])
+        await SheetsOutboxModel.enqueue(2, "Attendance", "2025-01-01", [HEADERS, ["2025-01-01", "Absent"]])
+        result = await SheetsSyncService.drain()
+        assert result["written"] == 2
+        # Same date, different guilds: two rows, neither overwrites the other
+        assert backend.tabs["2025 Attendance"]["2025-01-01"] == [["2025-01-01", "Present"]]
+        assert backend.tabs["2025 Attendance (2)"]["2025-01-01"] == [["2025-01-01", "Absent"]]
+
+    asyncio.run(scenario())
+
+
+def test_failing_entry_does_not_block_the_rest(mongo, backend):
+    backend.fail_dates = {"2025-01-02"}
+
+    async def scenario():
+        await enqueue_days(1, ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04"])
+        result = await SheetsSyncService.drain()
+        assert result["written"] == 3
+        assert result["failed"] == 1
+        assert result["failed_guilds"] == {1}
+        assert "2025-01-02" not in backend.tabs["2025 Attendance"]
+        remaining = await SheetsOutboxModel.get_collection().find({}).to_list(length=None)
+        assert [doc["date"] for doc in remaining] == ["2025-01-02"]
+        assert remaining[0]["attempts"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_outage_is_bounded_per_drain(mongo, backend):
+    backend.fail_times = 1000
+
+    async def scenario():
+        await enqueue_days(1, [f"2025-01-{day:02d}" for day in range(1, 31)])
+        result = await SheetsSyncService.drain()
+        assert result["written"] == 0 and result["failed"] == 30
+        assert backend.calls == SheetsSyncService.MAX_WRITES_PER_DRAIN
+
+    asyncio.run(scenario())
+
+
+def test_entry_is_parked_after_max_attempts_and_revived_by_enqueue(mongo, backend, monkeypatch):
+    monkeypatch.setattr(SheetsSyncService, "MAX_ATTEMPTS", 2)
+    backend.fail_dates = {"2025-01-02"}
+
+    async def scenario():
+        await enqueue_days(1, ["2025-01-02"])
+        first = await SheetsSyncService.drain()
+        assert first["parked"] == 0
+        await make_due()
+        second = await SheetsSyncService.drain()
+        assert second["parked"] == 1
+        assert await SheetsOutboxModel.count_pending() == 0
+        assert await SheetsOutboxModel.count_dead() == 1
+
+        # Parked entries are never retried...
+        await make_due()
+        assert (await SheetsSyncService.drain())["failed"] == 0
+
+        # ...until the day is exported again
+        backend.fail_dates = set()
+        await enqueue_days(1, ["2025-01-02"])
+        assert (await SheetsSyncService.drain())["written"] == 1
+        assert await SheetsOutboxModel.count_dead() == 0
+
+    asyncio.run(scenario())
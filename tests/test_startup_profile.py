@@ -0,0 +1,18 @@
+import os
+import pytest
+from utils import startup_profile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_startup_imports_stay_lazy_and_within_budget():
+    pytest.importorskip("discord")
+    rows = startup_profile.measure(ROOT)
+    modules = {module for module, _, _, _ in rows}
+    # services.google_sheets_service (gspread, google-auth) is only imported on first use
+    assert not {m for m in modules if m == "gspread" or m.startswith(("gspread.", "google.auth", "google.oauth2"))}
+    # main.py's own service imports (change streams, command sync) are part of the measured total
+    assert {"main", "services.change_stream_service", "services.command_sync_service"} <= modules
+
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+    assert total_ms <= startup_profile.BUDGET_MS
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from config.settings import IST
+from models.attendance_model import AttendanceModel
+from services.voice_service import VoiceService
+from utils.timer_wheel import TimerWheel
+
+
+def make_member(channel):
+    return SimpleNamespace(id=5, display_name="Alice", voice=SimpleNamespace(channel=channel))
+
+
+def make_channel():
+    return SimpleNamespace(id=10, name="Work", guild=SimpleNamespace(id=1))
+
+
+def test_wheel_starts_from_the_current_tick():
+    wheel = TimerWheel("Test")
+    wheel.current_tick = None
+    fired = []
+
+    async def scenario():
+        async def callback():
+            fired.append(True)
+        wheel.schedule_at(time.time() + 3600, callback)
+        # Started now, not when the wheel was built: nothing to replay
+        assert wheel.current_tick == int(time.time() // wheel.tick)
+        await asyncio.sleep(0)
+        wheel.stop()
+
+    asyncio.run(scenario())
+    assert not fired
+
+
+def test_boundary_does_not_restart_a_session_for_a_member_who_left(mongo, monkeypatch):
+    channel = make_channel()
+    member = make_member(channel)
+    # A Monday, mid-shift
+    start = IST.localize(datetime(2025, 1, 6, 22, 0)).astimezone(timezone.utc)
+    boundary = start + timedelta(hours=2)
+
+    async def not_dropped(*args, **kwargs):
+        return None
+
+    async def leaves_during_check(*args, **kwargs):
+        # The leave event arrives while the drop check is awaited
+        member.voice = None
+        return None
+
+    async def scenario():
+        monkeypatch.setattr(AttendanceModel, "find_by_date", not_dropped)
+        await VoiceService.start_session(member, channel, silent=True, start_time=start)
+        assert member.id in VoiceService.active_sessions
+
+        monkeypatch.setattr(AttendanceModel, "find_by_date", leaves_during_check)
+        await VoiceService._on_boundary(member, channel, start, boundary, "midnight")
+        VoiceService.boundaries.stop()
+
+    try:
+        asyncio.run(scenario())
+        assert member.id not in VoiceService.active_sessions
+    finally:
+        VoiceService.active_sessions.pop(member.id, None)
+
+
+def test_drop_check_reads_past_a_stale_cache(mongo, monkeypatch):
+    channel = make_channel()
+    member = make_member(channel)
+    day = "2025-01-06"
+    start = IST.localize(datetime(2025, 1, 6, 18, 0))
+
+    async def scenario():
+        AttendanceModel.cache.clear()
+        await AttendanceModel.record_event(member.id, 1, day, {"command": "present", "ts": start - timedelta(hours=9)}, {"attendance_status": "Present"})
+        assert (await AttendanceModel.find_by_date(member.id, 1, day, cached=True))["state"]["status"] == "active"
+
+        # Another process drops the member; its change stream event hasn't arrived yet
+        with monkeypatch.context() as other_process:
+            other_process.setattr(AttendanceModel.cache, "invalidate", lambda key: None)
+            await AttendanceModel.record_event(member.id, 1, day, {"command": "drop", "ts": start - timedelta(minutes=5)})
+        assert (await AttendanceModel.find_by_date(member.id, 1, day, cached=True))["state"]["status"] == "active"
+        await VoiceService.start_session(member, channel, silent=True, start_time=start.astimezone(timezone.utc))
+        VoiceService.boundaries.stop()
+
+    try:
+        asyncio.run(scenario())
+        assert VoiceService.active_sessions[member.id]["is_overtime"] is True
+    finally:
+        VoiceService.active_sessions.pop(member.id, None)
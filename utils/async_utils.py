@@ -0,0 +1,40 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+class BlockingExecutor:
+    """
+    Async facade over a bounded thread pool for blocking (sync) library calls.
+    Keeps slow HTTP clients (e.g. gspread) off the event loop.
+    """
+
+    def __init__(self, name, max_workers=4, default_timeout=60):
+        self.name = name
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    async def run(self, func, *args, timeout=None, **kwargs):
+        """
+        Runs func(*args, **kwargs) on the pool and awaits the result.
+        On timeout or cancellation the call is cancelled if it hasn't started yet.
+        A call that is already running can't be interrupted, so its result is discarded.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_pool(), functools.partial(func, *args, **kwargs))
+        timeout = timeout or self.default_timeout
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            name = getattr(func, '__name__', repr(func))
+            raise TimeoutError(f"{self.name}: {name} timed out after {timeout}s")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
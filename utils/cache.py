@@ -0,0 +1,117 @@
+import os
+import time
+
+class CacheBus:
+    """
+    In-process fan-out of invalidation events, per collection:
+    {"collection", "op", "id", "doc", "fields"}. op is "insert", "update", "replace", "delete" or
+    "invalidate" (drop everything cached from the collection); doc is the full document when known
+    (inserts/replaces), fields the updated field names (updates).
+    Fed by ChangeStreamService, so writes from other processes and direct database edits reach
+    every process. A collection is "live" while its change stream is delivering; caches fall
+    back to short expiry for collections that are not.
+    """
+    _subscribers = {}  # {collection: [callback(event)]}
+    _live = set()
+
+    @classmethod
+    def subscribe(cls, collection, callback):
+        cls._subscribers.setdefault(collection, []).append(callback)
+
+    @classmethod
+    def collections(cls):
+        return list(cls._subscribers)
+
+    @classmethod
+    def publish(cls, collection, op, doc_id=None, doc=None, fields=None):
+        event = {"collection": collection, "op": op, "id": doc_id, "doc": doc, "fields": fields}
+        for callback in cls._subscribers.get(collection, []):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"[CacheBus] Subscriber failed for {collection} {op}: {e}")
+
+    @classmethod
+    def set_live(cls, collection, live):
+        if live == (collection in cls._live):
+            return
+        if live:
+            cls._live.add(collection)
+        else:
+            cls._live.discard(collection)
+            # Entries cached while the stream was up may miss updates from now on
+            cls.publish(collection, "invalidate")
+        print(f"[CacheBus] {collection}: {'live invalidation' if live else 'TTL fallback'}")
+
+    @classmethod
+    def is_live(cls, collection):
+        return collection in cls._live
+
+
+class TTLCache:
+    """
+    Small in-process cache for documents of one collection, invalidated through CacheBus.
+    Entries expire after CACHE_TTL seconds while the collection is live on the bus and after
+    CACHE_FALLBACK_TTL seconds otherwise. Entries can be tagged with document ids so update
+    and delete events (which only carry the _id) find them.
+    """
+    TTL = float(os.getenv("CACHE_TTL", "300"))
+    FALLBACK_TTL = float(os.getenv("CACHE_FALLBACK_TTL", "5"))
+
+    def __init__(self, name, collection, max_entries=2048):
+        self.name = name
+        self.collection = collection
+        self.max_entries = max_entries
+        self._entries = {}  # {key: (expires_at, value, ids)}
+        self._keys_by_id = {}  # {doc_id: {key, ...}}
+        # Bumped on every invalidation: a load that raced with one is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, key, loader, ids=None):
+        """Cached value for key, else the result of `await loader()` (cached, tagged with ids(value))."""
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self._store(key, value, ids(value) if ids else ())
+        return value
+
+    def _store(self, key, value, ids):
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            self._drop(next(iter(self._entries)))
+        ttl = self.TTL if CacheBus.is_live(self.collection) else self.FALLBACK_TTL
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, value, tuple(ids))
+        for doc_id in ids:
+            self._keys_by_id.setdefault(doc_id, set()).add(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            for doc_id in entry[2]:
+                keys = self._keys_by_id.get(doc_id)
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_id[doc_id]
+
+    def invalidate(self, key):
+        self._generation += 1
+        self._drop(key)
+
+    def invalidate_id(self, doc_id):
+        self._generation += 1
+        for key in list(self._keys_by_id.get(doc_id, ())):
+            self._drop(key)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._keys_by_id.clear()
@@ -35,3 +35,29 @@ def get_log_channel(guild: discord.Guild):
     target_name = os.getenv("ATTENDANCE_CHANNEL_NAME", "attendance")
     channel = discord.utils.get(guild.text_channels, name=target_name)
     return channel
+
+MESSAGE_LIMIT = 2000
+
+def split_message(text, limit=MESSAGE_LIMIT):
+    """
+    Splits text into chunks of at most `limit` characters, preferring line breaks.
+    Lines longer than the limit are hard-split.
+    """
+    chunks = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,55 @@
+import asyncio
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic sleep wakes up.
+    Anything blocking the loop (sync I/O, heavy CPU) shows up as lag.
+    """
+    interval = 0.1  # seconds between samples
+
+    _task = None
+    _max_lag = 0.0
+    _total_lag = 0.0
+    _samples = 0
+
+    @classmethod
+    def start(cls, interval=None):
+        if interval:
+            cls.interval = interval
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    def stop(cls):
+        if cls._task:
+            cls._task.cancel()
+            cls._task = None
+
+    @classmethod
+    async def _run(cls):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + cls.interval
+            await asyncio.sleep(cls.interval)
+            lag = max(0.0, loop.time() - expected)
+            cls._max_lag = max(cls._max_lag, lag)
+            cls._total_lag += lag
+            cls._samples += 1
+
+    @classmethod
+    def snapshot(cls, reset=False):
+        """Returns {'max_ms', 'avg_ms', 'samples'} since the last reset."""
+        stats = {
+            "max_ms": round(cls._max_lag * 1000, 1),
+            "avg_ms": round(cls._total_lag / cls._samples * 1000, 1) if cls._samples else 0.0,
+            "samples": cls._samples
+        }
+        if reset:
+            cls.reset()
+        return stats
+
+    @classmethod
+    def reset(cls):
+        cls._max_lag = 0.0
+        cls._total_lag = 0.0
+        cls._samples = 0
@@ -0,0 +1,122 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+
+# Lower value = served first
+PRIORITY_SCHEDULED = 0
+PRIORITY_ADHOC = 1
+
+# Priority of the current task's API calls (ad-hoc commands unless marked otherwise)
+current_priority = ContextVar("rate_limit_priority", default=PRIORITY_ADHOC)
+
+@contextlib.contextmanager
+def priority(value):
+    """Marks all rate-limited calls made inside the block with the given priority."""
+    token = current_priority.set(value)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `per_minute` tokens per minute, up to `capacity` stored.
+    Can be paused (e.g. on Retry-After) until a given monotonic time.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.per_minute = per_minute
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        """Takes a token if possible. Returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def available(self):
+        self._refill(time.monotonic())
+        return int(self.tokens)
+
+
+class RateLimiter:
+    """
+    Async, priority-aware front for a TokenBucket.
+    Waiters are served strictly by (priority, arrival), so scheduled jobs jump ahead of ad-hoc commands.
+    """
+
+    def __init__(self, name, per_minute, capacity=None):
+        self.name = name
+        self.bucket = TokenBucket(per_minute, capacity)
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = asyncio.Condition()
+
+        # Counters
+        self.granted = 0
+        self.waited_seconds = 0.0
+        self.throttled = 0
+
+    async def acquire(self, prio=None):
+        ticket = (current_priority.get() if prio is None else prio, next(self._seq))
+        started = time.monotonic()
+        async with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._waiters[0] == ticket:
+                        wait = self.bucket.try_take()
+                        if wait == 0:
+                            heapq.heappop(self._waiters)
+                            break
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                # Cancelled while waiting: give up our place in line
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                raise
+            finally:
+                self._cond.notify_all()
+
+        self.granted += 1
+        self.waited_seconds += time.monotonic() - started
+
+    def penalize(self, retry_after):
+        """Server said 429: stop handing out tokens for `retry_after` seconds."""
+        self.throttled += 1
+        self.bucket.pause(retry_after)
+
+    def stats(self):
+        return {
+            "available": self.bucket.available(),
+            "capacity": self.bucket.capacity,
+            "per_minute": self.bucket.per_minute,
+            "granted": self.granted,
+            "waited_seconds": round(self.waited_seconds, 2),
+            "throttled": self.throttled,
+            "queued": len(self._waiters)
+        }
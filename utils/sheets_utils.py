@@ -0,0 +1,112 @@
+"""
+Helpers for building raw Sheets API (v4) batchUpdate requests.
+"""
+
+import re
+
+WRAP_FORMAT = {"wrapStrategy": "WRAP"}
+
+_DATE_KEY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def is_date_key(value):
+    """True for 'YYYY-MM-DD' cells (the key column of the tracker tabs)."""
+    return isinstance(value, str) and bool(_DATE_KEY.match(value))
+
+def _normalize(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+def rows_equal(current, new):
+    """Compares a row read from the sheet with the row we'd write (ignores trailing blanks / int vs float)."""
+    width = max(len(current), len(new))
+    current = list(current) + [""] * (width - len(current))
+    new = list(new) + [""] * (width - len(new))
+    return all(_normalize(a) == _normalize(b) for a, b in zip(current, new))
+
+def col_to_letter(n):
+    """Converts a column number to its letter (e.g. 26 -> Z, 27 -> AA)."""
+    string = ""
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        string = chr(65 + remainder) + string
+    return string
+
+def to_cell(value, wrap=True):
+    """Python value -> CellData. Values are written as-is (like RAW input)."""
+    cell = {}
+    if isinstance(value, bool):
+        cell["userEnteredValue"] = {"boolValue": value}
+    elif isinstance(value, (int, float)):
+        cell["userEnteredValue"] = {"numberValue": value}
+    elif value is not None and value != "":
+        cell["userEnteredValue"] = {"stringValue": str(value)}
+    if wrap:
+        cell["userEnteredFormat"] = WRAP_FORMAT
+    return cell
+
+def to_row_data(rows, wrap=True):
+    return [{"values": [to_cell(v, wrap) for v in row]} for row in rows]
+
+def update_cells_request(sheet_id, start_row, rows, start_col=1, wrap=True):
+    """Writes `rows` with their top-left cell at (start_row, start_col), both 1-based."""
+    fields = "userEnteredValue,userEnteredFormat.wrapStrategy" if wrap else "userEnteredValue"
+    return {
+        "updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": start_row - 1, "columnIndex": start_col - 1},
+            "rows": to_row_data(rows, wrap),
+            "fields": fields
+        }
+    }
+
+def append_dimension_request(sheet_id, dimension, length):
+    # dimension: "ROWS" or "COLUMNS"
+    return {"appendDimension": {"sheetId": sheet_id, "dimension": dimension, "length": length}}
+
+def add_sheet_request(sheet_id, title, rows, cols):
+    return {
+        "addSheet": {
+            "properties": {
+                "sheetId": sheet_id,
+                "title": title,
+                "gridProperties": {"rowCount": rows, "columnCount": cols}
+            }
+        }
+    }
+
+def wrap_sheet_request(sheet_id):
+    """Word wrap for every cell of a sheet."""
+    return {
+        "repeatCell": {
+            "range": {"sheetId": sheet_id},
+            "cell": {"userEnteredFormat": WRAP_FORMAT},
+            "fields": "userEnteredFormat.wrapStrategy"
+        }
+    }
+
+def column_width_requests(sheet_id, rows, min_px=60, max_px=240, px_per_char=7):
+    """
+    Sizes each column to its longest value (server-side autoResize isn't reliable for
+    cells written in the same batch). Consecutive columns with the same width share a request.
+    """
+    width = max((len(r) for r in rows), default=0)
+    sizes = []
+    for col in range(width):
+        longest = max((len(str(r[col])) for r in rows if col < len(r) and r[col] is not None), default=0)
+        sizes.append(max(min_px, min(max_px, longest * px_per_char + 16)))
+
+    requests = []
+    start = 0
+    for col in range(1, width + 1):
+        if col == width or sizes[col] != sizes[start]:
+            requests.append({
+                "updateDimensionProperties": {
+                    "range": {"sheetId": sheet_id, "dimension": "COLUMNS", "startIndex": start, "endIndex": col},
+                    "properties": {"pixelSize": sizes[start]},
+                    "fields": "pixelSize"
+                }
+            })
+            start = col
+    return requests
@@ -0,0 +1,63 @@
+import os
+import re
+import subprocess
+import sys
+
+# Import time allowed for everything loaded before the bot logs in
+BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+
+# What startup imports: main.py (with the services it imports at the top) and every cog (see load_extensions)
+STARTUP_SCRIPT = (
+    "import importlib, os\n"
+    "import main\n"
+    "for name in sorted(os.listdir('cogs')):\n"
+    "    if name.endswith('.py'):\n"
+    "        importlib.import_module('cogs.' + name[:-3])\n"
+)
+
+# "import time:       self [us] |  cumulative | imported package", nested imports indented by 2
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+def measure(root, script=STARTUP_SCRIPT):
+    """
+    Runs `script` in a fresh interpreter under `-X importtime` (nothing cached from this process).
+    Returns [(module, self_us, cumulative_us, depth)] in import order.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=root, capture_output=True, text=True
+    )
+    rows, other = [], []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+        elif not line.startswith("import time:"):
+            other.append(line)
+    if result.returncode != 0:
+        raise RuntimeError("Startup imports failed:\n" + "\n".join(other[-20:]))
+    return rows
+
+def report(root, budget_ms=BUDGET_MS, top=15):
+    """Prints the import-time breakdown. Returns False if the total is over budget."""
+    rows = measure(root)
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+
+    packages = {}
+    for module, self_us, _, _ in rows:
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    print(f"Startup imports: {len(rows)} modules, {total_ms:.0f}ms (budget {budget_ms:.0f}ms)")
+    print("\nSlowest top-level imports (cumulative):")
+    for module, _, cumulative, _ in sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {module}")
+    print("\nBy package (own time of all its modules):")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {self_us / 1000:8.1f}ms  {package}")
+
+    within = total_ms <= budget_ms
+    if not within:
+        print(f"\n❌ Startup imports took {total_ms:.0f}ms, over the {budget_ms:.0f}ms budget (STARTUP_IMPORT_BUDGET_MS).")
+    return within
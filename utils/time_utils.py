@@ -1,6 +1,39 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from config.settings import IST
 
 def get_ist_time():
     """Returns the current time in IST"""
     return datetime.now(IST)
+
+def day_key(value):
+    """Integer day key (YYYYMMDD) for a date, datetime or 'YYYY-MM-DD' string."""
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y-%m-%d')
+    return value.year * 10000 + value.month * 100 + value.day
+
+def day_str(key):
+    """'YYYY-MM-DD' for an integer day key."""
+    return f"{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}"
+
+def doc_date(doc):
+    """'YYYY-MM-DD' of a daily document, whether keyed by `day` or by the legacy `date` string."""
+    if "day" in doc:
+        return day_str(doc["day"])
+    return doc.get("date")
+
+def parse_timestamp(value):
+    """
+    A stored timestamp as an aware IST datetime. Accepts BSON datetimes (returned naive,
+    in UTC) and legacy ISO-8601 strings (older SQLite files and unmigrated data).
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(IST)
+
+def stored_time(value):
+    """A datetime as the storage returns it (naive, in UTC), so it compares with stored timestamps."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
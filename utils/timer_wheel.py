@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+class Timer:
+    """Handle returned by TimerWheel.schedule_at(). cancel() is O(1)."""
+    __slots__ = ("deadline", "callback", "args", "cancelled", "_slot")
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._slot = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self._slot is not None:
+            self._slot.discard(self)
+            self._slot = None
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel (seconds / minutes / hours / days) driven by one asyncio task.
+    Scheduling and cancelling are O(1); each tick only looks at one slot, and timers cascade
+    down a level as their deadline approaches, so nothing ever scans all pending timers.
+
+    Deadlines are wall-clock epoch seconds. Callbacks are coroutine functions, run as their
+    own tasks so a slow callback never delays the wheel. If the loop falls behind (lag, sleep),
+    the missed ticks are replayed on the next wake-up, so no timer is skipped.
+    """
+
+    def __init__(self, name, tick=1.0, slots=(60, 60, 24, 8)):
+        self.name = name
+        self.tick = tick
+        self.slots = slots
+        # Ticks covered by one slot of each level: 1, 60, 3600, 86400
+        self.spans = []
+        span = 1
+        for size in slots:
+            self.spans.append(span)
+            span *= size
+        self.range = span  # Timers further out than this wait in the overflow set
+        self.wheels = [[set() for _ in range(size)] for size in slots]
+        self.overflow = set()
+        # Set when the wheel starts: a wheel built at import time must not replay the ticks since then
+        self.current_tick = None
+        self._task = None
+
+    def schedule_at(self, deadline, callback, *args):
+        """Calls `await callback(*args)` at epoch time `deadline` (past deadlines fire on the next tick)."""
+        timer = Timer(deadline, callback, args)
+        self._ensure_running()
+        self._place(timer, self.current_tick + 1)
+        return timer
+
+    def _place(self, timer, earliest_tick):
+        target = max(int(timer.deadline // self.tick), earliest_tick)
+        delta = target - self.current_tick
+        for level, size in enumerate(self.slots):
+            if delta < self.spans[level] * size:
+                slot = self.wheels[level][(target // self.spans[level]) % size]
+                break
+        else:
+            slot = self.overflow
+        slot.add(timer)
+        timer._slot = slot
+
+    def _advance(self):
+        """Moves one tick forward and returns the timers that are due."""
+        self.current_tick += 1
+        tick = self.current_tick
+
+        # Cascade: when a lower wheel wraps, redistribute the next slot of the level above
+        for level in range(1, len(self.slots)):
+            if tick % self.spans[level]:
+                break
+            self._redistribute(self.wheels[level][(tick // self.spans[level]) % self.slots[level]])
+        else:
+            if tick % self.range == 0:
+                self._redistribute(self.overflow)
+
+        slot = self.wheels[0][tick % self.slots[0]]
+        due = [t for t in slot if not t.cancelled]
+        slot.clear()
+        for timer in due:
+            timer._slot = None
+        return due
+
+    def _redistribute(self, slot):
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            if not timer.cancelled:
+                # May land in the current level-0 slot, which is fired right after the cascade
+                self._place(timer, self.current_tick)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            if self.current_tick is None:
+                self.current_tick = int(time.time() // self.tick)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            next_at = (self.current_tick + 1) * self.tick
+            await asyncio.sleep(max(0.0, next_at - time.time()))
+            now_tick = int(time.time() // self.tick)
+            while self.current_tick < now_tick:
+                for timer in self._advance():
+                    asyncio.create_task(self._fire(timer))
+
+    async def _fire(self, timer):
+        try:
+            await timer.callback(*timer.args)
+        except Exception as e:
+            print(f"[TimerWheel] {self.name}: callback failed: {e}")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None